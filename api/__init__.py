@@ -1,14 +1,28 @@
 import falcon
 
-from api.middleware import AuthMiddleware, VerifyEmailAuthMiddleware
+from api.error_msgs import SERVICE_OVERLOADED
+from api.middleware import AuthMiddleware, DBSessionMiddleware, VerifyEmailAuthMiddleware
 from api.resource import (
     AuthResource, RegisterResource, UserInfoResource, ForgotPasswordResource, UpdatePasswordResource,
-    VerifyEmailResource
+    VerifyEmailResource, JWKSResource, IntrospectResource, ExportResource, HealthResource
 )
+from api.utils.hash_executor import HashExecutorOverloaded
+from api.utils.hashers import get_default_hasher
+from api.utils.media import install_media_handlers
+
+
+def handle_hash_executor_overloaded(req, resp, ex, params):
+    raise falcon.HTTPServiceUnavailable(description=SERVICE_OVERLOADED, retry_after=1)
 
 
 def create():
-    return falcon.App(middleware=[AuthMiddleware()])
+    # calibrates the password hasher at startup instead of in the first request,
+    # a preloaded app does it once in the master
+    get_default_hasher()
+    app = falcon.App(middleware=[DBSessionMiddleware(), AuthMiddleware()])
+    install_media_handlers(app)
+    app.add_error_handler(HashExecutorOverloaded, handle_hash_executor_overloaded)
+    return app
 
 
 app = create()
@@ -19,3 +33,10 @@ app.add_route('/me-info', UserInfoResource())
 app.add_route('/verify/{email}', VerifyEmailResource(auth_middleware=VerifyEmailAuthMiddleware))
 app.add_route('/forgot-password/{email}', ForgotPasswordResource())
 app.add_route('/update-password', UpdatePasswordResource(auth_middleware=VerifyEmailAuthMiddleware))
+# token verification
+app.add_route('/introspect', IntrospectResource())
+app.add_route('/.well-known/jwks.json', JWKSResource())
+# admin
+app.add_route('/admin/users/export', ExportResource())
+# monitoring
+app.add_route('/health', HealthResource())
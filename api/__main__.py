@@ -1,10 +1,71 @@
+import argparse
 from wsgiref import simple_server
 
-from api import app
+from config import (
+    SERVER_HOST, SERVER_PORT, SERVER_WORKERS, SERVER_THREADS, SERVER_KEEPALIVE, SERVER_MAX_REQUESTS,
+    SERVER_MAX_REQUESTS_JITTER, SERVER_TIMEOUT, SERVER_GRACEFUL_TIMEOUT
+)
 from dao.operations import initialize_models
 
 
+def get_server_options(args) -> dict:
+    options = {
+        "bind": f"{args.host}:{args.port}",
+        "workers": args.workers,
+        "keepalive": SERVER_KEEPALIVE,
+        "max_requests": SERVER_MAX_REQUESTS,
+        "max_requests_jitter": SERVER_MAX_REQUESTS_JITTER,
+        "timeout": SERVER_TIMEOUT,
+        "graceful_timeout": SERVER_GRACEFUL_TIMEOUT,
+        # the app is imported by the master, workers share it copy-on-write
+        "preload_app": True,
+    }
+    if args.asgi:
+        options["worker_class"] = "uvicorn_worker.UvicornWorker"
+    else:
+        # unlike the sync worker, gthread keeps connections alive
+        options.update(worker_class="gthread", threads=args.threads)
+    return options
+
+
+def serve(app, options: dict):
+    # DB engines, Redis pools and the hash executor reset themselves in forked workers (os.register_at_fork)
+    from gunicorn.app.base import BaseApplication
+
+    class ServerApplication(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    ServerApplication().run()
+
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run the auth service.")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS)
+    parser.add_argument("--threads", type=int, default=SERVER_THREADS)
+    parser.add_argument("--asgi", action="store_true", help="serve the ASGI app with uvicorn workers")
+    parser.add_argument("--dev", action="store_true", help="single process wsgiref server for local development")
+    args = parser.parse_args()
+
+    # the app is imported here, in the master, so the password hasher is calibrated once for every worker
     initialize_models()
-    httpd = simple_server.make_server('127.0.0.1', 8000, app)
-    httpd.serve_forever()
+
+    if args.dev:
+        from api import app
+
+        httpd = simple_server.make_server(args.host, args.port, app)
+        httpd.serve_forever()
+    elif args.asgi:
+        from api.aio import app
+
+        serve(app, get_server_options(args))
+    else:
+        from api import app
+
+        serve(app, get_server_options(args))
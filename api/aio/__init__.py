@@ -0,0 +1,43 @@
+import falcon
+import falcon.asgi
+
+from api.aio.middleware import AsyncAuthMiddleware, AsyncDBSessionMiddleware
+from api.aio.resource import (
+    AuthResource, RegisterResource, UserInfoResource, ForgotPasswordResource, UpdatePasswordResource,
+    VerifyEmailResource, JWKSResource, IntrospectResource, ExportResource, HealthResource
+)
+from api.error_msgs import SERVICE_OVERLOADED
+from api.middleware import VerifyEmailAuthMiddleware
+from api.utils.hash_executor import HashExecutorOverloaded
+from api.utils.hashers import get_default_hasher
+from api.utils.media import install_media_handlers
+
+
+async def handle_hash_executor_overloaded(req, resp, ex, params):
+    raise falcon.HTTPServiceUnavailable(description=SERVICE_OVERLOADED, retry_after=1)
+
+
+def create():
+    # same as the WSGI app, the hasher is calibrated before the first request
+    get_default_hasher()
+    app = falcon.asgi.App(middleware=[AsyncDBSessionMiddleware(), AsyncAuthMiddleware()])
+    install_media_handlers(app)
+    app.add_error_handler(HashExecutorOverloaded, handle_hash_executor_overloaded)
+    return app
+
+
+app = create()
+# user resources
+app.add_route('/auth', AuthResource())
+app.add_route('/register', RegisterResource())
+app.add_route('/me-info', UserInfoResource())
+app.add_route('/verify/{email}', VerifyEmailResource(auth_middleware=VerifyEmailAuthMiddleware))
+app.add_route('/forgot-password/{email}', ForgotPasswordResource())
+app.add_route('/update-password', UpdatePasswordResource(auth_middleware=VerifyEmailAuthMiddleware))
+# token verification
+app.add_route('/introspect', IntrospectResource())
+app.add_route('/.well-known/jwks.json', JWKSResource())
+# admin
+app.add_route('/admin/users/export', ExportResource())
+# monitoring
+app.add_route('/health', HealthResource())
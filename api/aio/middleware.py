@@ -0,0 +1,94 @@
+import asyncio
+from logging import getLogger
+
+from falcon.util.misc import http_status_to_code
+
+from api.middleware import AuthMiddleware
+from api.middleware.db_session import AFTER_COMMIT_KEY
+from config import AFTER_COMMIT_RETRIES, AFTER_COMMIT_RETRY_DELAY
+from dao.connections import get_async_session_factory
+
+logger = getLogger(__name__)
+
+# retry tasks are referenced until they finish, the event loop keeps only weak references
+_retry_tasks = set()
+
+
+async def _retry_after_commit(callback):
+    for attempt in range(1, AFTER_COMMIT_RETRIES + 1):
+        await asyncio.sleep(AFTER_COMMIT_RETRY_DELAY * 2 ** (attempt - 1))
+        try:
+            await callback()
+            return
+        except Exception as e:
+            logger.warning("After commit callback %s failed on retry %s: %s", callback, attempt, e)
+    logger.error("After commit callback %s failed %s times, giving up", callback, AFTER_COMMIT_RETRIES + 1)
+
+
+async def run_after_commit_async(callback):
+    """Same as run_after_commit for coroutine functions, retries run as tasks on the event loop."""
+    try:
+        await callback()
+    except Exception as e:
+        if not AFTER_COMMIT_RETRIES:
+            logger.error("After commit callback %s failed: %s", callback, e)
+            return
+        logger.warning("After commit callback %s failed: %s, retrying", callback, e)
+        task = asyncio.get_running_loop().create_task(_retry_after_commit(callback))
+        _retry_tasks.add(task)
+        task.add_done_callback(_retry_tasks.discard)
+
+
+class AsyncAuthMiddleware(AuthMiddleware):
+    async def process_request(self, req, resp):
+        await self.authenticate_async(req)
+
+
+async def after_commit_async(session, callback):
+    """Same as after_commit for coroutine functions."""
+    if session is None:
+        await run_after_commit_async(callback)
+    else:
+        session.info.setdefault(AFTER_COMMIT_KEY, []).append(callback)
+
+
+class AsyncRequestSession:
+    def __init__(self):
+        self._session = None
+
+    @property
+    def session(self):
+        if self._session is None:
+            self._session = get_async_session_factory()()
+        return self._session
+
+    async def close(self, commit: bool):
+        if self._session is None:
+            return
+
+        callbacks = self._session.info.pop(AFTER_COMMIT_KEY, [])
+        try:
+            if commit:
+                await self._session.commit()
+            else:
+                await self._session.rollback()
+        except Exception:
+            await self._session.rollback()
+            raise
+        finally:
+            await self._session.close()
+            self._session = None
+
+        if commit:
+            for callback in callbacks:
+                await run_after_commit_async(callback)
+
+
+class AsyncDBSessionMiddleware:
+    async def process_request(self, req, resp):
+        req.context.db = AsyncRequestSession()
+
+    async def process_response(self, req, resp, resource, req_succeeded):
+        db = req.context.get("db")
+        if db:
+            await db.close(commit=req_succeeded and http_status_to_code(resp.status) < 400)
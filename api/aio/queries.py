@@ -0,0 +1,86 @@
+from logging import getLogger
+from functools import partial
+from typing import Any
+
+import falcon
+from sqlalchemy.exc import SQLAlchemyError
+
+from api.enums import Role
+from api.aio.middleware import after_commit_async
+from api.error_msgs import TRY_ANOTHER_TIME, INVALID_CREDENTIALS
+from api.queries import collect_user_data
+from api.utils.hashers import get_hashed_password_async, verify_password_async
+from api.utils.revocation import revoke_user_tokens_async
+from api.utils.tokens import auth_token_for_user, verify_token_for_user
+from dao.controllers import AsyncUserController
+from dao.models import User
+
+logger = getLogger(__name__)
+
+
+async def email_exists(email: str, session=None) -> bool:
+    async with AsyncUserController(session=session) as Users:
+        return await Users.email_exists(email=email)
+
+
+async def create_client(session=None, **client_data) -> str | None:
+    client_data['role'] = Role.client.value
+    async with AsyncUserController(session=session) as Users:
+        try:
+            new_user = await Users.register(client_data, returning=Users.projection("token"))
+        except SQLAlchemyError as e:
+            logger.exception(e)
+            raise falcon.HTTPInternalServerError(description=TRY_ANOTHER_TIME)
+    return auth_token_for_user(new_user) if new_user else None
+
+
+async def update_user_pwd(user_id, plain_pwd, session=None) -> bool:
+    hashed_password = await get_hashed_password_async(plain_pwd)
+    async with AsyncUserController(session=session) as Users:
+        try:
+            updated = await Users.update_password(user_id, hashed_password)
+        except SQLAlchemyError as e:
+            logger.exception(e)
+            return False
+    if updated:
+        await after_commit_async(session, partial(revoke_user_tokens_async, user_id))
+    return updated
+
+
+async def get_user_data(user_id, session=None) -> dict | None:
+    async with AsyncUserController(session=session) as Users:
+        user = await Users.get_row_by_id(user_id, fields=Users.projection("profile"))
+        if user:
+            return collect_user_data(user)
+
+
+async def update_user_data(user_id, password: str, updates: dict[str, Any], session=None) -> dict | None:
+    if "password" in updates:
+        raise ValueError("updates cannot have a key password!")
+
+    updates = {key: value for key, value in updates.items() if hasattr(User, key)}
+    if not updates:
+        return None
+
+    async with AsyncUserController(session=session) as Users:
+        user = await Users.get_row_by_id(user_id, fields=Users.projection("credentials"))
+        if not user:
+            raise falcon.HTTPNotFound()
+
+        if not await verify_password_async(plain_password=password, hashed_password=user.password):
+            raise falcon.HTTPUnauthorized(description=INVALID_CREDENTIALS)
+
+        try:
+            updated_user = await Users.update_returning(user_id, updates, returning=Users.projection("profile"))
+        except SQLAlchemyError as e:
+            logger.exception(e)
+            return None
+    return collect_user_data(updated_user) if updated_user else None
+
+
+async def verify_token_by_email(email, session=None) -> str | None:
+    async with AsyncUserController(session=session) as Users:
+        user = await Users.get_row_by_email(email, fields=Users.projection("token"))
+        if not user:
+            return
+        return verify_token_for_user(user=user)
@@ -0,0 +1,288 @@
+import logging
+from copy import deepcopy
+from urllib.parse import urlparse
+
+import falcon
+
+from api.aio import queries
+from api.error_msgs import (
+    INVALID_CREDENTIALS, INVALID_TOKEN, TRY_ANOTHER_TIME, EMAIL_TTL_ERROR, EMAIL_ERROR_MSGS, MISSING_FIELDS_FOR_UPDATE
+)
+from api.mailer import enqueue_mail_html_async
+from api.middleware.db_session import request_session
+from api.resource import export, health, introspect, jwks
+from api.resource.authentication import current_token_claims, set_auth_cookies
+from api.utils import verification_cache_key
+from api.utils.export import export_users_async
+from api.utils.hashers import get_hashed_password_async, needs_rehash, verify_password_async
+from api.utils.revocation import revoke_token_async, revoked_tokens_async
+from api.utils.tokens import auth_token_for_user
+from api.utils.schemas import (
+    AUTH_SCHEMA, CONFIRM_PASSWORD_SCHEMA, NEW_PASSWORD_SCHEMA, REGISTER_SCHEMA, USER_UPDATE_SCHEMA
+)
+from config import (
+    TOKEN_EXP_SECONDS, VERIFICATION_TTL, VERIFICATION_CONTEXT, VERIFY_EMAIL_REDIRECT_URL,
+    REDIRECT_UPDATE_PWD_URL
+)
+from dao.connections import async_redis_scope, get_async_engine
+from dao.controllers import AsyncUserController
+
+
+class AuthResource:
+    # lazy loading is not available on an async session, everything the login reads is loaded at once
+    user_data_fields = AsyncUserController.projection("token", "credentials")
+    SCHEMA = AUTH_SCHEMA
+
+    async def on_post(self, req, resp):
+        data = await req.get_media()
+
+        errors = self.SCHEMA.validate(data)
+        if errors:
+            resp.status = falcon.HTTP_BAD_REQUEST
+            resp.media = errors
+            return
+
+        async with AsyncUserController(session=request_session(req)) as Users:
+            user = await Users.get_user_by_email(data["email"], fields=self.user_data_fields)
+
+            if not user or not await verify_password_async(data["password"], user.password):
+                raise falcon.HTTPUnauthorized(description=INVALID_CREDENTIALS)
+
+            if needs_rehash(user.password):
+                user.password = await get_hashed_password_async(data["password"])
+                await Users.commit()
+
+            resp.status = falcon.HTTP_OK
+            resp.media = {'token': auth_token_for_user(user=user)}
+            set_auth_cookies(req, resp, user)
+
+    @staticmethod
+    async def on_delete(req, resp):
+        await revoke_token_async(current_token_claims(req))
+        resp.status = falcon.HTTP_NO_CONTENT
+
+
+class RegisterResource:
+    SCHEMA = REGISTER_SCHEMA
+
+    async def on_post(self, req, resp):
+        data = await req.get_media()
+
+        errors = self.SCHEMA.validate(data)
+        if errors:
+            resp.status = falcon.HTTP_BAD_REQUEST
+            resp.media = errors
+            return
+
+        token = await queries.create_client(
+            session=request_session(req),
+            email=data['email'],
+            password=await get_hashed_password_async(data['password']),
+            full_name=data['full_name']
+        )
+        if token is None:
+            resp.status = falcon.HTTP_BAD_REQUEST
+            resp.media = {"email": [EMAIL_ERROR_MSGS["already_exists"]]}
+            return
+        resp.status = falcon.HTTP_OK
+        resp.media = {'token': token}
+
+
+class UserInfoResource:
+    @staticmethod
+    async def on_get(req, resp):
+        user_id = req.context.get("user_id")
+        if not user_id:
+            raise falcon.HTTPUnauthorized()
+
+        user_data = await queries.get_user_data(user_id, session=request_session(req))
+        if not user_data:
+            raise falcon.HTTPNotFound()
+
+        resp.media = user_data
+
+    @staticmethod
+    async def on_patch(req, resp):
+        user_id = req.context.get("user_id")
+        if not user_id:
+            raise falcon.HTTPUnauthorized()
+
+        data = await req.get_media()
+        errors = USER_UPDATE_SCHEMA.validate(data)
+        email = data.get("email") if not errors else None
+        if email and await queries.email_exists(email, session=request_session(req)):
+            errors = {"email": [EMAIL_ERROR_MSGS["already_exists"]]}
+        if errors:
+            resp.status = falcon.HTTP_BAD_REQUEST
+            resp.media = errors
+            return
+
+        collected_update_fields = {}
+        full_name = data.get("full_name")
+
+        if email:
+            collected_update_fields["email"] = email
+
+        if full_name:
+            collected_update_fields["full_name"] = full_name
+
+        if not collected_update_fields:
+            raise falcon.HTTPBadRequest(
+                title="error",
+                description=MISSING_FIELDS_FOR_UPDATE
+            )
+
+        user_data = await queries.update_user_data(
+            user_id, data["password"], collected_update_fields, session=request_session(req)
+        )
+        if not user_data:
+            raise falcon.HTTPInternalServerError(description=TRY_ANOTHER_TIME)
+
+        resp.status = falcon.HTTP_OK
+        resp.media = user_data
+
+
+class BaseVerifyResource:
+    VERIFY_REDIRECT_URL = None
+
+    def __init__(self, redis_db: int = 0):
+        assert self.VERIFY_REDIRECT_URL
+        self._redis_db = redis_db
+
+    async def on_get(self, req, resp, email):
+        if not await queries.email_exists(email, session=request_session(req)):
+            raise falcon.HTTPNotFound()
+
+        cache_key = verification_cache_key(email)
+        async with async_redis_scope(self._redis_db) as cache:
+            ttl_seconds = await cache.ttl(cache_key)
+
+            match ttl_seconds:
+                case -2:
+                    token = await queries.verify_token_by_email(email, session=request_session(req))
+                    if not token:
+                        raise falcon.HTTPNotFound()
+
+                    context = deepcopy(VERIFICATION_CONTEXT)
+                    context["url"] = self.VERIFY_REDIRECT_URL % token
+
+                    try:
+                        await enqueue_mail_html_async(
+                            email=email,
+                            subject="Verify your email",
+                            template_name="verify_email.html",
+                            context=context
+                        )
+                    except Exception as e:
+                        logging.exception(e)
+                        raise falcon.HTTPInternalServerError(description=TRY_ANOTHER_TIME)
+
+                    await cache.setex(cache_key, VERIFICATION_TTL, "1")
+                    resp.status = falcon.HTTP_OK
+                case -1:
+                    logging.exception("%s Key exists in Redis and has no TTL (it never expires).", req.uri)
+                    raise falcon.HTTPInternalServerError(description=TRY_ANOTHER_TIME)
+                case _:
+                    raise falcon.HTTPBadRequest(
+                        title="error",
+                        description=EMAIL_TTL_ERROR % ttl_seconds
+                    )
+
+
+class ForgotPasswordResource(BaseVerifyResource):
+    VERIFY_REDIRECT_URL = REDIRECT_UPDATE_PWD_URL
+
+
+class VerifyEmailResource(BaseVerifyResource):
+    VERIFY_REDIRECT_URL = VERIFY_EMAIL_REDIRECT_URL
+
+    def __init__(self, auth_middleware, **kwargs):
+        super().__init__(**kwargs)
+        self._auth_middleware = auth_middleware()
+
+    async def on_post(self, req, resp, email):
+        if not await queries.email_exists(email=email, session=request_session(req)):
+            raise falcon.HTTPNotFound()
+
+        await self._auth_middleware.authenticate_async(req)
+        user_id = req.context.get('user_id')
+        if not user_id:
+            raise falcon.HTTPUnauthorized(description=INVALID_TOKEN)
+
+        data = await req.get_media()
+        errors = CONFIRM_PASSWORD_SCHEMA.validate(data)
+        if errors:
+            resp.status = falcon.HTTP_BAD_REQUEST
+            resp.media = errors
+            return
+
+        async with AsyncUserController(session=request_session(req)) as Users:
+            user = await Users.get_by_id(user_id)
+            if not await verify_password_async(plain_password=data["password"], hashed_password=user.password):
+                raise falcon.HTTPBadRequest(
+                    description=INVALID_CREDENTIALS
+                )
+
+            user.email_verified = True
+            if not await Users.commit():
+                raise falcon.HTTPInternalServerError(description=TRY_ANOTHER_TIME)
+
+        resp.status = falcon.HTTP_OK
+        resp.set_cookie(
+            'user_email_verified',
+            "1",
+            max_age=TOKEN_EXP_SECONDS,
+            path=urlparse(req.url).netloc
+        )
+
+
+class UpdatePasswordResource:
+    def __init__(self, auth_middleware):
+        self._auth_middleware = auth_middleware()
+
+    async def on_post(self, req, resp):
+        await self._auth_middleware.authenticate_async(req)
+        user_id = req.context.get('user_id')
+        if not user_id:
+            raise falcon.HTTPUnauthorized(description=INVALID_TOKEN)
+
+        data = await req.get_media()
+        errors = NEW_PASSWORD_SCHEMA.validate(data)
+        if errors:
+            resp.status = falcon.HTTP_BAD_REQUEST
+            resp.media = errors
+            return
+
+        if not await queries.update_user_pwd(user_id, data['password'], session=request_session(req)):
+            raise falcon.HTTPInternalServerError(description=TRY_ANOTHER_TIME)
+
+        resp.status = falcon.HTTP_OK
+
+
+class HealthResource(health.HealthResource):
+    @staticmethod
+    def engine():
+        return get_async_engine().sync_engine
+
+    async def on_get(self, req, resp):
+        resp.media = self.status()
+
+
+class JWKSResource(jwks.JWKSResource):
+    async def on_get(self, req, resp):
+        self.respond(req, resp)
+
+
+class IntrospectResource(introspect.IntrospectResource):
+    async def on_post(self, req, resp):
+        self._check_access(req)
+        results = self.decode_tokens(await req.get_media())
+        auth_results = self.revocable(results)
+        self.mark_revoked(auth_results, await revoked_tokens_async([result["claims"] for result in auth_results]))
+        resp.media = {"results": results}
+
+
+class ExportResource(export.ExportResource):
+    async def on_get(self, req, resp):
+        encoder, conditions = self.prepare(req, resp)
+        resp.stream = export_users_async(encoder, where=conditions)
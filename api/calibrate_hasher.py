@@ -0,0 +1,21 @@
+import argparse
+
+from api.utils.hashers import HASHERS
+from config import PASSWORD_HASHER
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pick a password hasher cost for the target verify time.")
+    parser.add_argument("--algorithm", choices=sorted(HASHERS), default=PASSWORD_HASHER)
+    parser.add_argument("--target-ms", type=float, default=250)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    hasher = HASHERS[args.algorithm]()
+    cost = hasher.calibrate(args.target_ms, rounds=args.rounds)
+    print(f"PASSWORD_HASHER={hasher.algorithm}")
+    print(f"PASSWORD_HASHER_COST={cost}")
+
+
+if __name__ == '__main__':
+    main()
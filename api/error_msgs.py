@@ -1,9 +1,14 @@
 TOKEN_HAS_EXPIRED = "Token has expired"
+TOKEN_REVOKED = "Token has been revoked"
 INVALID_TOKEN = "Invalid token"
 INVALID_AUTH_HEADER = "Invalid Authorization Key"
 INVALID_CREDENTIALS = "Invalid credentials"
+INTROSPECT_INVALID_BODY = "Expected a list of tokens"
+INTROSPECT_TOO_MANY_TOKENS = "At most %s tokens can be introspected at once"
+INTROSPECT_INVALID_KEY = "Invalid service key"
 
 REQUIRED_FIELD_MISSING = "Required field missing"
+WRONG_FIELD_TYPE = "Must be a %s"
 
 PWD_ERROR_MSGS = {
     "invalid_length": "The minimum password length must be %s",
@@ -21,5 +26,13 @@ EMAIL_ERROR_MSGS = {
 MISSING_FIELDS_FOR_UPDATE = "it is not possible to update with empty fields"
 
 TRY_ANOTHER_TIME = "Please, try another time."
+EXPORT_FORBIDDEN = "Only %s can export users."
+
+IMPORT_INVALID_RECORD = "Must be a JSON object"
+IMPORT_PASSWORD_MISSING = "Either password or password_hash is required"
+IMPORT_UNKNOWN_HASH = "Unknown password hash algorithm"
+IMPORT_WRONG_ROLE = "Must be one of %s"
+IMPORT_WRONG_DATETIME = "Must be an ISO 8601 date"
+SERVICE_OVERLOADED = "Service is overloaded. Please, try again later."
 
 EMAIL_TTL_ERROR = "Code was sent to email. Try after %s seconds"
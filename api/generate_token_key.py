@@ -0,0 +1,37 @@
+import argparse
+import os
+from datetime import date
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+
+from api.utils.token_keys import ASYMMETRIC_ALGORITHMS
+from config import TOKEN_KEYS_DIR
+
+
+def generate_private_key(algorithm: str):
+    if algorithm == "EdDSA":
+        return ed25519.Ed25519PrivateKey.generate()
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a token signing key named by its kid.")
+    parser.add_argument("--algorithm", choices=ASYMMETRIC_ALGORITHMS, default="EdDSA")
+    parser.add_argument("--kid", default=date.today().isoformat())
+    parser.add_argument("--keys-dir", default=TOKEN_KEYS_DIR)
+    args = parser.parse_args()
+
+    private_key = generate_private_key(args.algorithm)
+    os.makedirs(args.keys_dir, exist_ok=True)
+    path = os.path.join(args.keys_dir, f"{args.kid}.pem")
+    with open(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), "wb") as key_file:
+        key_file.write(private_key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        ))
+    print(f"TOKEN_HASH_ALGORITHM={args.algorithm}")
+    print(f"TOKEN_SIGNING_KID={args.kid}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,251 @@
+"""
+Bulk user import from NDJSON or CSV, e.g. when migrating accounts from a legacy system.
+
+    python -m api.import_users users.ndjson --rejects rejects.ndjson
+    python -m api.import_users users.csv --batch-size 5000 --workers 8
+
+Every record needs `email`, `full_name` and either `password_hash`, already hashed with an algorithm
+this service can verify, or a plain `password` that is hashed on a process pool.
+`role`, `email_verified`, `is_active` and `joined_at` are optional.
+Plain passwords are not held to the registration strength rules, the accounts already exist.
+Records whose email is registered between the lookup and the insert are counted as conflicts,
+they are not written to the rejects file.
+"""
+import argparse
+import csv
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice
+from typing import Iterator, TextIO
+
+from api.enums import Role
+from api.error_msgs import (
+    EMAIL_ERROR_MSGS, IMPORT_INVALID_RECORD, IMPORT_PASSWORD_MISSING, IMPORT_UNKNOWN_HASH, IMPORT_WRONG_DATETIME,
+    IMPORT_WRONG_ROLE
+)
+from api.utils.hashers import HASHERS, BasePasswordHasher, get_default_hasher, identify_hasher
+from api.utils.schemas import Field, Schema
+from api.utils.validators import email_format_errors
+from config import IMPORT_BATCH_SIZE
+from dao.controllers import UserController
+
+ROLES = {role.value for role in Role}
+BOOL_VALUES = {"true": True, "1": True, "false": False, "0": False}
+# every column is written explicitly, COPY does not apply the model defaults
+IMPORT_FIELDS = ("email", "password", "full_name", "role", "email_verified", "is_active", "joined_at")
+
+
+def role_errors(role: str) -> list[str]:
+    return [] if role in ROLES else [IMPORT_WRONG_ROLE % ", ".join(sorted(ROLES))]
+
+
+def password_hash_errors(password_hash: str) -> list[str]:
+    return [] if identify_hasher(password_hash) else [IMPORT_UNKNOWN_HASH]
+
+
+def datetime_errors(value: str) -> list[str]:
+    try:
+        datetime.fromisoformat(value)
+    except ValueError:
+        return [IMPORT_WRONG_DATETIME]
+    return []
+
+
+IMPORT_SCHEMA = Schema(
+    Field("email", checks=(email_format_errors,)),
+    Field("full_name"),
+    Field("password", required=False),
+    Field("password_hash", required=False, checks=(password_hash_errors,)),
+    Field("role", required=False, checks=(role_errors,)),
+    Field("email_verified", required=False, type_=bool),
+    Field("is_active", required=False, type_=bool),
+    Field("joined_at", required=False, checks=(datetime_errors,)),
+)
+
+
+def read_ndjson(stream: TextIO) -> Iterator[tuple[int, dict | None]]:
+    for line_number, line in enumerate(stream, start=1):
+        if line.strip():
+            try:
+                yield line_number, json.loads(line)
+            except ValueError:
+                yield line_number, None
+
+
+def read_csv(stream: TextIO) -> Iterator[tuple[int, dict]]:
+    # the header is line 1
+    for line_number, record in enumerate(csv.DictReader(stream), start=2):
+        for field in ("email_verified", "is_active"):
+            value = record.get(field)
+            if value:
+                record[field] = BOOL_VALUES.get(value.lower(), value)
+        yield line_number, record
+
+
+READERS = {
+    "ndjson": read_ndjson,
+    "csv": read_csv,
+}
+
+
+_pool_hasher: BasePasswordHasher | None = None
+
+
+def init_hash_worker(algorithm: str, cost: int):
+    # the parent calibrates once, the pool processes reuse its cost
+    global _pool_hasher
+    _pool_hasher = HASHERS[algorithm](cost=cost)
+
+
+def hash_password(password: str) -> str:
+    return (_pool_hasher or get_default_hasher()).encode(password)
+
+
+class UserImporter:
+    """
+    Imports records batch by batch: schema validation, one query for the emails that are already taken,
+    hashing of plain passwords on `hash_pool`, then one COPY on PostgreSQL or one multi-row
+    INSERT ... ON CONFLICT DO NOTHING elsewhere. Each batch is committed on its own.
+    """
+
+    def __init__(self, users: UserController, hash_pool: ProcessPoolExecutor = None, rejects: TextIO = None,
+                 role: str = Role.client.value, progress: TextIO = sys.stderr):
+        self.users = users
+        self.hash_pool = hash_pool
+        self.rejects = rejects
+        self.role = role
+        self.progress = progress
+        self.use_copy = users.session.get_bind(mapper=users.model).dialect.driver == "psycopg2"
+
+        self._seen_emails = set()
+        self.read = 0
+        self.imported = 0
+        self.rejected = 0
+        self.conflicts = 0
+        self._started = time.perf_counter()
+
+    def reject(self, line_number: int, record: dict | None, errors: dict):
+        self.rejected += 1
+        if self.rejects is not None:
+            email = record.get("email") if isinstance(record, dict) else None
+            self.rejects.write(json.dumps({"line": line_number, "email": email, "errors": errors}) + "\n")
+
+    def _validate(self, batch: list[tuple[int, dict | None]]) -> list[tuple[int, dict]]:
+        valid = []
+        for line_number, record in batch:
+            if not isinstance(record, dict):
+                self.reject(line_number, record, {"record": IMPORT_INVALID_RECORD})
+                continue
+
+            errors = IMPORT_SCHEMA.validate(record)
+            if not errors and not record.get("password") and not record.get("password_hash"):
+                errors = {"password": IMPORT_PASSWORD_MISSING}
+            if not errors and record["email"] in self._seen_emails:
+                errors = {"email": [EMAIL_ERROR_MSGS["already_exists"]]}
+            if errors:
+                self.reject(line_number, record, errors)
+                continue
+
+            self._seen_emails.add(record["email"])
+            valid.append((line_number, record))
+        return valid
+
+    def _hash_passwords(self, records: list[dict]) -> list[str]:
+        to_hash = [record["password"] for record in records if not record.get("password_hash")]
+        if self.hash_pool is not None:
+            hashed = self.hash_pool.map(hash_password, to_hash, chunksize=max(1, len(to_hash) // 64))
+        else:
+            hashed = map(hash_password, to_hash)
+        return [record.get("password_hash") or next(hashed) for record in records]
+
+    def _row(self, record: dict, password_hash: str, now: datetime) -> dict:
+        return {
+            "email": record["email"],
+            "password": password_hash,
+            "full_name": record["full_name"],
+            "role": record.get("role") or self.role,
+            "email_verified": bool(record.get("email_verified")),
+            "is_active": bool(record.get("is_active")),
+            "joined_at": datetime.fromisoformat(record["joined_at"]) if record.get("joined_at") else now,
+        }
+
+    def import_batch(self, batch: list[tuple[int, dict | None]]):
+        self.read += len(batch)
+        valid = self._validate(batch)
+
+        taken = self.users.existing_emails(record["email"] for _, record in valid)
+        for line_number, record in valid:
+            if record["email"] in taken:
+                self.reject(line_number, record, {"email": [EMAIL_ERROR_MSGS["already_exists"]]})
+        records = [record for _, record in valid if record["email"] not in taken]
+
+        now = datetime.utcnow()
+        rows = [self._row(record, password_hash, now)
+                for record, password_hash in zip(records, self._hash_passwords(records))]
+        if self.use_copy:
+            inserted = self.users.copy_insert(rows, IMPORT_FIELDS, conflict_fields=("email",))
+        else:
+            inserted = self.users.insert_many(rows, conflict_fields=("email",))
+        self.imported += inserted
+        # registered between the lookup and the insert
+        self.conflicts += len(rows) - inserted
+
+    def run(self, records: Iterator[tuple[int, dict | None]], batch_size: int = IMPORT_BATCH_SIZE) -> dict:
+        while batch := list(islice(records, batch_size)):
+            self.import_batch(batch)
+            self.report()
+        return self.stats()
+
+    def stats(self) -> dict:
+        elapsed = time.perf_counter() - self._started
+        return {
+            "read": self.read,
+            "imported": self.imported,
+            "rejected": self.rejected,
+            "conflicts": self.conflicts,
+            "seconds": round(elapsed, 2),
+            "per_second": round(self.read / elapsed) if elapsed else 0,
+        }
+
+    def report(self):
+        if self.progress is not None:
+            stats = self.stats()
+            self.progress.write(
+                f"{stats['read']} read, {stats['imported']} imported, {stats['rejected']} rejected, "
+                f"{stats['conflicts']} conflicts, {stats['per_second']} records/s\n"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import users from an NDJSON or CSV file.")
+    parser.add_argument("path", help="input file, - for stdin")
+    parser.add_argument("--format", choices=READERS, help="by default taken from the file extension")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=0, help="hashing processes, 0 means cpu count")
+    parser.add_argument("--role", choices=sorted(ROLES), default=Role.client.value, help="for records without one")
+    parser.add_argument("--rejects", help="write rejected records with their errors to this NDJSON file")
+    args = parser.parse_args()
+
+    input_format = args.format or ("csv" if args.path.endswith(".csv") else "ndjson")
+    stream = sys.stdin if args.path == "-" else open(args.path, newline="" if input_format == "csv" else None)
+    rejects = open(args.rejects, "w") if args.rejects else None
+    hasher = get_default_hasher()
+    try:
+        with UserController() as Users, ProcessPoolExecutor(
+            max_workers=args.workers or None, initializer=init_hash_worker, initargs=(hasher.algorithm, hasher.cost)
+        ) as hash_pool:
+            importer = UserImporter(Users, hash_pool=hash_pool, rejects=rejects, role=args.role)
+            stats = importer.run(READERS[input_format](stream), batch_size=args.batch_size)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+        if rejects is not None:
+            rejects.close()
+    print(json.dumps(stats))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,3 @@
+from api.mailer.outbox import (
+    enqueue_mail, enqueue_mail_html, enqueue_mail_text, enqueue_mail_async, enqueue_mail_html_async
+)
@@ -0,0 +1,20 @@
+import argparse
+import logging
+import signal
+
+from api.mailer.worker import MailWorker
+from config import MAIL_WORKER_CONCURRENCY, MAIL_WORKER_BATCH_SIZE
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Send the messages queued in the mail outbox.")
+    parser.add_argument("--concurrency", type=int, default=MAIL_WORKER_CONCURRENCY)
+    parser.add_argument("--batch-size", type=int, default=MAIL_WORKER_BATCH_SIZE)
+    parser.add_argument("--consumer", default=None, help="consumer name, unique per worker")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    worker = MailWorker(concurrency=args.concurrency, batch_size=args.batch_size, consumer=args.consumer)
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+    signal.signal(signal.SIGINT, lambda *_: worker.stop())
+    worker.run()
@@ -0,0 +1,40 @@
+from typing import Any
+
+from api.utils.send_email import build_message
+from api.utils.templates import render
+from config import MAIL_OUTBOX_DB, MAIL_OUTBOX_STREAM, MAIL_OUTBOX_MAXLEN
+from dao.connections import async_redis_scope, redis_scope
+
+
+def enqueue_mail(email: str, message: str, attempts: int = 0) -> str:
+    with redis_scope(MAIL_OUTBOX_DB) as cache:
+        return cache.xadd(
+            MAIL_OUTBOX_STREAM,
+            {"email": email, "message": message, "attempts": attempts},
+            maxlen=MAIL_OUTBOX_MAXLEN,
+            approximate=True
+        )
+
+
+async def enqueue_mail_async(email: str, message: str, attempts: int = 0) -> str:
+    async with async_redis_scope(MAIL_OUTBOX_DB) as cache:
+        return await cache.xadd(
+            MAIL_OUTBOX_STREAM,
+            {"email": email, "message": message, "attempts": attempts},
+            maxlen=MAIL_OUTBOX_MAXLEN,
+            approximate=True
+        )
+
+
+def enqueue_mail_text(email: str, subject: str, message: str) -> str:
+    return enqueue_mail(email, build_message(email, subject, message))
+
+
+def enqueue_mail_html(email: str, subject: str, template_name: str, context: dict[str, Any]) -> str:
+    html_message = render(template_name, context)
+    return enqueue_mail(email, build_message(email, subject, html_message, 'html'))
+
+
+async def enqueue_mail_html_async(email: str, subject: str, template_name: str, context: dict[str, Any]) -> str:
+    html_message = render(template_name, context)
+    return await enqueue_mail_async(email, build_message(email, subject, html_message, 'html'))
@@ -0,0 +1,151 @@
+import json
+import os
+import random
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from logging import getLogger
+
+import redis
+
+from api.utils.send_email import mail_backend
+from config import (
+    MAIL_OUTBOX_DB, MAIL_OUTBOX_STREAM, MAIL_RETRY_KEY, MAIL_DEAD_LETTER_STREAM, MAIL_CONSUMER_GROUP,
+    MAIL_MAX_ATTEMPTS, MAIL_RETRY_BACKOFF, MAIL_RETRY_BACKOFF_MAX, MAIL_WORKER_CONCURRENCY, MAIL_CLAIM_IDLE_MS,
+    MAIL_OUTBOX_MAXLEN, MAIL_WORKER_BATCH_SIZE
+)
+from dao.connections import redis_scope, redis_pipeline
+
+
+# moves a due retry back to the outbox stream, only the worker that removed it from the set re-adds it
+PROMOTE_RETRY_SCRIPT = """
+if redis.call("ZREM", KEYS[1], ARGV[1]) == 1 then
+    return redis.call("XADD", KEYS[2], "MAXLEN", "~", ARGV[2], "*",
+                      "email", ARGV[3], "message", ARGV[4], "attempts", ARGV[5])
+end
+return false
+"""
+
+
+def retry_delay(attempts: int) -> float:
+    delay = min(MAIL_RETRY_BACKOFF * 2 ** (attempts - 1), MAIL_RETRY_BACKOFF_MAX)
+    return delay + random.uniform(0, delay / 10)
+
+
+class MailWorker:
+    def __init__(self, backend=None, concurrency: int = MAIL_WORKER_CONCURRENCY,
+                 batch_size: int = MAIL_WORKER_BATCH_SIZE, consumer: str = None, block_ms: int = 1000):
+        self.logger = getLogger(self.__class__.__name__)
+        self.backend = backend or mail_backend
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self.block_ms = block_ms
+        self._stopped = threading.Event()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _ensure_group(self):
+        with redis_scope(MAIL_OUTBOX_DB) as cache:
+            try:
+                cache.xgroup_create(MAIL_OUTBOX_STREAM, MAIL_CONSUMER_GROUP, id="0", mkstream=True)
+            except redis.ResponseError as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+
+    def _promote_due_retries(self):
+        with redis_scope(MAIL_OUTBOX_DB) as cache:
+            due = cache.zrangebyscore(MAIL_RETRY_KEY, "-inf", time.time(), start=0, num=100)
+            promote = cache.register_script(PROMOTE_RETRY_SCRIPT)
+            for member in due:
+                data = json.loads(member)
+                promote(
+                    keys=[MAIL_RETRY_KEY, MAIL_OUTBOX_STREAM],
+                    args=[member, MAIL_OUTBOX_MAXLEN, data["email"], data["message"], data["attempts"]]
+                )
+
+    def _read(self) -> list[tuple[str, dict]]:
+        with redis_scope(MAIL_OUTBOX_DB) as cache:
+            claimed = cache.xautoclaim(
+                MAIL_OUTBOX_STREAM, MAIL_CONSUMER_GROUP, self.consumer,
+                min_idle_time=MAIL_CLAIM_IDLE_MS, count=self.concurrency * self.batch_size
+            )
+            # entries deleted from the stream while pending come back without fields
+            entries = [(entry_id, fields) for entry_id, fields in claimed[1] if fields]
+            if entries:
+                return entries
+
+            response = cache.xreadgroup(
+                MAIL_CONSUMER_GROUP, self.consumer, {MAIL_OUTBOX_STREAM: ">"},
+                count=self.concurrency * self.batch_size, block=self.block_ms
+            )
+        return response[0][1] if response else []
+
+    @staticmethod
+    def _parse(fields: dict) -> tuple[str, str, int] | None:
+        try:
+            return fields[b"email"].decode(), fields[b"message"].decode(), int(fields.get(b"attempts", 0))
+        except (KeyError, ValueError):
+            return None
+
+    def handle(self, entries: list[tuple[str, dict]]) -> list[bool]:
+        parsed = [self._parse(fields) for _, fields in entries]
+        messages = [(email, message) for email, message, _ in filter(None, parsed)]
+        errors = iter(self.backend.send_many(messages) if messages else [])
+
+        sent = []
+        with redis_pipeline(MAIL_OUTBOX_DB, transaction=True) as pipeline:
+            for (entry_id, fields), data in zip(entries, parsed):
+                if data is None:
+                    # an entry that can never be sent is dead-lettered instead of blocking the group
+                    self.logger.error("Malformed outbox entry %s: %s", entry_id, fields)
+                    pipeline.xadd(
+                        MAIL_DEAD_LETTER_STREAM, {**fields, "error": "malformed entry"},
+                        maxlen=MAIL_OUTBOX_MAXLEN, approximate=True
+                    )
+                    sent.append(False)
+                else:
+                    email, message, attempts = data
+                    error = next(errors)
+                    if error:
+                        self.logger.warning("Sending to %s failed on attempt %s: %s", email, attempts + 1, error)
+                        self._schedule_retry(pipeline, email, message, attempts + 1, error)
+                    sent.append(error is None)
+                pipeline.xack(MAIL_OUTBOX_STREAM, MAIL_CONSUMER_GROUP, entry_id)
+                pipeline.xdel(MAIL_OUTBOX_STREAM, entry_id)
+        return sent
+
+    @staticmethod
+    def _schedule_retry(pipeline, email: str, message: str, attempts: int, error: Exception):
+        if attempts >= MAIL_MAX_ATTEMPTS:
+            pipeline.xadd(
+                MAIL_DEAD_LETTER_STREAM,
+                {"email": email, "message": message, "attempts": attempts, "error": str(error)},
+                maxlen=MAIL_OUTBOX_MAXLEN,
+                approximate=True
+            )
+        else:
+            retry = json.dumps({"email": email, "message": message, "attempts": attempts})
+            pipeline.zadd(MAIL_RETRY_KEY, {retry: time.time() + retry_delay(attempts)})
+
+    def run(self):
+        self._ensure_group()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            while not self._stopped.is_set():
+                try:
+                    self._promote_due_retries()
+                    entries = self._read()
+                except redis.RedisError as e:
+                    self.logger.exception(e)
+                    self._stopped.wait(self.block_ms / 1000)
+                    continue
+
+                batches = [entries[i:i + self.batch_size] for i in range(0, len(entries), self.batch_size)]
+                for future in [executor.submit(self.handle, batch) for batch in batches]:
+                    # a failed batch stays pending and is claimed again after MAIL_CLAIM_IDLE_MS
+                    try:
+                        future.result()
+                    except Exception as e:
+                        self.logger.exception(e)
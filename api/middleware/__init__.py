@@ -1,2 +1,3 @@
 from api.middleware.authentication import AuthMiddleware
 from api.middleware.auth_verify import VerifyEmailAuthMiddleware
+from api.middleware.db_session import DBSessionMiddleware, request_session
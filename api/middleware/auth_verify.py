@@ -6,6 +6,8 @@ from api.utils.tokens import decode_verify_token
 
 class VerifyEmailAuthMiddleware(AuthMiddleware):
     AUTH_HEADER = "X-VERIFY-TOKEN"
+    # verify tokens are short lived and carry no jti
+    CHECK_REVOCATION = False
 
     @staticmethod
     def token_decoder(token):
@@ -1,12 +1,19 @@
 from falcon.errors import HTTPUnauthorized
 
-from api.error_msgs import INVALID_TOKEN, INVALID_AUTH_HEADER
+from api.error_msgs import INVALID_TOKEN, INVALID_AUTH_HEADER, TOKEN_REVOKED
 from config import TOKEN_AUTH_HEADER
+from api.utils.revocation import is_token_revoked, is_token_revoked_async
+from api.utils.token_cache import VerifiedTokenCache
 from api.utils.tokens import decode_token
 
 
 class AuthMiddleware:
     AUTH_HEADER = "Authorization"
+    CHECK_REVOCATION = True
+
+    def __init__(self):
+        # one cache per middleware, tokens signed with different secrets must never share entries
+        self.token_cache = VerifiedTokenCache(self.token_decoder)
 
     @staticmethod
     def token_decoder(token):
@@ -27,15 +34,37 @@ class AuthMiddleware:
 
         return token
 
-    def process_request(self, req, resp):
+    def _decode(self, req) -> dict | None:
         auth_header_value = self._get_auth_header_value(req)
         if not auth_header_value:
-            return
+            return None
 
         token = self._get_token(auth_value=auth_header_value)
         try:
-            decoded_data = self.token_decoder(token)
+            return self.token_cache.decode(token)
         except ValueError as e:
             raise HTTPUnauthorized(description=str(e))
 
+    def authenticate(self, req):
+        decoded_data = self._decode(req)
+        if decoded_data is None:
+            return
+
+        if self.CHECK_REVOCATION and is_token_revoked(decoded_data):
+            raise HTTPUnauthorized(description=TOKEN_REVOKED)
+
         req.context.update(decoded_data)
+
+    async def authenticate_async(self, req):
+        """Same as authenticate, the revocation check does not block the event loop."""
+        decoded_data = self._decode(req)
+        if decoded_data is None:
+            return
+
+        if self.CHECK_REVOCATION and await is_token_revoked_async(decoded_data):
+            raise HTTPUnauthorized(description=TOKEN_REVOKED)
+
+        req.context.update(decoded_data)
+
+    def process_request(self, req, resp):
+        self.authenticate(req)
@@ -0,0 +1,91 @@
+import threading
+from logging import getLogger
+
+from falcon.util.misc import http_status_to_code
+
+from config import AFTER_COMMIT_RETRIES, AFTER_COMMIT_RETRY_DELAY
+from dao.connections import get_session_factory
+
+logger = getLogger(__name__)
+
+AFTER_COMMIT_KEY = "after_commit"
+
+
+def run_after_commit(callback, attempt: int = 0):
+    """
+    Runs a callback of a committed session. The request has already succeeded, so failures are logged
+    and retried on a timer thread instead of being raised.
+    """
+    try:
+        callback()
+    except Exception as e:
+        if attempt >= AFTER_COMMIT_RETRIES:
+            logger.error("After commit callback %s failed %s times, giving up: %s", callback, attempt + 1, e)
+            return
+        delay = AFTER_COMMIT_RETRY_DELAY * 2 ** attempt
+        logger.warning("After commit callback %s failed: %s, retrying in %s seconds", callback, e, delay)
+        timer = threading.Timer(delay, run_after_commit, (callback, attempt + 1))
+        timer.daemon = True
+        timer.start()
+
+
+class RequestSession:
+    def __init__(self):
+        self._session = None
+
+    @property
+    def session(self):
+        if self._session is None:
+            self._session = get_session_factory()()
+        return self._session
+
+    @property
+    def opened(self) -> bool:
+        return self._session is not None
+
+    def close(self, commit: bool):
+        if self._session is None:
+            return
+
+        callbacks = self._session.info.pop(AFTER_COMMIT_KEY, [])
+        try:
+            if commit:
+                self._session.commit()
+            else:
+                self._session.rollback()
+        except Exception:
+            self._session.rollback()
+            raise
+        finally:
+            self._session.close()
+            self._session = None
+
+        if commit:
+            for callback in callbacks:
+                run_after_commit(callback)
+
+
+def after_commit(session, callback):
+    """
+    Runs `callback` once the request session is committed, dropped on rollback.
+    Without a request session the caller has already committed and it runs right away.
+    """
+    if session is None:
+        run_after_commit(callback)
+    else:
+        session.info.setdefault(AFTER_COMMIT_KEY, []).append(callback)
+
+
+def request_session(req):
+    db = req.context.get("db")
+    return db.session if db else None
+
+
+class DBSessionMiddleware:
+    def process_request(self, req, resp):
+        req.context.db = RequestSession()
+
+    def process_response(self, req, resp, resource, req_succeeded):
+        db = req.context.get("db")
+        if db:
+            db.close(commit=req_succeeded and http_status_to_code(resp.status) < 400)
@@ -1,34 +1,51 @@
+from logging import getLogger
+from functools import partial
 from typing import Any
 
 import falcon
+from sqlalchemy.exc import SQLAlchemyError
 
 from api.enums import Role
 from api.error_msgs import TRY_ANOTHER_TIME, INVALID_CREDENTIALS
+from api.middleware.db_session import after_commit
 from api.utils.hashers import get_hashed_password, verify_password
+from api.utils.revocation import revoke_user_tokens
 from api.utils.tokens import auth_token_for_user, verify_token_for_user
 from dao.controllers import UserController
+from dao.models import User
 
+logger = getLogger(__name__)
 
-def email_exists(email: str) -> bool:
-    with UserController() as Users:
+
+def email_exists(email: str, session=None) -> bool:
+    with UserController(session=session) as Users:
         return Users.email_exists(email=email)
 
 
-def create_client(**client_data) -> str:
+def create_client(session=None, **client_data) -> str | None:
+    """Returns the auth token of the new client, None when the email is already taken."""
     client_data['role'] = Role.client.value
-    with UserController() as Users:
-        new_user = Users.model(**client_data)
-        created = Users.create(new_user)
-        if not created:
+    with UserController(session=session) as Users:
+        try:
+            new_user = Users.register(client_data, returning=Users.projection("token"))
+        except SQLAlchemyError as e:
+            logger.exception(e)
             raise falcon.HTTPInternalServerError(description=TRY_ANOTHER_TIME)
-        return auth_token_for_user(new_user)
+    return auth_token_for_user(new_user) if new_user else None
 
 
-def update_user_pwd(user_id, plain_pwd):
-    with UserController() as Users:
-        user = Users.get_by_id(user_id)
-        user.password = get_hashed_password(plain_pwd)
-        return Users.commit()
+def update_user_pwd(user_id, plain_pwd, session=None) -> bool:
+    hashed_password = get_hashed_password(plain_pwd)
+    with UserController(session=session) as Users:
+        try:
+            updated = Users.update_password(user_id, hashed_password)
+        except SQLAlchemyError as e:
+            logger.exception(e)
+            return False
+    if updated:
+        # sessions opened with the old password end here, published once the new one is committed
+        after_commit(session, partial(revoke_user_tokens, user_id))
+    return updated
 
 
 def collect_user_data(user):
@@ -38,37 +55,41 @@ def collect_user_data(user):
     }
 
 
-def get_user_data(user_id) -> dict | None:
-    with UserController() as Users:
-        user = Users.get_by_id(user_id, fields=("email", "full_name"))
+def get_user_data(user_id, session=None) -> dict | None:
+    with UserController(session=session) as Users:
+        user = Users.get_row_by_id(user_id, fields=Users.projection("profile"))
         if user:
             return collect_user_data(user)
 
 
-def update_user_data(user_id, password: str, updates: dict[str, Any]) -> bool:
-    if not updates:
-        return False
-
+def update_user_data(user_id, password: str, updates: dict[str, Any], session=None) -> dict | None:
+    """Applies the updates once the password matches and returns the updated user data, None on failure."""
     if "password" in updates:
         raise ValueError("updates cannot have a key password!")
 
-    with UserController() as Users:
-        user = Users.get_by_id(_id=user_id)
+    updates = {key: value for key, value in updates.items() if hasattr(User, key)}
+    if not updates:
+        return None
+
+    with UserController(session=session) as Users:
+        user = Users.get_row_by_id(user_id, fields=Users.projection("credentials"))
         if not user:
             raise falcon.HTTPNotFound()
 
         if not verify_password(plain_password=password, hashed_password=user.password):
             raise falcon.HTTPUnauthorized(description=INVALID_CREDENTIALS)
 
-        for key, value in updates.items():
-            if hasattr(user, key):
-                setattr(user, key, value)
-        return Users.commit()
+        try:
+            updated_user = Users.update_returning(user_id, updates, returning=Users.projection("profile"))
+        except SQLAlchemyError as e:
+            logger.exception(e)
+            return None
+    return collect_user_data(updated_user) if updated_user else None
 
 
-def verify_token_by_email(email) -> str | None:
-    with UserController() as Users:
-        user = Users.get_user_by_email(email=email)
+def verify_token_by_email(email, session=None) -> str | None:
+    with UserController(session=session) as Users:
+        user = Users.get_row_by_email(email, fields=Users.projection("token"))
         if not user:
             return
         return verify_token_for_user(user=user)
@@ -4,3 +4,7 @@ from api.resource.user_info import UserInfoResource
 from api.resource.forgot_pwd import ForgotPasswordResource
 from api.resource.update_password import UpdatePasswordResource
 from api.resource.verify_email import VerifyEmailResource
+from api.resource.jwks import JWKSResource
+from api.resource.introspect import IntrospectResource
+from api.resource.export import ExportResource
+from api.resource.health import HealthResource
@@ -3,46 +3,68 @@ from urllib.parse import urlparse
 import falcon
 
 from api.error_msgs import INVALID_CREDENTIALS
-from api.utils.hashers import verify_password
+from api.middleware.db_session import request_session
+from api.utils.hashers import get_hashed_password, needs_rehash, verify_password
+from api.utils.revocation import revoke_token
 from api.utils.tokens import auth_token_for_user
-from api.utils.validators import check_required_fields
-from config import TOKEN_EXP_SECONDS, TOKEN_ENCODE_FIELDS_MAP
+from api.utils.schemas import AUTH_SCHEMA
+from config import TOKEN_EXP_SECONDS
 from dao.controllers import UserController
 
 
+def current_token_claims(req) -> dict:
+    if not req.context.get("jti"):
+        raise falcon.HTTPUnauthorized()
+    return {"jti": req.context.jti, "exp": req.context.exp}
+
+
+def set_auth_cookies(req, resp, user):
+    url = urlparse(req.url)
+    resp.set_cookie(
+        'user_role',
+        user.role,
+        max_age=TOKEN_EXP_SECONDS,
+        domain=url.netloc
+    )
+    resp.set_cookie(
+        'user_email_verified',
+        "1" if user.email_verified else "0",
+        max_age=TOKEN_EXP_SECONDS,
+        domain=url.netloc
+    )
+
+
 class AuthResource:
-    user_data_fields = TOKEN_ENCODE_FIELDS_MAP
-    REQUIRED_FIELDS = ("email", "password")
+    # one SELECT for everything the login reads, the password included
+    user_data_fields = UserController.projection("token", "credentials")
+    SCHEMA = AUTH_SCHEMA
 
     def on_post(self, req, resp):
         data = req.media
 
-        not_found_fields = check_required_fields(data, self.REQUIRED_FIELDS)
-        if not_found_fields:
+        errors = self.SCHEMA.validate(data)
+        if errors:
             resp.status = falcon.HTTP_BAD_REQUEST
-            resp.media = not_found_fields
+            resp.media = errors
             return
 
-        with UserController() as Users:
-            user = Users.get_user_by_email(data["email"], fields=self.user_data_fields.values())
+        with UserController(session=request_session(req)) as Users:
+            user = Users.get_user_by_email(data["email"], fields=self.user_data_fields)
 
             if not user or not verify_password(plain_password=data["password"], hashed_password=user.password):
                 raise falcon.HTTPUnauthorized(description=INVALID_CREDENTIALS)
 
+            if needs_rehash(user.password):
+                user.password = get_hashed_password(data["password"])
+                Users.commit()
+
             token = auth_token_for_user(user=user)
             resp.status = falcon.HTTP_OK
             resp.media = {'token': token}
+            set_auth_cookies(req, resp, user)
 
-            url = urlparse(req.url)
-            resp.set_cookie(
-                'user_role',
-                user.role,
-                max_age=TOKEN_EXP_SECONDS,
-                domain=url.netloc
-            )
-            resp.set_cookie(
-                'user_email_verified',
-                "1" if user.email_verified else "0",
-                max_age=TOKEN_EXP_SECONDS,
-                domain=url.netloc
-            )
+    @staticmethod
+    def on_delete(req, resp):
+        # logout, the token stays revoked until it expires
+        revoke_token(current_token_claims(req))
+        resp.status = falcon.HTTP_NO_CONTENT
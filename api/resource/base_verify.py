@@ -4,9 +4,10 @@ from copy import deepcopy
 import falcon
 
 from api.error_msgs import TRY_ANOTHER_TIME, EMAIL_TTL_ERROR
+from api.mailer import enqueue_mail_html
+from api.middleware.db_session import request_session
 from api.queries import email_exists, verify_token_by_email
 from api.utils import verification_cache_key
-from api.utils.send_email import send_mail_html
 from config import VERIFICATION_TTL, VERIFICATION_CONTEXT
 from dao.connections import redis_scope
 
@@ -19,7 +20,7 @@ class BaseVerifyResource:
         self._redis_db = redis_db
 
     def on_get(self, req, resp, email):
-        if not email_exists(email):
+        if not email_exists(email, session=request_session(req)):
             raise falcon.HTTPNotFound()
 
         cache_key = verification_cache_key(email)
@@ -28,7 +29,7 @@ class BaseVerifyResource:
 
         match ttl_seconds:
             case -2:
-                token = verify_token_by_email(email)
+                token = verify_token_by_email(email, session=request_session(req))
                 if not token:
                     raise falcon.HTTPNotFound()
 
@@ -36,8 +37,7 @@ class BaseVerifyResource:
                 context["url"] = self.VERIFY_REDIRECT_URL % token
 
                 try:
-                    # TODO: task
-                    send_mail_html(
+                    enqueue_mail_html(
                         email=email,
                         subject="Verify your email",
                         template_name="verify_email.html",
@@ -0,0 +1,67 @@
+from datetime import datetime
+
+import falcon
+
+from api.error_msgs import EXPORT_FORBIDDEN
+from api.utils.export import EXPORT_COLUMNS, EXPORT_ENCODERS, export_users
+from config import EXPORT_ROLES
+from dao.controllers import user_conditions
+
+
+class ExportResource:
+    """
+    Streams users to admins as NDJSON or CSV, e.g.
+    GET /admin/users/export?format=csv&columns=id,email&role=client&email_verified=true&joined_after=2024-01-01
+    """
+
+    @staticmethod
+    def _check_access(req):
+        if not req.context.get("user_id"):
+            raise falcon.HTTPUnauthorized()
+        if req.context.get("user_role") not in EXPORT_ROLES:
+            raise falcon.HTTPForbidden(description=EXPORT_FORBIDDEN % ", ".join(EXPORT_ROLES))
+
+    @staticmethod
+    def _get_list(req, name: str) -> list[str] | None:
+        # both ?role=a,b and ?role=a&role=b
+        values = req.get_param_as_list(name)
+        return [item for value in values for item in value.split(",") if item] if values else None
+
+    @staticmethod
+    def _get_datetime(req, name: str) -> datetime | None:
+        value = req.get_param(name)
+        if value is None:
+            return None
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            raise falcon.HTTPInvalidParam("Must be an ISO 8601 date", name)
+
+    def prepare(self, req, resp):
+        """Checks the request and sets the headers, returns the encoder and the WHERE conditions."""
+        self._check_access(req)
+
+        export_format = req.get_param("format", default="ndjson")
+        if export_format not in EXPORT_ENCODERS:
+            raise falcon.HTTPInvalidParam("Must be one of %s" % ", ".join(EXPORT_ENCODERS), "format")
+
+        fields = tuple(self._get_list(req, "columns") or EXPORT_COLUMNS)
+        if not set(fields) <= set(EXPORT_COLUMNS):
+            raise falcon.HTTPInvalidParam("Must be some of %s" % ", ".join(EXPORT_COLUMNS), "columns")
+
+        conditions = user_conditions(
+            roles=self._get_list(req, "role"),
+            email_verified=req.get_param_as_bool("email_verified"),
+            is_active=req.get_param_as_bool("is_active"),
+            joined_after=self._get_datetime(req, "joined_after"),
+            joined_before=self._get_datetime(req, "joined_before"),
+        )
+
+        encoder = EXPORT_ENCODERS[export_format](fields)
+        resp.content_type = encoder.content_type
+        resp.downloadable_as = "users.%s" % encoder.extension
+        return encoder, conditions
+
+    def on_get(self, req, resp):
+        encoder, conditions = self.prepare(req, resp)
+        resp.stream = export_users(encoder, where=conditions)
@@ -0,0 +1,19 @@
+from api.utils.hash_executor import hash_executor
+from dao.connections import db_pool_status, get_engine
+
+
+class HealthResource:
+    """Load of the DB pool and the hash executor, for probes and dashboards."""
+
+    @staticmethod
+    def engine():
+        return get_engine()
+
+    def status(self) -> dict:
+        return {
+            "db_pool": db_pool_status(self.engine()),
+            "hash_executor": hash_executor.stats(),
+        }
+
+    def on_get(self, req, resp):
+        resp.media = self.status()
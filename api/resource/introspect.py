@@ -0,0 +1,92 @@
+import hmac
+import time
+
+import falcon
+
+from api.error_msgs import (
+    INTROSPECT_INVALID_BODY, INTROSPECT_INVALID_KEY, INTROSPECT_TOO_MANY_TOKENS, INVALID_TOKEN, TOKEN_REVOKED
+)
+from api.utils.revocation import revoked_tokens
+from api.utils.token_cache import VerifiedTokenCache
+from api.utils.tokens import decode_token, decode_verify_token
+from config import INTROSPECT_KEYS, INTROSPECT_MAX_TOKENS
+
+TOKEN_DECODERS = {
+    "auth": decode_token,
+    "verify": decode_verify_token,
+}
+
+
+class IntrospectResource:
+    """
+    Validates a batch of tokens in one request, body: {"tokens": ["<token>", {"token": "<token>", "type": "verify"}]}.
+    Results keep the order of the request. Only services with one of the INTROSPECT_KEYS in the X-SERVICE-KEY
+    header may call it.
+    """
+
+    SERVICE_KEY_HEADER = "X-SERVICE-KEY"
+
+    def __init__(self):
+        self.token_caches = {kind: VerifiedTokenCache(decoder) for kind, decoder in TOKEN_DECODERS.items()}
+
+    def _check_access(self, req):
+        key = req.get_header(self.SERVICE_KEY_HEADER) or ""
+        if not any(hmac.compare_digest(key.encode(), allowed.encode()) for allowed in INTROSPECT_KEYS):
+            raise falcon.HTTPUnauthorized(description=INTROSPECT_INVALID_KEY)
+
+    @staticmethod
+    def _get_tokens(data) -> list[tuple[str, str]]:
+        tokens = data.get("tokens") if isinstance(data, dict) else None
+        if not isinstance(tokens, list):
+            raise falcon.HTTPBadRequest(description=INTROSPECT_INVALID_BODY)
+        if len(tokens) > INTROSPECT_MAX_TOKENS:
+            raise falcon.HTTPBadRequest(description=INTROSPECT_TOO_MANY_TOKENS % INTROSPECT_MAX_TOKENS)
+
+        return [
+            (item.get("token"), item.get("type", "auth")) if isinstance(item, dict) else (item, "auth")
+            for item in tokens
+        ]
+
+    def _introspect_token(self, token, kind: str, now: float) -> dict:
+        token_cache = self.token_caches.get(kind)
+        if token_cache is None or not isinstance(token, str):
+            return {"active": False, "error": INVALID_TOKEN}
+
+        try:
+            claims = token_cache.decode(token)
+        except ValueError as e:
+            return {"active": False, "error": str(e)}
+
+        result = {"active": True, "type": kind, "claims": claims}
+        # tokens without exp never expire
+        if claims.get("exp") is not None:
+            result["ttl"] = max(int(claims["exp"] - now), 0)
+        return result
+
+    def decode_tokens(self, data) -> list[dict]:
+        """Results of every token before the revocation check."""
+        tokens = self._get_tokens(data)
+        now = time.time()
+        return [self._introspect_token(token, kind, now) for token, kind in tokens]
+
+    @staticmethod
+    def revocable(results: list[dict]) -> list[dict]:
+        return [result for result in results if result["active"] and result["type"] == "auth"]
+
+    @staticmethod
+    def mark_revoked(results: list[dict], revoked: list[bool]):
+        for result, is_revoked in zip(results, revoked):
+            if is_revoked:
+                result.clear()
+                result.update(active=False, error=TOKEN_REVOKED)
+
+    def introspect(self, data) -> dict:
+        results = self.decode_tokens(data)
+        # one revocation lookup for the whole batch
+        auth_results = self.revocable(results)
+        self.mark_revoked(auth_results, revoked_tokens([result["claims"] for result in auth_results]))
+        return {"results": results}
+
+    def on_post(self, req, resp):
+        self._check_access(req)
+        resp.media = self.introspect(req.media)
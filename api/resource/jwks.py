@@ -0,0 +1,35 @@
+import hashlib
+import json
+
+import falcon
+
+from api.utils.token_keys import get_keyring, is_asymmetric
+from config import TOKEN_JWKS_MAX_AGE
+
+
+class JWKSResource:
+    """Public keys for offline token verification, served from memory with a long Cache-Control."""
+
+    def __init__(self):
+        self._body = None
+        self._etag = None
+
+    def _load(self):
+        if self._body is None:
+            body = get_keyring().jwks_json() if is_asymmetric() else json.dumps({"keys": []})
+            self._etag = hashlib.sha256(body.encode()).hexdigest()[:32]
+            self._body = body
+
+    def respond(self, req, resp):
+        self._load()
+        resp.cache_control = ["public", "max-age=%s" % TOKEN_JWKS_MAX_AGE]
+        resp.etag = self._etag
+        if req.if_none_match and self._etag in req.if_none_match:
+            resp.status = falcon.HTTP_NOT_MODIFIED
+            return
+
+        resp.content_type = falcon.MEDIA_JSON
+        resp.text = self._body
+
+    def on_get(self, req, resp):
+        self.respond(req, resp)
@@ -1,42 +1,34 @@
 import falcon
 
+from api.error_msgs import EMAIL_ERROR_MSGS
+from api.middleware.db_session import request_session
 from api.utils.hashers import get_hashed_password
 from api.queries import create_client
-from api.utils.validators import check_required_fields, PasswordValidator, EmailValidator
+from api.utils.schemas import REGISTER_SCHEMA
 
 
 class RegisterResource:
-    REQUIRED_FIELDS = ('email', 'password', 'full_name')
+    SCHEMA = REGISTER_SCHEMA
 
     def on_post(self, req, resp):
         data = req.get_media()
 
-        not_found_fields = check_required_fields(data, self.REQUIRED_FIELDS)
-        if not_found_fields:
+        errors = self.SCHEMA.validate(data)
+        if errors:
             resp.status = falcon.HTTP_BAD_REQUEST
-            resp.media = not_found_fields
-            return
-
-        email = data['email'] or ""
-        validator = EmailValidator(email=email)
-        email_error_msgs = validator.validate()
-        if email_error_msgs:
-            resp.status = falcon.HTTP_BAD_REQUEST
-            resp.media = {"email": email_error_msgs}
-            return
-
-        password = data['password']
-        pwd_validator = PasswordValidator(password)
-        pwd_error_msgs = pwd_validator.validate()
-        if pwd_error_msgs:
-            resp.status = falcon.HTTP_BAD_REQUEST
-            resp.media = {"password": email_error_msgs}
+            resp.media = errors
             return
 
+        # a taken email is reported by the insert itself, no separate lookup
         token = create_client(
-            email=email,
-            password=get_hashed_password(password),
+            session=request_session(req),
+            email=data['email'],
+            password=get_hashed_password(data['password']),
             full_name=data['full_name']
         )
+        if token is None:
+            resp.status = falcon.HTTP_BAD_REQUEST
+            resp.media = {"email": [EMAIL_ERROR_MSGS["already_exists"]]}
+            return
         resp.status = falcon.HTTP_OK
         resp.media = {'token': token}
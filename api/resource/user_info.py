@@ -1,8 +1,9 @@
 import falcon
 
-from api.error_msgs import MISSING_FIELDS_FOR_UPDATE, TRY_ANOTHER_TIME
-from api.queries import get_user_data, update_user_data
-from api.utils.validators import EmailValidator, check_required_fields
+from api.error_msgs import EMAIL_ERROR_MSGS, MISSING_FIELDS_FOR_UPDATE, TRY_ANOTHER_TIME
+from api.middleware.db_session import request_session
+from api.queries import email_exists, get_user_data, update_user_data
+from api.utils.schemas import USER_UPDATE_SCHEMA
 
 
 class UserInfoResource:
@@ -14,7 +15,7 @@ class UserInfoResource:
         if not user_id:
             raise falcon.HTTPUnauthorized()
 
-        user_data = get_user_data(user_id)
+        user_data = get_user_data(user_id, session=request_session(req))
         if not user_data:
             raise falcon.HTTPNotFound()
 
@@ -27,24 +28,19 @@ class UserInfoResource:
             raise falcon.HTTPUnauthorized()
 
         data = req.media
-        not_found_required_fields = check_required_fields(data, ("password",))
-        if not_found_required_fields:
+        errors = USER_UPDATE_SCHEMA.validate(data)
+        email = data.get("email") if not errors else None
+        if email and email_exists(email, session=request_session(req)):
+            errors = {"email": [EMAIL_ERROR_MSGS["already_exists"]]}
+        if errors:
             resp.status = falcon.HTTP_BAD_REQUEST
-            resp.media = not_found_required_fields
+            resp.media = errors
             return
 
         collected_update_fields = {}
-        email = data.get("email")
         full_name = data.get("full_name")
 
         if email:
-            validator = EmailValidator(email=email)
-            email_error_msgs = validator.validate()
-            if email_error_msgs:
-                resp.status = falcon.HTTP_BAD_REQUEST
-                resp.media = {"email": email_error_msgs}
-                return
-
             collected_update_fields["email"] = email
             # TODO: send verification message to email
 
@@ -57,8 +53,9 @@ class UserInfoResource:
                 description=MISSING_FIELDS_FOR_UPDATE
             )
 
-        if not update_user_data(user_id, data["password"], collected_update_fields):
+        user_data = update_user_data(user_id, data["password"], collected_update_fields, session=request_session(req))
+        if not user_data:
             raise falcon.HTTPInternalServerError(description=TRY_ANOTHER_TIME)
 
         resp.status = falcon.HTTP_OK
-        resp.media = get_user_data(user_id)
+        resp.media = user_data
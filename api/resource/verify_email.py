@@ -2,11 +2,12 @@ from urllib.parse import urlparse
 
 import falcon
 
-from api.error_msgs import INVALID_TOKEN, INVALID_CREDENTIALS
+from api.error_msgs import INVALID_TOKEN, INVALID_CREDENTIALS, TRY_ANOTHER_TIME
+from api.middleware.db_session import request_session
 from api.queries import email_exists
 from api.resource.base_verify import BaseVerifyResource
 from api.utils.hashers import verify_password
-from api.utils.validators import check_required_fields
+from api.utils.schemas import CONFIRM_PASSWORD_SCHEMA
 from config import TOKEN_EXP_SECONDS, VERIFY_EMAIL_REDIRECT_URL
 from dao.controllers import UserController
 
@@ -16,25 +17,25 @@ class VerifyEmailResource(BaseVerifyResource):
 
     def __init__(self, auth_middleware, **kwargs):
         super().__init__(**kwargs)
-        self._auth_middleware = auth_middleware
+        self._auth_middleware = auth_middleware()
 
     def on_post(self, req, resp, email):
-        if not email_exists(email=email):
+        if not email_exists(email=email, session=request_session(req)):
             raise falcon.HTTPNotFound()
 
-        self._auth_middleware().process_request(req=req, resp=resp)
+        self._auth_middleware.process_request(req=req, resp=resp)
         user_id = req.context.get('user_id')
         if not user_id:
             raise falcon.HTTPUnauthorized(description=INVALID_TOKEN)
 
         data = req.media
-        not_found_fields = check_required_fields(data, ('password',))
-        if not_found_fields:
+        errors = CONFIRM_PASSWORD_SCHEMA.validate(data)
+        if errors:
             resp.status = falcon.HTTP_BAD_REQUEST
-            resp.media = not_found_fields
+            resp.media = errors
             return
 
-        with UserController() as Users:
+        with UserController(session=request_session(req)) as Users:
             user = Users.get_by_id(user_id)
             if not verify_password(plain_password=data["password"], hashed_password=user.password):
                 raise falcon.HTTPBadRequest(
@@ -42,7 +43,8 @@ class VerifyEmailResource(BaseVerifyResource):
                 )
 
             user.email_verified = True
-            Users.session.commit()
+            if not Users.commit():
+                raise falcon.HTTPInternalServerError(description=TRY_ANOTHER_TIME)
 
         resp.status = falcon.HTTP_OK
         resp.set_cookie(
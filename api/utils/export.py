@@ -0,0 +1,104 @@
+import csv
+import io
+import json
+from contextlib import closing
+from datetime import datetime
+from itertools import islice
+from typing import AsyncIterator, Iterable, Iterator
+
+from config import EXPORT_CHUNK_ROWS
+from dao.controllers import AsyncUserController, UserController
+
+try:
+    import orjson
+except ImportError:  # orjson is optional
+    orjson = None
+
+# the password hash never leaves the service
+EXPORT_COLUMNS = ("id", "email", "full_name", "role", "email_verified", "is_active", "joined_at")
+# spreadsheets run cells starting with these as formulas
+CSV_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError("%s is not JSON serializable" % type(value).__name__)
+
+
+def _dumps_line(record: dict) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(record, default=_json_default, separators=(",", ":")) + "\n").encode()
+
+
+class NDJSONEncoder:
+    content_type = "application/x-ndjson"
+    extension = "ndjson"
+
+    def __init__(self, fields: tuple[str, ...]):
+        self.fields = fields
+
+    def header(self) -> bytes:
+        return b""
+
+    def encode(self, rows: Iterable) -> bytes:
+        return b"".join(_dumps_line(dict(zip(self.fields, row))) for row in rows)
+
+
+def _csv_safe(value):
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+class CSVEncoder:
+    content_type = "text/csv; charset=utf-8"
+    extension = "csv"
+
+    def __init__(self, fields: tuple[str, ...]):
+        self.fields = fields
+
+    def _write(self, rows: Iterable) -> bytes:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue().encode()
+
+    def header(self) -> bytes:
+        return self._write([self.fields])
+
+    def encode(self, rows: Iterable) -> bytes:
+        return self._write([_csv_safe(value) for value in row] for row in rows)
+
+
+EXPORT_ENCODERS = {
+    "ndjson": NDJSONEncoder,
+    "csv": CSVEncoder,
+}
+
+
+def export_users(encoder, where: Iterable = (), chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[bytes]:
+    """
+    Encoded chunks of the matching users, read through a server-side cursor.
+    The stream outlives the request, so it opens and closes its own session.
+    """
+    if header := encoder.header():
+        yield header
+    with UserController() as Users, closing(Users.iter_all(encoder.fields, where=where)) as rows:
+        while chunk := list(islice(rows, chunk_rows)):
+            yield encoder.encode(chunk)
+
+
+async def export_users_async(encoder, where: Iterable = (),
+                             chunk_rows: int = EXPORT_CHUNK_ROWS) -> AsyncIterator[bytes]:
+    if header := encoder.header():
+        yield header
+    async with AsyncUserController() as Users:
+        chunk = []
+        async for row in Users.iter_all(encoder.fields, where=where):
+            chunk.append(row)
+            if len(chunk) >= chunk_rows:
+                yield encoder.encode(chunk)
+                chunk = []
+        if chunk:
+            yield encoder.encode(chunk)
@@ -0,0 +1,127 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable
+
+from config import HASH_EXECUTOR_KIND, HASH_EXECUTOR_WORKERS, HASH_EXECUTOR_QUEUE_SIZE, HASH_EXECUTOR_TIMEOUT
+
+
+class HashExecutorOverloaded(Exception):
+    pass
+
+
+class HashExecutor:
+    """
+    Runs CPU-bound password hashing on a bounded pool of workers.
+
+    Bcrypt releases the GIL, so the thread pool already scales to every core;
+    the process pool is available for hashers that do not.
+    """
+
+    def __init__(self, kind: str = HASH_EXECUTOR_KIND, workers: int = HASH_EXECUTOR_WORKERS,
+                 queue_size: int = HASH_EXECUTOR_QUEUE_SIZE, timeout: float = HASH_EXECUTOR_TIMEOUT):
+        assert kind in ("thread", "process"), "unknown hash executor kind %s" % kind
+        self.kind = kind
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.timeout = timeout
+
+        self._executor = None
+        self._lock = threading.Lock()
+        # at most `workers` jobs running plus `queue_size` jobs waiting
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue_size)
+        self._in_flight = 0
+        self._submitted = 0
+        self._rejected = 0
+        self._completed = 0
+        self._total_latency = 0.0
+        self._max_latency = 0.0
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    pool_class = ThreadPoolExecutor if self.kind == "thread" else ProcessPoolExecutor
+                    self._executor = pool_class(max_workers=self.workers)
+        return self._executor
+
+    def submit(self, fn: Callable, *args) -> Future:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise HashExecutorOverloaded()
+
+        started = time.perf_counter()
+        with self._lock:
+            self._in_flight += 1
+            self._submitted += 1
+
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._release(started)
+            raise
+
+        future.add_done_callback(lambda _: self._release(started))
+        return future
+
+    def _release(self, started: float):
+        latency = time.perf_counter() - started
+        with self._lock:
+            self._in_flight -= 1
+            self._completed += 1
+            self._total_latency += latency
+            self._max_latency = max(self._max_latency, latency)
+        self._slots.release()
+
+    def run(self, fn: Callable, *args) -> Any:
+        future = self.submit(fn, *args)
+        try:
+            return future.result(timeout=self.timeout or None)
+        except FutureTimeoutError:
+            # a job still waiting in the queue gives its slot back
+            future.cancel()
+            raise HashExecutorOverloaded()
+
+    async def run_async(self, fn: Callable, *args) -> Any:
+        future = asyncio.wrap_future(self.submit(fn, *args))
+        try:
+            return await asyncio.wait_for(future, timeout=self.timeout or None)
+        except asyncio.TimeoutError:
+            raise HashExecutorOverloaded()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "kind": self.kind,
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "in_flight": self._in_flight,
+                "queue_depth": max(self._in_flight - self.workers, 0),
+                "submitted": self._submitted,
+                "rejected": self._rejected,
+                "completed": self._completed,
+                "avg_latency": self._total_latency / self._completed if self._completed else 0.0,
+                "max_latency": self._max_latency,
+            }
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def _reset_after_fork(self):
+        # worker threads do not survive fork, the child must build its own pool
+        self._executor = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue_size)
+        self._in_flight = 0
+
+
+hash_executor = HashExecutor()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=hash_executor._reset_after_fork)
@@ -1,9 +1,274 @@
+import base64
+import hashlib
+import hmac
+import os
+import time
+from abc import ABC, abstractmethod
+from logging import getLogger
+
 import bcrypt
 
+from api.utils.hash_executor import hash_executor
+from config import PASSWORD_HASHER, PASSWORD_HASHER_COST, PASSWORD_HASHER_TARGET_MS
+
+try:
+    import argon2
+except ImportError:  # argon2-cffi is optional
+    argon2 = None
+
+logger = getLogger(__name__)
+
+
+class BasePasswordHasher(ABC):
+    algorithm = None
+    default_cost = None
+    min_cost = None
+    max_cost = None
+
+    def __init__(self, cost: int = None):
+        self.cost = cost or self.default_cost
+        assert self.min_cost <= self.cost <= self.max_cost, \
+            "%s cost must be between %s and %s" % (self.algorithm, self.min_cost, self.max_cost)
+
+    @abstractmethod
+    def encode(self, password: str) -> str:
+        pass
+
+    @abstractmethod
+    def verify(self, password: str, encoded: str) -> bool:
+        pass
+
+    @abstractmethod
+    def get_cost(self, encoded: str) -> int | None:
+        pass
+
+    def identify(self, encoded: str) -> bool:
+        return encoded.startswith(f"${self.algorithm}$")
+
+    def needs_update(self, encoded: str) -> bool:
+        # only upgrades, a hash stronger than the configured cost is kept
+        cost = self.get_cost(encoded)
+        return cost is None or cost < self.cost
+
+    def with_cost(self, cost: int):
+        return self.__class__(cost=cost)
+
+    def calibrate(self, target_ms: float, rounds: int = 3) -> int:
+        """Returns the highest cost whose verify time stays within `target_ms` on this machine."""
+        best = self.min_cost
+        for cost in range(self.min_cost, self.max_cost + 1):
+            hasher = self.with_cost(cost)
+            encoded = hasher.encode("calibration-password")
+            started = time.perf_counter()
+            for _ in range(rounds):
+                hasher.verify("calibration-password", encoded)
+            elapsed_ms = (time.perf_counter() - started) * 1000 / rounds
+            if elapsed_ms > target_ms:
+                break
+            best = cost
+        return best
+
+
+class BCryptHasher(BasePasswordHasher):
+    algorithm = "bcrypt"
+    default_cost = 12
+    min_cost = 10
+    max_cost = 31
+
+    def encode(self, password: str) -> str:
+        return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=self.cost)).decode()
+
+    def verify(self, password: str, encoded: str) -> bool:
+        # bcrypt panics instead of raising on hashes shorter than the 60 characters of the format
+        if len(encoded) != 60:
+            return False
+        try:
+            return bcrypt.checkpw(password.encode(), encoded.encode())
+        except ValueError:
+            return False
+
+    def get_cost(self, encoded: str) -> int | None:
+        try:
+            return int(encoded.split("$")[2])
+        except (IndexError, ValueError):
+            return None
+
+    def identify(self, encoded: str) -> bool:
+        return encoded[:4] in ("$2a$", "$2b$", "$2y$")
+
+
+class ScryptHasher(BasePasswordHasher):
+    # cost is log2 of the scrypt N parameter
+    algorithm = "scrypt"
+    default_cost = 15
+    min_cost = 14
+    max_cost = 22
+    block_size = 8
+    parallelism = 1
+
+    def _derive(self, password: str, salt: bytes, cost: int, block_size: int, parallelism: int) -> bytes:
+        n = 2 ** cost
+        return hashlib.scrypt(
+            password.encode(), salt=salt, n=n, r=block_size, p=parallelism,
+            maxmem=256 * n * block_size, dklen=32
+        )
+
+    def encode(self, password: str) -> str:
+        salt = os.urandom(16)
+        hashed = self._derive(password, salt, self.cost, self.block_size, self.parallelism)
+        return "$scrypt$ln=%s,r=%s,p=%s$%s$%s" % (
+            self.cost, self.block_size, self.parallelism,
+            base64.b64encode(salt).decode(), base64.b64encode(hashed).decode()
+        )
+
+    @staticmethod
+    def _decode(encoded: str) -> tuple[dict[str, int], bytes, bytes]:
+        _, _, params, salt, hashed = encoded.split("$")
+        params = {key: int(value) for key, value in (param.split("=") for param in params.split(","))}
+        return params, base64.b64decode(salt), base64.b64decode(hashed)
+
+    def verify(self, password: str, encoded: str) -> bool:
+        try:
+            params, salt, hashed = self._decode(encoded)
+            derived = self._derive(password, salt, params["ln"], params["r"], params["p"])
+        except (ValueError, KeyError):
+            # malformed hash or parameters scrypt refuses
+            return False
+        return hmac.compare_digest(derived, hashed)
+
+    def get_cost(self, encoded: str) -> int | None:
+        try:
+            return self._decode(encoded)[0]["ln"]
+        except (ValueError, KeyError):
+            return None
+
+    def needs_update(self, encoded: str) -> bool:
+        try:
+            params = self._decode(encoded)[0]
+            return params["ln"] < self.cost or params["r"] < self.block_size or params["p"] < self.parallelism
+        except (ValueError, KeyError):
+            return True
+
+
+class Argon2Hasher(BasePasswordHasher):
+    # cost is the argon2 time cost, memory and parallelism use the argon2-cffi defaults
+    algorithm = "argon2id"
+    default_cost = 3
+    min_cost = 2
+    max_cost = 20
+
+    def __init__(self, cost: int = None):
+        assert argon2 is not None, "argon2-cffi must be installed to use the argon2id hasher"
+        super().__init__(cost=cost)
+        self._hasher = argon2.PasswordHasher(time_cost=self.cost, type=argon2.Type.ID)
+
+    def encode(self, password: str) -> str:
+        return self._hasher.hash(password)
+
+    def verify(self, password: str, encoded: str) -> bool:
+        try:
+            return self._hasher.verify(encoded, password)
+        except argon2.exceptions.VerificationError:
+            return False
+        except argon2.exceptions.InvalidHashError:
+            return False
+
+    def get_cost(self, encoded: str) -> int | None:
+        try:
+            return argon2.extract_parameters(encoded).time_cost
+        except argon2.exceptions.InvalidHashError:
+            return None
+
+    def needs_update(self, encoded: str) -> bool:
+        try:
+            params = argon2.extract_parameters(encoded)
+        except argon2.exceptions.InvalidHashError:
+            return True
+        return (
+            params.time_cost < self.cost
+            or params.memory_cost < self._hasher.memory_cost
+            or params.parallelism < self._hasher.parallelism
+        )
+
+
+HASHERS: dict[str, type[BasePasswordHasher]] = {}
+
+
+def register_hasher(hasher_class: type[BasePasswordHasher]) -> type[BasePasswordHasher]:
+    HASHERS[hasher_class.algorithm] = hasher_class
+    return hasher_class
+
+
+register_hasher(BCryptHasher)
+register_hasher(ScryptHasher)
+if argon2 is not None:
+    register_hasher(Argon2Hasher)
+
+
+_default_hasher = None
+
+
+def get_default_hasher() -> BasePasswordHasher:
+    global _default_hasher
+
+    if _default_hasher is None:
+        hasher = HASHERS[PASSWORD_HASHER](cost=PASSWORD_HASHER_COST or None)
+        if PASSWORD_HASHER_TARGET_MS and not PASSWORD_HASHER_COST:
+            hasher = hasher.with_cost(hasher.calibrate(PASSWORD_HASHER_TARGET_MS))
+            # machines calibrating to different costs would rehash each other's passwords on every upgrade,
+            # `python3 -m api.calibrate_hasher` once and a pinned PASSWORD_HASHER_COST keep one cost everywhere
+            logger.warning(
+                "%s hasher calibrated to cost %s, pin PASSWORD_HASHER_COST=%s",
+                hasher.algorithm, hasher.cost, hasher.cost
+            )
+        _default_hasher = hasher
+    return _default_hasher
+
+
+def _to_str(encoded: str | bytes) -> str:
+    return encoded.decode() if isinstance(encoded, bytes) else encoded
+
+
+def identify_hasher(encoded: str | bytes) -> BasePasswordHasher | None:
+    encoded = _to_str(encoded)
+    default_hasher = get_default_hasher()
+    if default_hasher.identify(encoded):
+        return default_hasher
+
+    for hasher_class in HASHERS.values():
+        hasher = hasher_class()
+        if hasher.identify(encoded):
+            return hasher
+
+
+def needs_rehash(encoded: str | bytes) -> bool:
+    encoded = _to_str(encoded)
+    default_hasher = get_default_hasher()
+    return not default_hasher.identify(encoded) or default_hasher.needs_update(encoded)
+
+
+def _get_verifier(plain_password: str, encoded: str | bytes):
+    encoded = _to_str(encoded)
+    hasher = identify_hasher(encoded)
+    if hasher is None:
+        logger.warning("Unknown password hash algorithm")
+        return None
+    return hasher.verify, plain_password, encoded
+
+
+def get_hashed_password(password: str) -> str:
+    return hash_executor.run(get_default_hasher().encode, password)
+
+
+def verify_password(plain_password: str, hashed_password: str | bytes) -> bool:
+    verifier = _get_verifier(plain_password, hashed_password)
+    return bool(verifier) and hash_executor.run(*verifier)
+
 
-def get_hashed_password(password: str):
-    return bcrypt.hashpw(password.encode(), bcrypt.gensalt())
+async def get_hashed_password_async(password: str) -> str:
+    return await hash_executor.run_async(get_default_hasher().encode, password)
 
 
-def verify_password(plain_password: str, hashed_password: bytes):
-    return bcrypt.checkpw(plain_password.encode(), hashed_password)
+async def verify_password_async(plain_password: str, hashed_password: str | bytes) -> bool:
+    verifier = _get_verifier(plain_password, hashed_password)
+    return bool(verifier) and await hash_executor.run_async(*verifier)
@@ -0,0 +1,134 @@
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import time
+from calendar import timegm
+from datetime import datetime
+from typing import Any
+
+import jwt
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, the stdlib encoder produces the same bytes
+    orjson = None
+
+
+def base64url_encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def base64url_decode(data: bytes) -> bytes:
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+
+# exact types orjson writes byte for byte like json.dumps, floats are formatted differently
+_PLAIN_TYPES = frozenset((str, int, bool, type(None)))
+
+
+def _is_plain(value) -> bool:
+    value_type = type(value)
+    if value_type in _PLAIN_TYPES:
+        return True
+    if value_type is dict:
+        return all(type(key) is str and _is_plain(item) for key, item in value.items())
+    if value_type is list:
+        return all(_is_plain(item) for item in value)
+    return False
+
+
+def dumps(payload: dict[str, Any]) -> bytes:
+    # PyJWT writes the payload with json.dumps and ensure_ascii, orjson matches it byte for byte
+    # as long as the output is plain ascii and holds only json native types.
+    # Anything else, e.g. a datetime outside the time claims, goes to json.dumps and fails like in PyJWT
+    if orjson is not None and _is_plain(payload):
+        encoded = orjson.dumps(payload)
+        if encoded.isascii():
+            return encoded
+    return json.dumps(payload, separators=(",", ":")).encode()
+
+
+def loads(data: bytes):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+class HS256Codec:
+    """
+    HS256 tokens for a fixed secret, byte compatible with jwt.encode / jwt.decode.
+
+    The header segment is encoded once and the keyed HMAC state is copied instead of rebuilt per token.
+    Tokens with any other header, e.g. an extra `kid`, are handed to PyJWT.
+    """
+
+    algorithm = "HS256"
+    HEADER_SEGMENT = base64url_encode(
+        json.dumps({"typ": "JWT", "alg": algorithm}, separators=(",", ":"), sort_keys=True).encode()
+    )
+
+    def __init__(self, secret: str | bytes):
+        self.secret = secret.encode() if isinstance(secret, str) else secret
+        self._mac = hmac.new(self.secret, digestmod=hashlib.sha256)
+
+    def _sign(self, signing_input: bytes) -> bytes:
+        mac = self._mac.copy()
+        mac.update(signing_input)
+        return mac.digest()
+
+    @staticmethod
+    def _time_claims_to_int(payload: dict[str, Any]) -> dict[str, Any]:
+        for claim in ("exp", "iat", "nbf"):
+            if isinstance(payload.get(claim), datetime):
+                payload = {**payload, claim: timegm(payload[claim].utctimetuple())}
+        return payload
+
+    def encode(self, payload: dict[str, Any]) -> str:
+        payload = self._time_claims_to_int(payload)
+        signing_input = self.HEADER_SEGMENT + b"." + base64url_encode(dumps(payload))
+        return (signing_input + b"." + base64url_encode(self._sign(signing_input))).decode()
+
+    @staticmethod
+    def _validate_claims(payload: dict[str, Any]):
+        now = time.time()
+        try:
+            exp = int(payload["exp"]) if "exp" in payload else None
+            iat = int(payload["iat"]) if "iat" in payload else None
+            nbf = int(payload["nbf"]) if "nbf" in payload else None
+        except (TypeError, ValueError):
+            raise jwt.DecodeError("Time claims must be integers.")
+
+        if iat is not None and iat > now:
+            raise jwt.ImmatureSignatureError("The token is not yet valid (iat)")
+        if nbf is not None and nbf > now:
+            raise jwt.ImmatureSignatureError("The token is not yet valid (nbf)")
+        if exp is not None and exp <= now:
+            raise jwt.ExpiredSignatureError("Signature has expired")
+
+    def decode(self, token: str) -> dict[str, Any]:
+        token = token.encode() if isinstance(token, str) else token
+        try:
+            signing_input, signature = token.rsplit(b".", 1)
+            header_segment, payload_segment = signing_input.split(b".", 1)
+        except ValueError:
+            raise jwt.DecodeError("Not enough segments")
+
+        if header_segment != self.HEADER_SEGMENT:
+            return jwt.decode(token, self.secret, algorithms=[self.algorithm])
+
+        try:
+            signature = base64url_decode(signature)
+        except (TypeError, binascii.Error):
+            raise jwt.DecodeError("Invalid crypto padding")
+        if not hmac.compare_digest(signature, self._sign(signing_input)):
+            raise jwt.InvalidSignatureError("Signature verification failed")
+
+        try:
+            payload = loads(base64url_decode(payload_segment))
+        except (TypeError, ValueError, binascii.Error):
+            raise jwt.DecodeError("Invalid payload")
+        if not isinstance(payload, dict):
+            raise jwt.DecodeError("Invalid payload string: must be a json object")
+
+        self._validate_claims(payload)
+        return payload
@@ -0,0 +1,87 @@
+from logging import getLogger
+
+import falcon
+from falcon import errors
+from falcon.media import BaseHandler, JSONHandler
+
+from config import JSON_BACKEND
+
+try:
+    import orjson
+except ImportError:  # orjson is optional
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # msgspec is optional
+    msgspec = None
+
+logger = getLogger(__name__)
+
+
+class BytesJSONHandler(BaseHandler):
+    """JSON handler for libraries that read and write bytes, the body is never decoded to str."""
+
+    def __init__(self, dumps, loads, decode_errors: tuple[type[Exception], ...] = (ValueError,)):
+        self._dumps = dumps
+        self._loads = loads
+        self._decode_errors = decode_errors
+        self._serialize_sync = self.serialize
+        self._deserialize_sync = self._deserialize
+
+    def _deserialize(self, data: bytes):
+        if not data:
+            raise errors.MediaNotFoundError("JSON")
+        try:
+            return self._loads(data)
+        except self._decode_errors as err:
+            raise errors.MediaMalformedError("JSON") from err
+
+    def deserialize(self, stream, content_type, content_length):
+        return self._deserialize(stream.read())
+
+    async def deserialize_async(self, stream, content_type, content_length):
+        return self._deserialize(await stream.read())
+
+    def serialize(self, media, content_type=None) -> bytes:
+        return self._dumps(media)
+
+    async def serialize_async(self, media, content_type) -> bytes:
+        return self._dumps(media)
+
+
+def _orjson_handler() -> BaseHandler:
+    return BytesJSONHandler(orjson.dumps, orjson.loads)
+
+
+def _msgspec_handler() -> BaseHandler:
+    return BytesJSONHandler(msgspec.json.encode, msgspec.json.decode, decode_errors=(msgspec.DecodeError,))
+
+
+def _json_handler() -> BaseHandler:
+    return JSONHandler()
+
+
+JSON_HANDLERS = {
+    "orjson": (lambda: orjson is not None, _orjson_handler),
+    "msgspec": (lambda: msgspec is not None, _msgspec_handler),
+    "json": (lambda: True, _json_handler),
+}
+
+
+def get_json_handler(backend: str = JSON_BACKEND) -> BaseHandler:
+    if backend == "auto":
+        backend = next(name for name, (available, _) in JSON_HANDLERS.items() if available())
+
+    assert backend in JSON_HANDLERS, "unknown json backend %s" % backend
+    available, create_handler = JSON_HANDLERS[backend]
+    assert available(), "%s must be installed to use it as the json backend" % backend
+    return create_handler()
+
+
+def install_media_handlers(app, backend: str = JSON_BACKEND):
+    """Serializes request, response and error bodies of `app` with the `backend` json library."""
+    handler = get_json_handler(backend)
+    app.req_options.media_handlers[falcon.MEDIA_JSON] = handler
+    app.resp_options.media_handlers[falcon.MEDIA_JSON] = handler
+    logger.debug("JSON media handled by %s", type(handler).__name__)
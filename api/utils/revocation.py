@@ -0,0 +1,331 @@
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from logging import getLogger
+from typing import Iterator
+
+import redis
+
+from config import (
+    REVOCATION_ENABLED, REVOCATION_DB, REVOCATION_CHANNEL, REVOCATION_BLOOM_CAPACITY, REVOCATION_BLOOM_ERROR_RATE,
+    REVOCATION_RESYNC_INTERVAL, TOKEN_EXP_SECONDS
+)
+from dao.connections import async_redis_scope, redis_pipeline, redis_scope
+
+logger = getLogger(__name__)
+
+JTI_KEY_PREFIX = "revoked:jti:"
+USER_KEY_PREFIX = "revoked:user:"
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+def _issued_at(claims: dict) -> float | None:
+    # tokens issued before revocation existed carry no iat
+    if "iat" in claims:
+        return claims["iat"]
+    if "exp" in claims:
+        return claims["exp"] - TOKEN_EXP_SECONDS
+    return None
+
+
+def _issued_before(claims: dict, watermark: float) -> bool:
+    # iat has whole seconds, a token issued in the same second as the revocation is revoked as well.
+    # Without iat and exp the issue time is unknown, such tokens are revoked with every watermark of the user
+    issued_at = _issued_at(claims)
+    return issued_at is None or issued_at <= watermark
+
+
+class RevocationList:
+    """
+    Revoked tokens, by `jti` or by a per user "issued before" watermark, stored in Redis with TTLs matching
+    the token lifetime.
+
+    Every worker keeps a bloom filter of revoked ids and the watermarks in memory, kept current by a pub/sub
+    listener thread and a full reload every `resync_interval`. Tokens that are not revoked are answered from
+    memory, only bloom filter hits are confirmed in Redis. Until the first load finishes every check goes
+    to Redis. While Redis is unreachable the local state keeps serving checks, and bloom filter hits count
+    as revoked.
+    """
+
+    def __init__(self, db: int = REVOCATION_DB, channel: str = REVOCATION_CHANNEL,
+                 capacity: int = REVOCATION_BLOOM_CAPACITY, error_rate: float = REVOCATION_BLOOM_ERROR_RATE,
+                 resync_interval: int = REVOCATION_RESYNC_INTERVAL):
+        self.db = db
+        self.channel = channel
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.resync_interval = resync_interval
+
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._watermarks: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._loaded = threading.Event()
+        self._listener = None
+        self._stopped = threading.Event()
+
+    def _apply(self, event: dict):
+        with self._lock:
+            if event.get("jti"):
+                self._bloom.add(event["jti"])
+            if event.get("user_id") is not None:
+                user_id = str(event["user_id"])
+                self._watermarks[user_id] = max(self._watermarks.get(user_id, 0), int(event["before"]))
+
+    def _revoke_token_commands(self, pipeline, jti: str, exp: float) -> dict | None:
+        ttl = math.ceil(exp - time.time())
+        if ttl <= 0:
+            return None
+
+        event = {"jti": jti}
+        pipeline.set(JTI_KEY_PREFIX + jti, 1, ex=ttl)
+        pipeline.publish(self.channel, json.dumps(event))
+        return event
+
+    def _revoke_user_commands(self, pipeline, user_id, issued_before: float = None) -> dict:
+        event = {"user_id": str(user_id), "before": int(issued_before or time.time())}
+        pipeline.set(USER_KEY_PREFIX + event["user_id"], event["before"], ex=TOKEN_EXP_SECONDS)
+        pipeline.publish(self.channel, json.dumps(event))
+        return event
+
+    def revoke_token(self, jti: str, exp: float):
+        with redis_pipeline(self.db, transaction=True) as pipeline:
+            event = self._revoke_token_commands(pipeline, jti, exp)
+        if event:
+            self._apply(event)
+
+    def revoke_user(self, user_id, issued_before: float = None):
+        """Revokes every token of the user issued before `issued_before`, now by default."""
+        with redis_pipeline(self.db, transaction=True) as pipeline:
+            event = self._revoke_user_commands(pipeline, user_id, issued_before)
+        self._apply(event)
+
+    async def revoke_token_async(self, jti: str, exp: float):
+        async with async_redis_scope(self.db) as cache:
+            async with cache.pipeline(transaction=True) as pipeline:
+                event = self._revoke_token_commands(pipeline, jti, exp)
+                if event:
+                    await pipeline.execute()
+        if event:
+            self._apply(event)
+
+    async def revoke_user_async(self, user_id, issued_before: float = None):
+        async with async_redis_scope(self.db) as cache:
+            async with cache.pipeline(transaction=True) as pipeline:
+                event = self._revoke_user_commands(pipeline, user_id, issued_before)
+                await pipeline.execute()
+        self._apply(event)
+
+    def load(self):
+        """Rebuilds the local state from Redis, dropping entries whose keys have expired."""
+        bloom = BloomFilter(self.capacity, self.error_rate)
+        watermarks = {}
+        with redis_scope(self.db) as cache:
+            for key in cache.scan_iter(match=JTI_KEY_PREFIX + "*", count=1000):
+                bloom.add(key.decode()[len(JTI_KEY_PREFIX):])
+
+            user_keys = list(cache.scan_iter(match=USER_KEY_PREFIX + "*", count=1000))
+            for key, before in zip(user_keys, cache.mget(user_keys) if user_keys else ()):
+                if before is not None:
+                    watermarks[key.decode()[len(USER_KEY_PREFIX):]] = int(before)
+
+        with self._lock:
+            self._bloom, self._watermarks = bloom, watermarks
+        self._loaded.set()
+
+    def _listen(self):
+        retry_delay = 1
+        while not self._stopped.is_set():
+            try:
+                with redis_scope(self.db) as cache:
+                    pubsub = cache.pubsub(ignore_subscribe_messages=True)
+                    try:
+                        # subscribe before loading so nothing published in between is missed
+                        pubsub.subscribe(self.channel)
+                        self.load()
+                        retry_delay = 1
+                        next_resync = time.monotonic() + self.resync_interval
+                        while not self._stopped.is_set():
+                            message = pubsub.get_message(timeout=1.0)
+                            if message and message["type"] == "message":
+                                self._apply(json.loads(message["data"]))
+                            if time.monotonic() >= next_resync:
+                                self.load()
+                                next_resync = time.monotonic() + self.resync_interval
+                    finally:
+                        pubsub.close()
+            except (redis.RedisError, OSError) as e:
+                logger.warning("Revocation listener disconnected: %s, retrying in %s seconds", e, retry_delay)
+                self._stopped.wait(retry_delay)
+                retry_delay = min(retry_delay * 2, 60)
+
+    def start(self):
+        if self._listener is None:
+            with self._lock:
+                if self._listener is None:
+                    self._listener = threading.Thread(target=self._listen, name="revocation-listener", daemon=True)
+                    self._listener.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _locally_revoked(self, claims: dict) -> tuple[bool, bool]:
+        """Returns (revoked, needs a Redis check)."""
+        if not self._loaded.is_set():
+            return False, True
+
+        user_id = claims.get("user_id")
+        watermark = self._watermarks.get(str(user_id)) if user_id is not None else None
+        if watermark is not None and _issued_before(claims, watermark):
+            return True, False
+
+        jti = claims.get("jti")
+        return False, jti is not None and jti in self._bloom
+
+    @staticmethod
+    def _check_commands(pipeline, claims: dict):
+        if claims.get("jti"):
+            pipeline.exists(JTI_KEY_PREFIX + claims["jti"])
+        pipeline.get(USER_KEY_PREFIX + str(claims.get("user_id")))
+
+    @staticmethod
+    def _checked_revoked(claims: dict, replies: Iterator) -> bool:
+        jti_revoked = bool(next(replies)) if claims.get("jti") else False
+        watermark = next(replies)
+        if jti_revoked:
+            return True
+        return claims.get("user_id") is not None and watermark is not None and _issued_before(claims, int(watermark))
+
+    def _local_results(self, claims_list: list[dict]) -> tuple[list[bool], list[int]]:
+        """Returns the local answer of every token and the indexes that need a Redis check."""
+        self.start()
+        results = [self._locally_revoked(claims) for claims in claims_list]
+        return [result for result, _ in results], [index for index, (_, check) in enumerate(results) if check]
+
+    def _check_failed(self, revoked: list[bool], to_check: list[int], loaded: bool) -> list[bool]:
+        # once loaded only bloom filter hits get here, before that the empty local state answers
+        if loaded:
+            logger.warning("Revocation check failed, %s tokens treated as revoked", len(to_check))
+            for index in to_check:
+                revoked[index] = True
+        return revoked
+
+    def _checked_results(self, claims_list: list[dict], revoked: list[bool], to_check: list[int],
+                         replies: list) -> list[bool]:
+        replies = iter(replies)
+        for index in to_check:
+            revoked[index] = self._checked_revoked(claims_list[index], replies)
+        return revoked
+
+    def is_revoked(self, claims: dict) -> bool:
+        return self.revoked_many([claims])[0]
+
+    def revoked_many(self, claims_list: list[dict]) -> list[bool]:
+        """Whether each token is revoked, with at most one Redis round trip for the whole batch."""
+        loaded = self._loaded.is_set()
+        revoked, to_check = self._local_results(claims_list)
+        if not to_check:
+            return revoked
+
+        try:
+            with redis_pipeline(self.db) as pipeline:
+                for index in to_check:
+                    self._check_commands(pipeline, claims_list[index])
+                replies = pipeline.execute()
+        except redis.RedisError:
+            return self._check_failed(revoked, to_check, loaded)
+        return self._checked_results(claims_list, revoked, to_check, replies)
+
+    async def is_revoked_async(self, claims: dict) -> bool:
+        return (await self.revoked_many_async([claims]))[0]
+
+    async def revoked_many_async(self, claims_list: list[dict]) -> list[bool]:
+        """Same as revoked_many without blocking the event loop on the Redis round trip."""
+        loaded = self._loaded.is_set()
+        revoked, to_check = self._local_results(claims_list)
+        if not to_check:
+            return revoked
+
+        try:
+            async with async_redis_scope(self.db) as cache:
+                async with cache.pipeline(transaction=False) as pipeline:
+                    for index in to_check:
+                        self._check_commands(pipeline, claims_list[index])
+                    replies = await pipeline.execute()
+        except redis.RedisError:
+            return self._check_failed(revoked, to_check, loaded)
+        return self._checked_results(claims_list, revoked, to_check, replies)
+
+    def _reset_after_fork(self):
+        # the listener thread does not survive fork, the child starts its own on first use
+        self._lock = threading.Lock()
+        loaded, self._loaded = self._loaded.is_set(), threading.Event()
+        if loaded:
+            self._loaded.set()
+        self._listener = None
+
+
+revocation_list = RevocationList()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=revocation_list._reset_after_fork)
+
+
+def is_token_revoked(claims: dict) -> bool:
+    return REVOCATION_ENABLED and revocation_list.is_revoked(claims)
+
+
+def revoked_tokens(claims_list: list[dict]) -> list[bool]:
+    if not REVOCATION_ENABLED:
+        return [False] * len(claims_list)
+    return revocation_list.revoked_many(claims_list)
+
+
+async def is_token_revoked_async(claims: dict) -> bool:
+    return REVOCATION_ENABLED and await revocation_list.is_revoked_async(claims)
+
+
+async def revoked_tokens_async(claims_list: list[dict]) -> list[bool]:
+    if not REVOCATION_ENABLED:
+        return [False] * len(claims_list)
+    return await revocation_list.revoked_many_async(claims_list)
+
+
+def revoke_token(claims: dict):
+    if REVOCATION_ENABLED and claims.get("jti"):
+        revocation_list.revoke_token(claims["jti"], claims["exp"])
+
+
+async def revoke_token_async(claims: dict):
+    if REVOCATION_ENABLED and claims.get("jti"):
+        await revocation_list.revoke_token_async(claims["jti"], claims["exp"])
+
+
+def revoke_user_tokens(user_id, issued_before: float = None):
+    if REVOCATION_ENABLED:
+        revocation_list.revoke_user(user_id, issued_before)
+
+
+async def revoke_user_tokens_async(user_id, issued_before: float = None):
+    if REVOCATION_ENABLED:
+        await revocation_list.revoke_user_async(user_id, issued_before)
@@ -0,0 +1,72 @@
+from typing import Any, Callable
+
+from api.error_msgs import REQUIRED_FIELD_MISSING, WRONG_FIELD_TYPE
+from api.utils.validators import email_format_errors, password_errors
+
+TYPE_NAMES = {str: "string", int: "integer", bool: "boolean"}
+
+
+class Field:
+    def __init__(self, name: str, required: bool = True, type_: type = str,
+                 checks: tuple[Callable[[Any], list[str]], ...] = ()):
+        self.name = name
+        self.required = required
+        self.type = type_
+        self.checks = checks
+
+
+class Schema:
+    """
+    Request body shape declared once per resource.
+
+    `validate` checks every field in one pass and returns all errors, keyed by field:
+    missing fields map to REQUIRED_FIELD_MISSING, invalid ones to their list of messages.
+    Only cheap in-process checks belong here, checks that hit the database run after a clean result.
+    """
+
+    def __init__(self, *fields: Field):
+        self.fields = fields
+        # flattened once so validation is a single loop over tuples
+        self._compiled = tuple(
+            (field.name, field.required, field.type, self._type_error(field.type), field.checks) for field in fields
+        )
+
+    @staticmethod
+    def _type_error(type_: type) -> list[str]:
+        return [WRONG_FIELD_TYPE % TYPE_NAMES.get(type_, type_.__name__)]
+
+    def validate(self, data) -> dict[str, str | list[str]]:
+        if not isinstance(data, dict):
+            data = {}
+
+        errors = {}
+        for name, required, type_, type_error, checks in self._compiled:
+            value = data.get(name)
+            if value is None or value == "":
+                if required:
+                    errors[name] = REQUIRED_FIELD_MISSING
+                continue
+
+            if not isinstance(value, type_):
+                errors[name] = type_error.copy()
+                continue
+
+            msgs = [msg for check in checks for msg in check(value)]
+            if msgs:
+                errors[name] = msgs
+        return errors
+
+
+AUTH_SCHEMA = Schema(Field("email"), Field("password"))
+REGISTER_SCHEMA = Schema(
+    Field("email", checks=(email_format_errors,)),
+    Field("password", checks=(password_errors,)),
+    Field("full_name"),
+)
+USER_UPDATE_SCHEMA = Schema(
+    Field("password"),
+    Field("email", required=False, checks=(email_format_errors,)),
+    Field("full_name", required=False),
+)
+CONFIRM_PASSWORD_SCHEMA = Schema(Field("password"))
+NEW_PASSWORD_SCHEMA = Schema(Field("password", checks=(password_errors,)))
@@ -1,46 +1,174 @@
+import os
+import queue
 import smtplib
+import threading
+import time
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
-from typing import Any
+from logging import getLogger
+from typing import Any, Iterable
 
-from jinja2 import Environment, FileSystemLoader
+from api.utils.templates import render
+from config import (
+    SMTP_EMAIL, SMTP_SERVER, SMTP_PORT, SMTP_PASSWORD, MAIL_BACKEND, SMTP_POOL_SIZE, SMTP_TIMEOUT,
+    SMTP_IDLE_TIMEOUT, SMTP_MAX_MESSAGES_PER_CONNECTION
+)
 
-from config import SMTP_EMAIL, SMTP_SERVER, SMTP_PORT, SMTP_PASSWORD, TEMPLATES_DIR
+# connection level failures after which the connection is dropped and the message retried on a new one
+SMTP_CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, TimeoutError)
 
 
-def send_mail_text(email: str, subject: str, message: str):
-    msg = MIMEMultipart()
-    msg['From'] = SMTP_EMAIL
-    msg['To'] = email
-    msg['Subject'] = subject
-    msg.attach(MIMEText(message, 'plain'))
+class SMTPConnection:
+    def __init__(self):
+        self.server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=SMTP_TIMEOUT)
+        self.server.starttls()
+        self.server.login(SMTP_EMAIL, SMTP_PASSWORD)
+        self.sent = 0
+        self.last_used = time.monotonic()
 
-    server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
-    server.starttls()
-    server.login(SMTP_EMAIL, SMTP_PASSWORD)
-    server.sendmail(SMTP_EMAIL, email, msg.as_string())
-    server.quit()
+    @property
+    def usable(self) -> bool:
+        return (
+            self.sent < SMTP_MAX_MESSAGES_PER_CONNECTION
+            and time.monotonic() - self.last_used < SMTP_IDLE_TIMEOUT
+        )
 
+    def send(self, email: str, message: str):
+        self.server.sendmail(SMTP_EMAIL, email, message)
+        self.sent += 1
+        self.last_used = time.monotonic()
 
-def send_mail_html(email: str, subject: str, template_name: str, context: dict[str, Any]):
-    server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
-    server.starttls()
-    server.login(SMTP_EMAIL, SMTP_PASSWORD)
+    def close(self):
+        try:
+            self.server.quit()
+        except (smtplib.SMTPException, OSError):
+            self.server.close()
+
+
+class SMTPBackend:
+    """Keeps up to `pool_size` authenticated connections open and reuses them between messages."""
+
+    def __init__(self, pool_size: int = SMTP_POOL_SIZE):
+        self.logger = getLogger(self.__class__.__name__)
+        self.pool_size = pool_size
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(pool_size)
+
+    def _get_connection(self) -> SMTPConnection:
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                return SMTPConnection()
+            if connection.usable:
+                return connection
+            connection.close()
+
+    def _send(self, connection: SMTPConnection | None, email: str, message: str):
+        for attempt in range(2):
+            if connection is None or not connection.usable:
+                if connection is not None:
+                    connection.close()
+                try:
+                    connection = self._get_connection()
+                except (smtplib.SMTPException, OSError) as e:
+                    return None, e
+
+            try:
+                connection.send(email, message)
+                return connection, None
+            except SMTP_CONNECTION_ERRORS as e:
+                # a pooled connection may have been dropped by the server, reconnect once
+                self.logger.warning("SMTP connection lost: %s", e)
+                connection.close()
+                connection = None
+                if attempt:
+                    return None, e
+            except smtplib.SMTPException as e:
+                return connection, e
+
+    def send_many(self, messages: Iterable[tuple[str, str]]) -> list[Exception | None]:
+        """Sends (email, message) pairs over one connection and returns the error of every message or None."""
+        errors = []
+        with self._slots:
+            connection = None
+            try:
+                for email, message in messages:
+                    connection, error = self._send(connection, email, message)
+                    errors.append(error)
+            except Exception:
+                if connection is not None:
+                    connection.close()
+                raise
+            if connection is not None:
+                self._idle.put(connection)
+        return errors
+
+    def send(self, email: str, message: str):
+        error = self.send_many([(email, message)])[0]
+        if error:
+            raise error
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
 
-    env = Environment(loader=FileSystemLoader(TEMPLATES_DIR))
-    template = env.get_template(template_name)
-    html_message = template.render(context)
+    def _reset_after_fork(self):
+        # connections opened by the parent process stay with the parent
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.pool_size)
 
+
+class MemoryBackend:
+    # local stand-in for the SMTP server, keeps sent messages for tests
+    def __init__(self):
+        self.outbox: list[tuple[str, str]] = []
+
+    def send_many(self, messages: Iterable[tuple[str, str]]) -> list[Exception | None]:
+        errors = []
+        for email, message in messages:
+            self.outbox.append((email, message))
+            errors.append(None)
+        return errors
+
+    def send(self, email: str, message: str):
+        self.send_many([(email, message)])
+
+
+MAIL_BACKENDS = {
+    "smtp": SMTPBackend,
+    "memory": MemoryBackend,
+}
+
+mail_backend = MAIL_BACKENDS[MAIL_BACKEND]()
+
+if hasattr(os, "register_at_fork") and isinstance(mail_backend, SMTPBackend):
+    os.register_at_fork(after_in_child=mail_backend._reset_after_fork)
+
+
+def build_message(email: str, subject: str, body: str, subtype: str = 'plain') -> str:
     msg = MIMEMultipart()
     msg['From'] = SMTP_EMAIL
     msg['To'] = email
     msg['Subject'] = subject
+    msg.attach(MIMEText(body, subtype))
+    return msg.as_string()
+
 
-    html_part = MIMEText(html_message, 'html')
-    msg.attach(html_part)
+def send_many(messages: Iterable[tuple[str, str]]) -> list[Exception | None]:
+    return mail_backend.send_many(messages)
 
-    server.sendmail(SMTP_EMAIL, email, msg.as_string())
-    server.quit()
+
+def send_mail_text(email: str, subject: str, message: str):
+    mail_backend.send(email, build_message(email, subject, message))
+
+
+def send_mail_html(email: str, subject: str, template_name: str, context: dict[str, Any]):
+    html_message = render(template_name, context)
+    mail_backend.send(email, build_message(email, subject, html_message, 'html'))
 
 
 if __name__ == '__main__':
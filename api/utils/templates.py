@@ -0,0 +1,35 @@
+from typing import Any
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+from config import TEMPLATES_DIR, TEMPLATES_AUTO_RELOAD, TEMPLATES_BYTECODE_CACHE_DIR
+
+
+def create_environment() -> Environment:
+    bytecode_cache = None
+    if TEMPLATES_BYTECODE_CACHE_DIR:
+        TEMPLATES_BYTECODE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        bytecode_cache = FileSystemBytecodeCache(str(TEMPLATES_BYTECODE_CACHE_DIR))
+
+    return Environment(
+        loader=FileSystemLoader(TEMPLATES_DIR),
+        # templates only change on deploy, checking their mtime on every render is dev mode only
+        auto_reload=TEMPLATES_AUTO_RELOAD,
+        bytecode_cache=bytecode_cache,
+        cache_size=-1,
+    )
+
+
+env = create_environment()
+
+
+def precompile():
+    for template_name in env.list_templates():
+        env.get_template(template_name)
+
+
+def render(template_name: str, context: dict[str, Any]) -> str:
+    return env.get_template(template_name).render(context)
+
+
+precompile()
@@ -0,0 +1,85 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable
+
+from config import TOKEN_CACHE_SIZE
+
+
+class VerifiedTokenCache:
+    """
+    Keeps the claims of already verified tokens so repeated requests skip the signature check.
+
+    Entries are keyed by a digest of the token, dropped once their `exp` has passed
+    and evicted least recently used first when the cache is full.
+    Only successfully decoded tokens are stored, failures always reach the decoder.
+    """
+
+    def __init__(self, decoder: Callable[[str], dict], max_size: int = TOKEN_CACHE_SIZE):
+        self.decoder = decoder
+        self.max_size = max_size
+
+        self._entries: OrderedDict[bytes, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expired = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def decode(self, token: str) -> dict:
+        if self.max_size <= 0:
+            return self.decoder(token)
+
+        key = self._key(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, claims = entry
+                if now < expires_at:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return dict(claims)
+                del self._entries[key]
+                self._expired += 1
+            self._misses += 1
+
+        claims = self.decoder(token)
+        expires_at = claims.get("exp")
+        if isinstance(expires_at, (int, float)) and now < expires_at:
+            self._store(key, expires_at, claims)
+        return claims
+
+    def _store(self, key: bytes, expires_at: float, claims: dict):
+        with self._lock:
+            self._entries[key] = (expires_at, dict(claims))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def discard(self, token: str):
+        with self._lock:
+            self._entries.pop(self._key(token), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": self._hits / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+                "expired": self._expired,
+            }
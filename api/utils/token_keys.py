@@ -0,0 +1,100 @@
+import json
+import os
+from logging import getLogger
+
+from jwt.algorithms import has_crypto
+
+from config import TOKEN_HASH_ALGORITHM, TOKEN_KEYS_DIR, TOKEN_SIGNING_KID
+
+if has_crypto:
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ed448, ed25519, rsa
+    from jwt.algorithms import OKPAlgorithm, RSAAlgorithm
+else:  # cryptography is optional, only asymmetric algorithms need it
+    serialization = None
+
+logger = getLogger(__name__)
+
+ASYMMETRIC_ALGORITHMS = ("EdDSA", "RS256")
+
+
+def is_asymmetric(algorithm: str = TOKEN_HASH_ALGORITHM) -> bool:
+    return algorithm in ASYMMETRIC_ALGORITHMS
+
+
+class TokenKeyring:
+    """
+    Signing and verification keys for asymmetric tokens, identified by `kid`.
+
+    Rotation: add the new public key first so downstream services see it in the JWKS,
+    then the private key to start signing with it, and drop the old key
+    once the tokens it signed have expired.
+    """
+
+    def __init__(self, algorithm: str = TOKEN_HASH_ALGORITHM, signing_kid: str = TOKEN_SIGNING_KID):
+        assert is_asymmetric(algorithm), "%s is not an asymmetric algorithm" % algorithm
+        assert serialization is not None, "cryptography must be installed to sign tokens with %s" % algorithm
+        self.algorithm = algorithm
+        self.signing_kid = signing_kid
+        self._private_keys = {}
+        self._public_keys = {}
+        self._jwks = None
+
+    def _check_key_type(self, kid: str, public_key):
+        key_types = (ed25519.Ed25519PublicKey, ed448.Ed448PublicKey) if self.algorithm == "EdDSA" \
+            else (rsa.RSAPublicKey,)
+        assert isinstance(public_key, key_types), "key %s can not be used with %s" % (kid, self.algorithm)
+
+    def add_key(self, kid: str, pem: bytes):
+        if b"PRIVATE KEY" in pem:
+            private_key = serialization.load_pem_private_key(pem, password=None)
+            public_key = private_key.public_key()
+            self._private_keys[kid] = private_key
+        else:
+            public_key = serialization.load_pem_public_key(pem)
+        self._check_key_type(kid, public_key)
+        self._public_keys[kid] = public_key
+        self._jwks = None
+
+    def load_dir(self, keys_dir: str = TOKEN_KEYS_DIR):
+        for file_name in sorted(os.listdir(keys_dir)):
+            kid, extension = os.path.splitext(file_name)
+            if extension == ".pem":
+                with open(os.path.join(keys_dir, file_name), "rb") as key_file:
+                    self.add_key(kid, key_file.read())
+        return self
+
+    @property
+    def signing_key(self) -> tuple[str, object]:
+        kid = self.signing_kid or max(self._private_keys, default=None)
+        assert kid in self._private_keys, "no private key to sign tokens with"
+        return kid, self._private_keys[kid]
+
+    def verification_key(self, kid: str | None):
+        return self._public_keys.get(kid)
+
+    def jwks(self) -> dict:
+        if self._jwks is None:
+            algorithm_class = OKPAlgorithm if self.algorithm == "EdDSA" else RSAAlgorithm
+            keys = []
+            for kid, public_key in self._public_keys.items():
+                jwk = algorithm_class.to_jwk(public_key, as_dict=True)
+                jwk.update(kid=kid, alg=self.algorithm, use="sig")
+                keys.append(jwk)
+            self._jwks = {"keys": keys}
+        return self._jwks
+
+    def jwks_json(self) -> str:
+        return json.dumps(self.jwks(), sort_keys=True)
+
+
+_keyring = None
+
+
+def get_keyring() -> TokenKeyring:
+    global _keyring
+
+    if _keyring is None:
+        _keyring = TokenKeyring().load_dir()
+        logger.info("Loaded %s token keys, signing with %s", len(_keyring.jwks()["keys"]), _keyring.signing_key[0])
+    return _keyring
@@ -1,14 +1,48 @@
-from datetime import datetime, timedelta
+import time
+import uuid
+from operator import attrgetter
 
 import jwt
 
 from api.error_msgs import TOKEN_HAS_EXPIRED, INVALID_TOKEN
+from api.utils.jwt_codec import HS256Codec
+from api.utils.token_keys import get_keyring, is_asymmetric
 from config import TOKEN_HASH_ALGORITHM, SECRET_KEY, VERIFY_SECRET_KEY, TOKEN_EXP_SECONDS, TOKEN_ENCODE_FIELDS_MAP
 
+# tokens signed with an explicit secret (verify tokens) never leave the service and stay symmetric
+SECRET_ALGORITHM = "HS256" if is_asymmetric() else TOKEN_HASH_ALGORITHM
+
+_codecs: dict[str, HS256Codec] = {}
+
+
+def get_codec(secret: str) -> HS256Codec | None:
+    if SECRET_ALGORITHM != HS256Codec.algorithm:
+        return None
+
+    codec = _codecs.get(secret)
+    if codec is None:
+        codec = _codecs[secret] = HS256Codec(secret)
+    return codec
+
+
+def _verification_key(token, secret: str = None):
+    if secret or not is_asymmetric():
+        return secret or SECRET_KEY, SECRET_ALGORITHM
+
+    key = get_keyring().verification_key(jwt.get_unverified_header(token).get("kid"))
+    if key is None:
+        raise jwt.InvalidTokenError("unknown key id")
+    return key, TOKEN_HASH_ALGORITHM
+
 
 def decode_token(token, secret: str = None) -> dict:
     try:
-        return jwt.decode(token, secret or SECRET_KEY, algorithms=[TOKEN_HASH_ALGORITHM])
+        codec = get_codec(secret or SECRET_KEY) if secret or not is_asymmetric() else None
+        if codec is not None:
+            return codec.decode(token)
+
+        key, algorithm = _verification_key(token, secret)
+        return jwt.decode(token, key, algorithms=[algorithm])
     except jwt.ExpiredSignatureError:
         raise ValueError(TOKEN_HAS_EXPIRED)
     except jwt.InvalidTokenError as e:
@@ -16,22 +50,40 @@ def decode_token(token, secret: str = None) -> dict:
 
 
 def encode_token(token_payload, secret: str = None) -> str:
-    return jwt.encode(token_payload, secret or SECRET_KEY, algorithm=TOKEN_HASH_ALGORITHM)
+    if secret or not is_asymmetric():
+        codec = get_codec(secret or SECRET_KEY)
+        if codec is not None:
+            return codec.encode(token_payload)
+        return jwt.encode(token_payload, secret or SECRET_KEY, algorithm=SECRET_ALGORITHM)
 
+    kid, key = get_keyring().signing_key
+    return jwt.encode(token_payload, key, algorithm=TOKEN_HASH_ALGORITHM, headers={"kid": kid})
+
+
+assert TOKEN_ENCODE_FIELDS_MAP and isinstance(TOKEN_ENCODE_FIELDS_MAP, dict)
+# claims are always laid out in TOKEN_ENCODE_FIELDS_MAP order
+_CLAIM_FIELDS = tuple(TOKEN_ENCODE_FIELDS_MAP)
+_get_claim_values = attrgetter(*TOKEN_ENCODE_FIELDS_MAP.values())
 
-def auth_token_for_user(user) -> str:
-    assert TOKEN_ENCODE_FIELDS_MAP and isinstance(TOKEN_ENCODE_FIELDS_MAP, dict)
 
-    payload = {field: getattr(user, db_field) for field, db_field in TOKEN_ENCODE_FIELDS_MAP.items()}
-    payload["exp"] = datetime.utcnow() + timedelta(seconds=TOKEN_EXP_SECONDS)
+def _user_claims(user) -> dict:
+    values = _get_claim_values(user)
+    return dict(zip(_CLAIM_FIELDS, values if len(_CLAIM_FIELDS) > 1 else (values,)))
+
+
+def auth_token_for_user(user) -> str:
+    payload = _user_claims(user)
+    issued_at = int(time.time())
+    # jti and iat identify the token for revocation
+    payload["jti"] = uuid.uuid4().hex
+    payload["iat"] = issued_at
+    payload["exp"] = issued_at + TOKEN_EXP_SECONDS
     return encode_token(payload)
 
 
 def verify_token_for_user(user):
-    assert TOKEN_ENCODE_FIELDS_MAP and isinstance(TOKEN_ENCODE_FIELDS_MAP, dict)
-
-    payload = {field: getattr(user, db_field) for field, db_field in TOKEN_ENCODE_FIELDS_MAP.items()}
-    payload["exp"] = datetime.utcnow() + timedelta(seconds=TOKEN_EXP_SECONDS)
+    payload = _user_claims(user)
+    payload["exp"] = int(time.time()) + TOKEN_EXP_SECONDS
     return encode_token(payload, VERIFY_SECRET_KEY)
 
 
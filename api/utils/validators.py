@@ -7,10 +7,40 @@ from api.queries import email_exists
 from config import ALLOWED_EMAIL_DOMAINS, PASSWORD_MIN_LEN
 
 
+EMAIL_PATTERN = re.compile(r'^[\w.-]+@\w+[\w.-]+\w+\.\w+$')
+UPPERCASE_PATTERN = re.compile(r'[A-Z]')
+LOWERCASE_PATTERN = re.compile(r'[a-z]')
+DIGIT_PATTERN = re.compile(r'\d')
+SPECIAL_CHARS = r'!@#$%^&*()_+{}[\]:;<>,.?~\\'
+SPECIAL_CHAR_PATTERN = re.compile(f'[{SPECIAL_CHARS}]')
+
+
 def check_required_fields(data, fields: Iterable[str]) -> dict[str, str]:
     return {field: REQUIRED_FIELD_MISSING for field in fields if field not in data or not data.get(field)}
 
 
+def email_format_errors(email: str) -> list[str]:
+    msgs = []
+    if not EMAIL_PATTERN.match(email):
+        msgs.append(EMAIL_ERROR_MSGS["wrong_chars"])
+    if email.count('@') != 1 or email.partition('@')[2] not in ALLOWED_EMAIL_DOMAINS:
+        msgs.append(EMAIL_ERROR_MSGS["unsupported_domain"])
+    return msgs
+
+
+def password_errors(password: str, min_length: int = PASSWORD_MIN_LEN) -> list[str]:
+    msgs = []
+    if len(password) < min_length:
+        msgs.append(PWD_ERROR_MSGS['invalid_length'] % min_length)
+    if not LOWERCASE_PATTERN.search(password) or not UPPERCASE_PATTERN.search(password):
+        msgs.append(PWD_ERROR_MSGS['has_no_different_case'])
+    if not DIGIT_PATTERN.search(password):
+        msgs.append(PWD_ERROR_MSGS['has_no_digit'])
+    if not SPECIAL_CHAR_PATTERN.search(password):
+        msgs.append(PWD_ERROR_MSGS['has_no_special_char'] % SPECIAL_CHARS)
+    return msgs
+
+
 class BaseValidator(ABC):
     @abstractmethod
     def validate(self) -> list[str]:
@@ -18,14 +48,15 @@ class BaseValidator(ABC):
 
 
 class EmailValidator(BaseValidator):
-    EMAIL_REGEX = r'^[\w.-]+@\w+[\w.-]+\w+\.\w+$'
+    EMAIL_REGEX = EMAIL_PATTERN.pattern
 
-    def __init__(self, email: str):
+    def __init__(self, email: str, session=None):
         self._email = email
+        self._session = session
 
     @property
     def is_email_string(self) -> bool:
-        return bool(re.match(r'^[\w.-]+@\w+[\w.-]+\w+\.\w+$', self._email))
+        return bool(EMAIL_PATTERN.match(self._email))
 
     @property
     def has_supported_domain(self):
@@ -37,21 +68,20 @@ class EmailValidator(BaseValidator):
 
     @property
     def is_exists(self):
-        return email_exists(self._email)
+        return email_exists(self._email, session=self._session)
+
+    def validate_format(self) -> list[str]:
+        return email_format_errors(self._email)
 
     def validate(self) -> list[str]:
-        msgs = []
-        if not self.is_email_string:
-            msgs.append(EMAIL_ERROR_MSGS["wrong_chars"])
-        if not self.has_supported_domain:
-            msgs.append(EMAIL_ERROR_MSGS["unsupported_domain"])
+        msgs = self.validate_format()
         if self.is_exists:
             msgs.append(EMAIL_ERROR_MSGS["already_exists"])
         return msgs
 
 
 class PasswordValidator(BaseValidator):
-    SPECIAL_CHAR = r'!@#$%^&*()_+{}[\]:;<>,.?~\\'
+    SPECIAL_CHAR = SPECIAL_CHARS
 
     def __init__(self, password: str, min_length: int = PASSWORD_MIN_LEN):
         self.password = password
@@ -63,28 +93,19 @@ class PasswordValidator(BaseValidator):
 
     @property
     def has_uppercase(self):
-        return bool(re.search(r'[A-Z]', self.password))
+        return bool(UPPERCASE_PATTERN.search(self.password))
 
     @property
     def has_lowercase(self):
-        return bool(re.search(r'[a-z]', self.password))
+        return bool(LOWERCASE_PATTERN.search(self.password))
 
     @property
     def has_digit(self):
-        return bool(re.search(r'\d', self.password))
+        return bool(DIGIT_PATTERN.search(self.password))
 
     @property
     def has_special_char(self):
-        return bool(re.search(f'[{self.SPECIAL_CHAR}]', self.password))
+        return bool(SPECIAL_CHAR_PATTERN.search(self.password))
 
     def validate(self):
-        msgs = []
-        if not self.valid_length:
-            msgs.append(PWD_ERROR_MSGS['invalid_length'] % self.min_length)
-        if not self.has_lowercase or not self.has_uppercase:
-            msgs.append(PWD_ERROR_MSGS['has_no_different_case'])
-        if not self.has_digit:
-            msgs.append(PWD_ERROR_MSGS['has_no_digit'])
-        if not self.has_special_char:
-            msgs.append(PWD_ERROR_MSGS['has_no_special_char'] % self.SPECIAL_CHAR)
-        return msgs
+        return password_errors(self.password, self.min_length)
@@ -0,0 +1,9 @@
+"""
+Offline verification of user service tokens for downstream services.
+
+    verifier = TokenVerifier("https://users.example.com/.well-known/jwks.json")
+    claims = verifier.verify(token)
+
+Depends only on PyJWT with cryptography, it does not import anything from the service itself.
+"""
+from auth_verifier.verifier import InvalidToken, TokenExpired, TokenVerifier
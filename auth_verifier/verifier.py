@@ -0,0 +1,97 @@
+import json
+import threading
+import time
+import urllib.request
+
+import jwt
+
+KEY_TYPE_ALGORITHMS = {"OKP": "EdDSA", "RSA": "RS256"}
+
+
+class InvalidToken(Exception):
+    pass
+
+
+class TokenExpired(InvalidToken):
+    pass
+
+
+class TokenVerifier:
+    """
+    Verifies tokens signed with the user service keys without calling the service.
+
+    Keys come from the JWKS endpoint, or from a JWKS dict for fully offline use, and stay in memory
+    for `cache_seconds`. A token with an unknown `kid` refetches the keys, at most once
+    every `min_refresh_interval` seconds, so key rotation is picked up without a restart.
+    """
+
+    def __init__(self, jwks_url: str = None, jwks: dict = None, algorithms: tuple[str, ...] = ("EdDSA", "RS256"),
+                 cache_seconds: int = 3600, min_refresh_interval: int = 30, timeout: float = 5.0, leeway: int = 0):
+        assert jwks_url or jwks, "either jwks_url or jwks is required"
+        self.jwks_url = jwks_url
+        self.algorithms = algorithms
+        self.cache_seconds = cache_seconds
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+        self.leeway = leeway
+
+        self._keys = {}
+        self._fetched_at = None
+        self._lock = threading.Lock()
+        if jwks:
+            self.set_jwks(jwks)
+
+    def set_jwks(self, jwks: dict):
+        keys = {}
+        for jwk in jwks.get("keys", ()):
+            algorithm = jwk.get("alg") or KEY_TYPE_ALGORITHMS.get(jwk.get("kty"))
+            # symmetric and unexpected keys are ignored, a public key must never verify an HMAC token
+            if jwk.get("kid") and algorithm in self.algorithms:
+                keys[jwk["kid"]] = (jwt.PyJWK(jwk, algorithm=algorithm).key, algorithm)
+        self._keys = keys
+        self._fetched_at = time.monotonic()
+
+    def fetch_jwks(self) -> dict:
+        with urllib.request.urlopen(self.jwks_url, timeout=self.timeout) as response:
+            return json.load(response)
+
+    def _refresh(self, unknown_kid: bool):
+        if not self.jwks_url:
+            return
+
+        with self._lock:
+            age = time.monotonic() - self._fetched_at if self._fetched_at is not None else None
+            if age is not None and (age < self.min_refresh_interval or not unknown_kid and age < self.cache_seconds):
+                return
+            try:
+                self.set_jwks(self.fetch_jwks())
+            except OSError:
+                if not self._keys:
+                    raise
+                # keep the known keys and try again after min_refresh_interval
+                self._fetched_at = time.monotonic() - self.cache_seconds + self.min_refresh_interval
+
+    def get_key(self, kid: str):
+        if self._fetched_at is None or time.monotonic() - self._fetched_at >= self.cache_seconds:
+            self._refresh(unknown_kid=False)
+        if kid not in self._keys:
+            self._refresh(unknown_kid=True)
+        return self._keys.get(kid)
+
+    def verify(self, token: str) -> dict:
+        try:
+            kid = jwt.get_unverified_header(token).get("kid")
+        except jwt.InvalidTokenError:
+            raise InvalidToken("malformed token")
+
+        key = self.get_key(kid)
+        if key is None:
+            raise InvalidToken("unknown key id %s" % kid)
+
+        public_key, algorithm = key
+        try:
+            return jwt.decode(token, public_key, algorithms=[algorithm], leeway=self.leeway)
+        except jwt.ExpiredSignatureError:
+            raise TokenExpired("token has expired")
+        except jwt.InvalidTokenError as e:
+            raise InvalidToken(str(e))
@@ -0,0 +1,64 @@
+"""
+UserController lookups, ORM instances against cached Core statements.
+
+    python -m benchmarks.bench_controllers --number 5000
+"""
+import argparse
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from dao.controllers import UserController
+from dao.models import User
+from benchmarks.timing import ops_per_second
+
+USERS = 1000
+
+
+def make_session():
+    engine = create_engine("sqlite://")
+    User.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all(
+        User(email=f"benchmark_user_{i}@gmail.com", password="password", role="client", full_name=f"User {i}")
+        for i in range(USERS)
+    )
+    session.commit()
+    return session
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare ORM and Core lookup throughput.")
+    parser.add_argument("--number", type=int, default=5000)
+    args = parser.parse_args()
+
+    session = make_session()
+    users = UserController(session=session)
+    fields = ("email", "full_name")
+    email = f"benchmark_user_{USERS // 2}@gmail.com"
+    user_id = users.get_row_by_email(email, fields=("id",)).id
+
+    def orm_by_id():
+        users._get("id", user_id, fields)
+        session.expunge_all()
+
+    def orm_by_email():
+        users.get_user_by_email(email, fields)
+        session.expunge_all()
+
+    cases = {
+        "by id": (orm_by_id, lambda: users.get_row_by_id(user_id, fields)),
+        "by email": (orm_by_email, lambda: users.get_row_by_email(email, fields)),
+        "exists": (
+            lambda: session.query(session.query(User).filter(User.email == email).exists()).scalar(),
+            lambda: users.email_exists(email)
+        ),
+    }
+    print(f"{'':10}{'orm ops/s':>12}{'core ops/s':>12}{'speedup':>10}")
+    for name, (orm_fn, core_fn) in cases.items():
+        orm_ops, core_ops = ops_per_second(orm_fn, args.number), ops_per_second(core_fn, args.number)
+        print(f"{name:10}{orm_ops:12.0f}{core_ops:12.0f}{core_ops / orm_ops:9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+JSON request/response throughput of the media handlers on the /auth, /register and /me-info payloads.
+
+    python -m benchmarks.bench_media --number 50000
+"""
+import argparse
+import io
+
+import falcon
+
+from api.utils.media import JSON_HANDLERS, get_json_handler
+from benchmarks.timing import ops_per_second
+
+TOKEN = "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9." + "x" * 180 + "." + "y" * 43
+
+PAYLOADS = {
+    "/auth": ({"email": "benchmark_user@gmail.com", "password": "somePassword123f}"}, {"token": TOKEN}),
+    "/register": (
+        {"email": "benchmark_user@gmail.com", "password": "somePassword123f}", "full_name": "Benchmark User"},
+        {"token": TOKEN},
+    ),
+    "/me-info": (
+        {"password": "somePassword123f}", "full_name": "Benchmark User"},
+        {"email": "benchmark_user@gmail.com", "full_name": "Benchmark User"},
+    ),
+    "error": (
+        {"email": "benchmark_user@gmail.com"},
+        falcon.HTTPBadRequest(description="Required field missing").to_dict(),
+    ),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare JSON media handler throughput.")
+    parser.add_argument("--number", type=int, default=50000)
+    args = parser.parse_args()
+
+    backends = [name for name, (available, _) in JSON_HANDLERS.items() if available()]
+    print(f"{'':12}" + "".join(f"{backend + ' ops/s':>16}" for backend in backends))
+    for route, (request_media, response_media) in PAYLOADS.items():
+        results = []
+        for backend in backends:
+            handler = get_json_handler(backend)
+            body = handler.serialize(request_media, falcon.MEDIA_JSON)
+
+            def request_response():
+                handler.deserialize(io.BytesIO(body), falcon.MEDIA_JSON, len(body))
+                handler.serialize(response_media, falcon.MEDIA_JSON)
+
+            results.append(ops_per_second(request_response, args.number))
+        print(f"{route:12}" + "".join(f"{ops:16.0f}" for ops in results))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""
+Token encode/decode throughput, PyJWT against the HS256 codec.
+
+    python -m benchmarks.bench_tokens --number 20000
+"""
+import argparse
+import time
+
+import jwt
+
+from api.utils.jwt_codec import HS256Codec
+from benchmarks.timing import ops_per_second
+
+SECRET = "benchmark_secret"
+
+
+def make_payload() -> dict:
+    issued_at = int(time.time())
+    return {
+        "user_id": 1, "user_email": "benchmark_user@gmail.com", "user_role": "user", "user_email_verified": True,
+        "jti": "0123456789abcdef0123456789abcdef", "iat": issued_at, "exp": issued_at + 43200,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare token encode/decode throughput.")
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    payload = make_payload()
+    codec = HS256Codec(SECRET)
+    token = codec.encode(payload)
+    assert token == jwt.encode(payload, SECRET, algorithm="HS256")
+
+    cases = {
+        "encode": (lambda: jwt.encode(payload, SECRET, algorithm="HS256"), lambda: codec.encode(payload)),
+        "decode": (lambda: jwt.decode(token, SECRET, algorithms=["HS256"]), lambda: codec.decode(token)),
+    }
+    print(f"{'':8}{'pyjwt ops/s':>14}{'codec ops/s':>14}{'speedup':>10}")
+    for name, (pyjwt_fn, codec_fn) in cases.items():
+        pyjwt_ops, codec_ops = ops_per_second(pyjwt_fn, args.number), ops_per_second(codec_fn, args.number)
+        print(f"{name:8}{pyjwt_ops:14.0f}{codec_ops:14.0f}{codec_ops / pyjwt_ops:9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 from decouple import config
@@ -12,14 +13,62 @@ USE_TEST = config("USE_TEST", cast=bool)
 BASE_DIR = Path(__file__).parent
 STATIC_DIR = BASE_DIR / 'static'
 TEMPLATES_DIR = STATIC_DIR / 'templates'
+TEMPLATES_AUTO_RELOAD = config("TEMPLATES_AUTO_RELOAD", default=False, cast=bool)  # dev mode only
+# compiled templates are kept here between restarts, empty disables the disk cache
+TEMPLATES_BYTECODE_CACHE_DIR = config("TEMPLATES_BYTECODE_CACHE_DIR", default="", cast=lambda v: Path(v) if v else None)
 
 # Postgres urls
 PRIMARY_DB_URI = config("PRIMARY_DB_URI")
 TEST_DB_URI = config("TEST_DB_URI")
+DB_POOL_SIZE = config("DB_POOL_SIZE", default=10, cast=int)
+DB_MAX_OVERFLOW = config("DB_MAX_OVERFLOW", default=10, cast=int)
+DB_POOL_TIMEOUT = config("DB_POOL_TIMEOUT", default=5.0, cast=float)  # seconds to wait for a free connection
+DB_POOL_RECYCLE = config("DB_POOL_RECYCLE", default=1800, cast=int)  # seconds, -1 disables recycling
+DB_POOL_PRE_PING = config("DB_POOL_PRE_PING", default=True, cast=bool)
+DB_STATEMENT_TIMEOUT_MS = config("DB_STATEMENT_TIMEOUT_MS", default=0, cast=int)  # 0 disables the timeout
+DB_PGBOUNCER = config("DB_PGBOUNCER", default=False, cast=bool)  # connect through PgBouncer in transaction mode
+# test/dev mode, reading a column the query did not load raises instead of running another SELECT
+DB_RAISE_ON_LAZY_LOAD = config("DB_RAISE_ON_LAZY_LOAD", default=USE_TEST, cast=bool)
+DB_STREAM_BATCH_SIZE = config("DB_STREAM_BATCH_SIZE", default=1000, cast=int)  # rows held in memory while streaming
+DB_PAGE_SIZE = config("DB_PAGE_SIZE", default=100, cast=int)
+DB_BULK_CHUNK_SIZE = config("DB_BULK_CHUNK_SIZE", default=1000, cast=int)  # rows or ids per bulk statement
+# a failed after-commit callback is retried in the background, the delay doubles after every attempt
+AFTER_COMMIT_RETRIES = config("AFTER_COMMIT_RETRIES", default=5, cast=int)
+AFTER_COMMIT_RETRY_DELAY = config("AFTER_COMMIT_RETRY_DELAY", default=1.0, cast=float)  # seconds
 
 # Redis urls
 REDIS_URI = config("REDIS_URI")
 REDIS_TEST_URI = config("REDIS_TEST_URI")
+REDIS_MAX_CONNECTIONS = config("REDIS_MAX_CONNECTIONS", default=50, cast=int)  # per db index and process
+REDIS_POOL_TIMEOUT = config("REDIS_POOL_TIMEOUT", default=2.0, cast=float)  # seconds to wait for a free connection
+REDIS_SOCKET_TIMEOUT = config("REDIS_SOCKET_TIMEOUT", default=5.0, cast=float)  # seconds
+REDIS_SOCKET_CONNECT_TIMEOUT = config("REDIS_SOCKET_CONNECT_TIMEOUT", default=2.0, cast=float)  # seconds
+REDIS_HEALTH_CHECK_INTERVAL = config("REDIS_HEALTH_CHECK_INTERVAL", default=30, cast=int)  # seconds
+
+
+# Server
+SERVER_HOST = config("SERVER_HOST", default="127.0.0.1")
+SERVER_PORT = config("SERVER_PORT", default=8000, cast=int)
+SERVER_WORKERS = config("SERVER_WORKERS", default=os.cpu_count() or 1, cast=int)
+SERVER_THREADS = config("SERVER_THREADS", default=1, cast=int)  # per worker
+SERVER_KEEPALIVE = config("SERVER_KEEPALIVE", default=5, cast=int)  # seconds
+SERVER_MAX_REQUESTS = config("SERVER_MAX_REQUESTS", default=10000, cast=int)  # worker is recycled after, 0 disables
+SERVER_MAX_REQUESTS_JITTER = config("SERVER_MAX_REQUESTS_JITTER", default=1000, cast=int)
+SERVER_TIMEOUT = config("SERVER_TIMEOUT", default=30, cast=int)  # seconds
+SERVER_GRACEFUL_TIMEOUT = config("SERVER_GRACEFUL_TIMEOUT", default=30, cast=int)  # seconds
+JSON_BACKEND = config("JSON_BACKEND", default="auto")  # auto, orjson, msgspec or json
+
+
+# Password hashing
+HASH_EXECUTOR_KIND = config("HASH_EXECUTOR_KIND", default="thread")  # thread or process
+HASH_EXECUTOR_WORKERS = config("HASH_EXECUTOR_WORKERS", default=0, cast=int)  # 0 means cpu count
+HASH_EXECUTOR_QUEUE_SIZE = config("HASH_EXECUTOR_QUEUE_SIZE", default=64, cast=int)
+HASH_EXECUTOR_TIMEOUT = config("HASH_EXECUTOR_TIMEOUT", default=10.0, cast=float)  # seconds
+PASSWORD_HASHER = config("PASSWORD_HASHER", default="bcrypt")  # bcrypt, scrypt or argon2id
+PASSWORD_HASHER_COST = config("PASSWORD_HASHER_COST", default=0, cast=int)  # 0 means the hasher default
+# calibrate the cost on startup to this verify time, ignored when PASSWORD_HASHER_COST is set,
+# prefer pinning the cost printed by `python3 -m api.calibrate_hasher` so every process uses the same one
+PASSWORD_HASHER_TARGET_MS = config("PASSWORD_HASHER_TARGET_MS", default=0, cast=int)
 
 
 # Validators conf
@@ -28,7 +77,11 @@ ALLOWED_EMAIL_DOMAINS = ('gmail.com', 'mail.ru')
 
 
 # Auth Token conf
-TOKEN_HASH_ALGORITHM = 'HS256'
+TOKEN_HASH_ALGORITHM = config("TOKEN_HASH_ALGORITHM", default="HS256")  # HS256, EdDSA or RS256
+# asymmetric algorithms read <kid>.pem keys from this directory, private keys sign, public keys only verify
+TOKEN_KEYS_DIR = config("TOKEN_KEYS_DIR", default="keys")
+TOKEN_SIGNING_KID = config("TOKEN_SIGNING_KID", default="")  # empty means the last private key by name
+TOKEN_JWKS_MAX_AGE = config("TOKEN_JWKS_MAX_AGE", default=86400, cast=int)  # seconds
 TOKEN_AUTH_HEADER = 'Bearer'
 TOKEN_EXP_SECONDS = 43200
 TOKEN_ENCODE_FIELDS_MAP = {
@@ -37,12 +90,45 @@ TOKEN_ENCODE_FIELDS_MAP = {
     "user_role": "role",
     "user_email_verified": "email_verified"
 }
+INTROSPECT_MAX_TOKENS = config("INTROSPECT_MAX_TOKENS", default=100, cast=int)  # tokens per /introspect request
+# keys of the services allowed to call /introspect, comma separated, empty disables the endpoint
+INTROSPECT_KEYS = config("INTROSPECT_KEYS", default="", cast=lambda v: tuple(filter(None, v.split(","))))
+# roles allowed to export users, comma separated
+EXPORT_ROLES = config("EXPORT_ROLES", default="director,developer", cast=lambda v: tuple(filter(None, v.split(","))))
+EXPORT_CHUNK_ROWS = config("EXPORT_CHUNK_ROWS", default=500, cast=int)  # rows encoded per streamed chunk
+IMPORT_BATCH_SIZE = config("IMPORT_BATCH_SIZE", default=1000, cast=int)  # records validated and inserted together
+TOKEN_CACHE_SIZE = config("TOKEN_CACHE_SIZE", default=10000, cast=int)  # verified tokens kept per middleware, 0 disables
+
+# Token revocation
+REVOCATION_ENABLED = config("REVOCATION_ENABLED", default=True, cast=bool)
+REVOCATION_DB = config("REVOCATION_DB", default=0, cast=int)  # redis db index of revoked tokens
+REVOCATION_CHANNEL = "tokens:revoked"
+REVOCATION_BLOOM_CAPACITY = config("REVOCATION_BLOOM_CAPACITY", default=100000, cast=int)  # revoked tokens per worker
+REVOCATION_BLOOM_ERROR_RATE = 0.001
+REVOCATION_RESYNC_INTERVAL = config("REVOCATION_RESYNC_INTERVAL", default=300, cast=int)  # seconds, full reload
 
 # Mailing
 SMTP_SERVER = config("SMTP_SERVER")
 SMTP_PORT = config("SMTP_PORT", cast=int)  # SMTP server port
 SMTP_EMAIL = config("SMTP_EMAIL")
 SMTP_PASSWORD = config("SMTP_PASSWORD")
+SMTP_POOL_SIZE = config("SMTP_POOL_SIZE", default=2, cast=int)  # authenticated connections kept open
+SMTP_TIMEOUT = config("SMTP_TIMEOUT", default=10, cast=int)  # seconds
+SMTP_IDLE_TIMEOUT = config("SMTP_IDLE_TIMEOUT", default=60, cast=int)  # seconds before an idle connection is reopened
+SMTP_MAX_MESSAGES_PER_CONNECTION = config("SMTP_MAX_MESSAGES_PER_CONNECTION", default=100, cast=int)
+MAIL_BACKEND = config("MAIL_BACKEND", default="smtp")  # smtp or memory (keeps messages in process, for tests)
+MAIL_OUTBOX_DB = config("MAIL_OUTBOX_DB", default=0, cast=int)  # redis db index of the outbox
+MAIL_OUTBOX_STREAM = "mail:outbox"
+MAIL_OUTBOX_MAXLEN = 100000
+MAIL_RETRY_KEY = "mail:outbox:retry"
+MAIL_DEAD_LETTER_STREAM = "mail:outbox:dead"
+MAIL_CONSUMER_GROUP = "mailers"
+MAIL_MAX_ATTEMPTS = config("MAIL_MAX_ATTEMPTS", default=5, cast=int)
+MAIL_RETRY_BACKOFF = config("MAIL_RETRY_BACKOFF", default=5, cast=int)  # seconds, doubled on every attempt
+MAIL_RETRY_BACKOFF_MAX = config("MAIL_RETRY_BACKOFF_MAX", default=600, cast=int)  # seconds
+MAIL_WORKER_CONCURRENCY = config("MAIL_WORKER_CONCURRENCY", default=4, cast=int)
+MAIL_WORKER_BATCH_SIZE = config("MAIL_WORKER_BATCH_SIZE", default=10, cast=int)  # messages sent per connection checkout
+MAIL_CLAIM_IDLE_MS = 60000  # messages of a crashed worker are taken over after this idle time
 VERIFICATION_TTL = 720
 VERIFICATION_CONTEXT = {
     "subject": "Kaimono",
@@ -1,35 +1,280 @@
-from contextlib import contextmanager
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any
 
 import redis
-from sqlalchemy import create_engine
+import redis.asyncio
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool, QueuePool
 
-from config import PRIMARY_DB_URI, REDIS_URI, USE_TEST, TEST_DB_URI, REDIS_TEST_URI
+from config import (
+    PRIMARY_DB_URI, REDIS_URI, USE_TEST, TEST_DB_URI, REDIS_TEST_URI, REDIS_MAX_CONNECTIONS, REDIS_SOCKET_TIMEOUT,
+    REDIS_SOCKET_CONNECT_TIMEOUT, REDIS_HEALTH_CHECK_INTERVAL, REDIS_POOL_TIMEOUT, DB_POOL_SIZE, DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING, DB_STATEMENT_TIMEOUT_MS, DB_PGBOUNCER
+)
 from dao.models import User
 
 
-def get_engine():
-    if USE_TEST:
-        return create_engine(TEST_DB_URI)
-    return create_engine(PRIMARY_DB_URI)
+class PoolStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
 
+    def record(self, wait: float, timed_out: bool = False):
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += timed_out
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
 
-engine = get_engine()
+    def as_dict(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait": self.total_wait / self.checkouts if self.checkouts else 0.0,
+                "max_wait": self.max_wait,
+            }
+
+
+db_pool_stats = PoolStats()
+
+
+class InstrumentedQueuePool(QueuePool):
+    def connect(self):
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            db_pool_stats.record(time.perf_counter() - started, timed_out)
+
+
+def _engine_options(uri: str) -> dict[str, Any]:
+    url = make_url(uri)
+    if url.get_backend_name() == "sqlite":
+        return {}
+
+    options = {"pool_pre_ping": DB_POOL_PRE_PING, "pool_recycle": DB_POOL_RECYCLE}
+    if DB_PGBOUNCER:
+        # PgBouncer owns the pooling and rejects startup options
+        options["poolclass"] = NullPool
+    else:
+        options.update(
+            poolclass=InstrumentedQueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+        )
+        if DB_STATEMENT_TIMEOUT_MS and url.get_backend_name() == "postgresql":
+            options["connect_args"] = {"options": "-c statement_timeout=%d" % DB_STATEMENT_TIMEOUT_MS}
+    return options
+
+
+def _set_local_statement_timeout(conn):
+    conn.exec_driver_sql("SET LOCAL statement_timeout = %d" % DB_STATEMENT_TIMEOUT_MS)
+
+
+def _async_engine_options(uri: str) -> dict[str, Any]:
+    url = make_url(uri)
+    if url.get_backend_name() == "sqlite":
+        return {}
+
+    options = {"pool_pre_ping": DB_POOL_PRE_PING, "pool_recycle": DB_POOL_RECYCLE}
+    if DB_PGBOUNCER:
+        # asyncpg prepared statements do not survive PgBouncer transaction pooling
+        options.update(poolclass=NullPool, connect_args={"statement_cache_size": 0})
+    else:
+        options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT)
+        if DB_STATEMENT_TIMEOUT_MS:
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}}
+    return options
+
+
+def _get_db_uri() -> str:
+    uri = TEST_DB_URI if USE_TEST else PRIMARY_DB_URI
+    # SQLAlchemy only accepts the postgresql:// scheme
+    return uri.replace("postgres://", "postgresql://", 1)
+
+
+def _get_async_db_uri() -> str:
+    url = make_url(_get_db_uri())
+    drivers = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+    return url.set(drivername=drivers[url.get_backend_name()]).render_as_string(hide_password=False)
+
+
+_engine = None
+_session_factory = None
+_async_engine = None
+_async_session_factory = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> Engine:
+    global _engine
+
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                uri = _get_db_uri()
+                engine = create_engine(uri, **_engine_options(uri))
+                if DB_PGBOUNCER and DB_STATEMENT_TIMEOUT_MS and engine.dialect.name == "postgresql":
+                    event.listen(engine, "begin", _set_local_statement_timeout)
+                _engine = engine
+    return _engine
 
 
 def get_session_factory():
-    Session = sessionmaker()
-    Session.configure(binds={User: engine})
-    return Session
+    global _session_factory
+
+    if _session_factory is None:
+        Session = sessionmaker()
+        Session.configure(binds={User: get_engine()})
+        _session_factory = Session
+    return _session_factory
+
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine
+
+    if _async_engine is None:
+        uri = _get_async_db_uri()
+        engine = create_async_engine(uri, **_async_engine_options(uri))
+        if DB_PGBOUNCER and DB_STATEMENT_TIMEOUT_MS and engine.dialect.name == "postgresql":
+            event.listen(engine.sync_engine, "begin", _set_local_statement_timeout)
+        _async_engine = engine
+    return _async_engine
+
+
+def get_async_session_factory():
+    global _async_session_factory
+
+    if _async_session_factory is None:
+        _async_session_factory = async_sessionmaker(binds={User: get_async_engine()}, expire_on_commit=False)
+    return _async_session_factory
+
+
+def db_pool_status(engine: Engine = None) -> dict[str, Any]:
+    """
+    Checkout waits of the instrumented pools and the current usage of the engine pool, the primary by default.
+    `saturation` is the share of the steady pool size checked out, above 1 overflow connections are in use.
+    """
+    status = db_pool_stats.as_dict()
+    pool = (engine or get_engine()).pool
+    if isinstance(pool, QueuePool):
+        size, checked_out = pool.size(), pool.checkedout()
+        status.update(
+            size=size,
+            checked_out=checked_out,
+            # negative while the pool has not opened all of its connections yet
+            overflow=max(pool.overflow(), 0),
+            saturation=checked_out / size if size else 0.0,
+        )
+    return status
+
+
+def reset_engine():
+    # pooled connections inherited from the parent process are left to the parent
+    global _engine_lock
+
+    _engine_lock = threading.Lock()
+    if _engine is not None:
+        _engine.dispose(close=False)
+    if _async_engine is not None:
+        _async_engine.sync_engine.dispose(close=False)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=reset_engine)
+
+
+_redis_pools: dict[int, redis.BlockingConnectionPool] = {}
+_redis_pools_lock = threading.Lock()
+_async_redis_pools: dict[int, redis.asyncio.BlockingConnectionPool] = {}
+
+
+def _redis_pool_options(db: int) -> dict[str, Any]:
+    return dict(
+        db=db,
+        max_connections=REDIS_MAX_CONNECTIONS,
+        timeout=REDIS_POOL_TIMEOUT,
+        socket_timeout=REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=REDIS_SOCKET_CONNECT_TIMEOUT,
+        health_check_interval=REDIS_HEALTH_CHECK_INTERVAL,
+    )
+
+
+def get_redis_pool(db: int = 0) -> redis.BlockingConnectionPool:
+    assert db < 16
+    pool = _redis_pools.get(db)
+    if pool is None:
+        with _redis_pools_lock:
+            pool = _redis_pools.get(db)
+            if pool is None:
+                pool = redis.BlockingConnectionPool.from_url(
+                    REDIS_TEST_URI if USE_TEST else REDIS_URI, **_redis_pool_options(db)
+                )
+                _redis_pools[db] = pool
+    return pool
+
+
+def reset_redis_pools():
+    # sockets inherited from the parent process must not be shared, the child opens its own
+    global _redis_pools_lock
+
+    _redis_pools_lock = threading.Lock()
+    for pool in _redis_pools.values():
+        pool.reset()
+    _redis_pools.clear()
+    _async_redis_pools.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=reset_redis_pools)
 
 
 @contextmanager
 def redis_scope(db: int = 0):
+    yield redis.Redis(connection_pool=get_redis_pool(db))
+
+
+@contextmanager
+def redis_pipeline(db: int = 0, transaction: bool = False):
+    # commands left queued by the caller are sent in one round trip on exit,
+    # call `execute()` inside the scope when the replies are needed
+    with redis_scope(db) as cache:
+        pipeline = cache.pipeline(transaction=transaction)
+        try:
+            yield pipeline
+            if len(pipeline):
+                pipeline.execute()
+        finally:
+            pipeline.reset()
+
+
+def get_async_redis_pool(db: int = 0) -> redis.asyncio.BlockingConnectionPool:
+    # used from the event loop thread only, so no lock is needed
     assert db < 16
-    redis_client = redis.from_url(REDIS_TEST_URI if USE_TEST else REDIS_URI + f'/{db}')
-    try:
-        yield redis_client
-    except Exception as e:
-        raise e
-    finally:
-        redis_client.close()
+    pool = _async_redis_pools.get(db)
+    if pool is None:
+        pool = redis.asyncio.BlockingConnectionPool.from_url(
+            REDIS_TEST_URI if USE_TEST else REDIS_URI, **_redis_pool_options(db)
+        )
+        _async_redis_pools[db] = pool
+    return pool
+
+
+@asynccontextmanager
+async def async_redis_scope(db: int = 0):
+    yield redis.asyncio.Redis(connection_pool=get_async_redis_pool(db))
@@ -1,57 +1,211 @@
+import csv
+import io
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime
+from functools import lru_cache
+from itertools import islice
 from logging import getLogger
-from typing import Any, Iterable
+from typing import Any, AsyncIterator, Iterable, Iterator
 
-from sqlalchemy import delete, exists
-from sqlalchemy.orm import load_only
+from sqlalchemy import Row, bindparam, delete, exists, insert, literal, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import load_only, raiseload
 
-from .connections import get_session_factory
+from config import (
+    DB_RAISE_ON_LAZY_LOAD, DB_STREAM_BATCH_SIZE, DB_PAGE_SIZE, DB_BULK_CHUNK_SIZE, TOKEN_ENCODE_FIELDS_MAP
+)
+from .connections import get_session_factory, get_async_session_factory
 from .models import Base, User
 
+# the columns each use of a user needs, combined with projection()
+USER_PROJECTIONS = {
+    "token": tuple(TOKEN_ENCODE_FIELDS_MAP.values()),
+    "credentials": ("password",),
+    "profile": ("email", "full_name"),
+}
+
+# dialects with INSERT ... ON CONFLICT ... RETURNING
+DIALECT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def insert_returning_stmt(model, dialect_name: str, values: dict[str, Any] | list[dict[str, Any]],
+                          returning: Iterable[str], conflict_fields: Iterable[str] = None):
+    if dialect_name not in DIALECT_INSERTS:
+        raise NotImplementedError("INSERT ... RETURNING is not supported on %s" % dialect_name)
+    stmt = DIALECT_INSERTS[dialect_name](model).values(values)
+    if conflict_fields:
+        stmt = stmt.on_conflict_do_nothing(index_elements=list(conflict_fields))
+    return stmt.returning(*(getattr(model, field) for field in returning))
+
+
+def user_conditions(roles: Iterable[str] = None, email_verified: bool = None, is_active: bool = None,
+                    joined_after: datetime = None, joined_before: datetime = None) -> list:
+    """WHERE conditions for the given user filters, None skips a filter."""
+    conditions = []
+    if roles:
+        conditions.append(User.role.in_(list(roles)))
+    if email_verified is not None:
+        conditions.append(User.email_verified.is_(email_verified))
+    if is_active is not None:
+        conditions.append(User.is_active.is_(is_active))
+    if joined_after is not None:
+        conditions.append(User.joined_at >= joined_after)
+    if joined_before is not None:
+        conditions.append(User.joined_at < joined_before)
+    return conditions
+
+
+def chunked(items: Iterable, size: int) -> Iterator[list]:
+    # consumes generators lazily, only one chunk is held in memory
+    items = iter(items)
+    while chunk := list(islice(items, size)):
+        yield chunk
+
+
+def combine_projections(projections: dict[str, tuple[str, ...]], uses: Iterable[str]) -> tuple[str, ...]:
+    return tuple(dict.fromkeys(field for use in uses for field in projections[use]))
+
+
+def load_options(model_fields: list) -> tuple:
+    if DB_RAISE_ON_LAZY_LOAD:
+        return load_only(*model_fields, raiseload=True), raiseload("*")
+    return load_only(*model_fields),
+
+
+@lru_cache(maxsize=None)
+def row_select(table, by_field: str, fields: tuple[str, ...]):
+    # one statement object per field set, so SQLAlchemy reuses its compiled form
+    return select(*(table.c[field] for field in fields)).where(table.c[by_field] == bindparam("value")).limit(1)
+
+
+@lru_cache(maxsize=None)
+def exists_select(table, by_field: str):
+    return select(literal(True)).where(table.c[by_field] == bindparam("value")).limit(1)
+
+
+def page_fields(table, fields: Iterable[str] | None) -> tuple[str, ...]:
+    # the id comes first, it is the cursor for the next page
+    return "id", *(field for field in fields or table.c.keys() if field != "id")
+
+
+@lru_cache(maxsize=None)
+def page_select(table, fields: tuple[str, ...]):
+    return (
+        select(*(table.c[field] for field in fields))
+        .where(table.c.id > bindparam("after_id"))
+        .order_by(table.c.id)
+        .limit(bindparam("limit"))
+    )
+
 
 class BaseController:
     model = None
+    PROJECTIONS: dict[str, tuple[str, ...]] = {}
 
     def __init__(self, session=None):
         assert issubclass(self.model, Base), "%s it must be inherited from %s" % (self.model.__name__, Base.__name__)
         self.logger = getLogger(self.__class__.__name__)
+        # a passed session belongs to a wider unit of work, which commits and closes it
+        self._owns_session = not session
         self.session = get_session_factory()() if not session else session
+        self._atomic_depth = 0
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.close()
+        if self._owns_session:
+            self.close()
 
     def close(self):
         self.session.close()
 
+    @classmethod
+    def projection(cls, *uses: str) -> tuple[str, ...]:
+        """The columns needed for the declared uses, e.g. projection("token", "credentials")."""
+        return combine_projections(cls.PROJECTIONS, uses)
+
     def _get_model_fields(self, fields: Iterable[str]):
         return [getattr(self.model, field) for field in fields or []]
 
     def get_all(self, fields: Iterable[str] = None) -> list:
+        """Loads the whole table, prefer iter_all or get_page for tables that grow."""
         query = self.session.query(self.model)
         if fields:
             model_fields = self._get_model_fields(fields)
-            query = query.options(load_only(*model_fields))
+            query = query.options(*load_options(model_fields))
         return query.all()
 
+    def iter_all(self, fields: Iterable[str] = None, batch_size: int = DB_STREAM_BATCH_SIZE,
+                 where: Iterable = ()) -> Iterator:
+        """
+        Streams every row matching `where` in id order through a server-side cursor, `batch_size` rows at a time.
+        Yields named tuples of `fields`, or ORM instances when no fields are given.
+        """
+        if fields:
+            stmt = select(*self._get_model_fields(fields)).where(*where).order_by(self.model.id)
+            # the option goes on the statement, the session connection is shared with every other query
+            result = self._connection().execute(stmt.execution_options(yield_per=batch_size))
+        else:
+            stmt = select(self.model).where(*where).order_by(self.model.id).execution_options(yield_per=batch_size)
+            result = self.session.scalars(stmt)
+        with result:
+            yield from result
+
+    def get_page(self, after_id: int = 0, limit: int = DB_PAGE_SIZE, fields: Iterable[str] = None) -> list[Row]:
+        """
+        Keyset pagination: up to `limit` rows with an id above `after_id`, in id order.
+        The id is always the first column, pass the last one as `after_id` to get the next page.
+        """
+        stmt = page_select(self.model.__table__, page_fields(self.model.__table__, fields))
+        return self._connection().execute(stmt, {"after_id": after_id, "limit": limit}).all()
+
     def _get(self, by_field: str, value: Any, fields: Iterable[str] = None):
         query = self.session.query(self.model).filter(getattr(self.model, by_field) == value)
         if fields:
             model_fields = self._get_model_fields(fields)
-            query = query.options(load_only(*model_fields))
+            query = query.options(*load_options(model_fields))
         return query.first()
 
     def get_by_id(self, _id, fields: Iterable[str] = None):
+        if not fields:
+            # served from the identity map when the row was already loaded in this session
+            return self.session.get(self.model, _id)
         return self._get("id", _id, fields)
 
+    def _commit(self):
+        if self._owns_session and not self._atomic_depth:
+            self.session.commit()
+        else:
+            self.session.flush()
+
+    @contextmanager
+    def atomic(self):
+        """
+        Runs the writes inside as one transaction: committed at the end when the controller owns its session,
+        rolled back on error. A passed session is left to its owner.
+        """
+        self._atomic_depth += 1
+        try:
+            yield self
+        except Exception:
+            if self._owns_session and self._atomic_depth == 1:
+                self.session.rollback()
+            raise
+        finally:
+            self._atomic_depth -= 1
+        self._commit()
+
     def delete(self, _id) -> None:
         try:
             self.session.execute(
                 delete(self.model)
                 .where(self.model.id == _id)
             )
-            self.session.commit()
+            self._commit()
         except Exception as e:
             self.logger.exception(e)
             self.session.rollback()
@@ -59,7 +213,7 @@ class BaseController:
     def create(self, entity):
         try:
             self.session.add(entity)
-            self.session.commit()
+            self._commit()
             return True
         except Exception as e:
             self.logger.exception(e)
@@ -68,7 +222,7 @@ class BaseController:
 
     def commit(self) -> bool:
         try:
-            self.session.commit()
+            self._commit()
             return True
         except Exception as e:
             self.logger.exception(e)
@@ -78,12 +232,370 @@ class BaseController:
     def exists(self, _id) -> bool:
         return self.session.query(exists().where(self.model.id == _id)).scalar()
 
+    def _connection(self):
+        return self.session.connection(bind_arguments={"mapper": self.model})
+
+    def get_row(self, by_field: str, value: Any, fields: Iterable[str]) -> Row | None:
+        """
+        Reads `fields` through Core into a named tuple, without building an ORM instance.
+        Pending ORM changes are not flushed first.
+        """
+        stmt = row_select(self.model.__table__, by_field, tuple(fields))
+        return self._connection().execute(stmt, {"value": value}).first()
+
+    def get_row_by_id(self, _id, fields: Iterable[str]) -> Row | None:
+        return self.get_row("id", _id, fields)
+
+    def row_exists(self, by_field: str, value: Any) -> bool:
+        stmt = exists_select(self.model.__table__, by_field)
+        return self._connection().execute(stmt, {"value": value}).first() is not None
+
+    def insert_returning(self, values: dict[str, Any], returning: Iterable[str],
+                         conflict_fields: Iterable[str] = None) -> Row | None:
+        """
+        Inserts one row without going through the identity map and returns the `returning` columns,
+        or None when `conflict_fields` clash with an existing row.
+        """
+        dialect_name = self.session.get_bind(mapper=self.model).dialect.name
+        row = self.session.execute(
+            insert_returning_stmt(self.model, dialect_name, values, returning, conflict_fields)
+        ).first()
+        self._commit()
+        return row
+
+    def insert_many(self, rows: list[dict[str, Any]], conflict_fields: Iterable[str] = None) -> int:
+        """
+        Inserts the rows with one multi-row INSERT, skipping those that clash on `conflict_fields`.
+        Returns the number of inserted rows.
+        """
+        if not rows:
+            return 0
+        dialect_name = self.session.get_bind(mapper=self.model).dialect.name
+        inserted = self.session.execute(
+            insert_returning_stmt(self.model, dialect_name, rows, ("id",), conflict_fields)
+        ).all()
+        self._commit()
+        return len(inserted)
+
+    def copy_insert(self, rows: list[dict[str, Any]], fields: tuple[str, ...], conflict_fields: Iterable[str]) -> int:
+        """
+        PostgreSQL COPY into a temporary table, then one INSERT ... SELECT ... ON CONFLICT DO NOTHING.
+        Column defaults of the model are not applied, every row must carry all `fields`.
+        Returns the number of inserted rows.
+        """
+        if not rows:
+            return 0
+        buffer = io.StringIO()
+        # an unquoted empty value is NULL in the csv format
+        csv.writer(buffer).writerows([row.get(field) for field in fields] for row in rows)
+        buffer.seek(0)
+
+        table, columns = self.model.__table__.name, ", ".join(fields)
+        conflict = ", ".join(conflict_fields)
+        cursor = self._connection().connection.driver_connection.cursor()
+        try:
+            # only the column types, none of the constraints
+            cursor.execute(
+                f"CREATE TEMP TABLE copy_{table} ON COMMIT DROP AS SELECT {columns} FROM {table} WITH NO DATA"
+            )
+            cursor.copy_expert(f"COPY copy_{table} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+            cursor.execute(
+                f"INSERT INTO {table} ({columns}) SELECT {columns} FROM copy_{table} "
+                f"ON CONFLICT ({conflict}) DO NOTHING"
+            )
+            inserted = cursor.rowcount
+            cursor.execute(f"DROP TABLE copy_{table}")
+        finally:
+            cursor.close()
+        self._commit()
+        return inserted
+
+    def bulk_create(self, rows: Iterable[dict[str, Any]], conflict_fields: Iterable[str] = None,
+                    chunk_size: int = DB_BULK_CHUNK_SIZE) -> int:
+        """
+        Inserts the rows with one multi-row statement per chunk, all chunks in one transaction.
+        With `conflict_fields` clashing rows are skipped. Returns the number of inserted rows.
+        """
+        inserted = 0
+        with self.atomic():
+            for chunk in chunked(rows, chunk_size):
+                if conflict_fields:
+                    inserted += self.insert_many(chunk, conflict_fields)
+                else:
+                    self.session.execute(insert(self.model), chunk)
+                    inserted += len(chunk)
+        return inserted
+
+    def update_where(self, where: Iterable, values: dict[str, Any]) -> int:
+        """One UPDATE for every row matching `where`, returns the number of updated rows."""
+        where = list(where)
+        if not where:
+            raise ValueError("update_where needs at least one condition, it would update the whole table")
+        result = self.session.execute(
+            update(self.model).where(*where).values(**values).execution_options(synchronize_session=False)
+        )
+        self._commit()
+        return result.rowcount
+
+    def update_many(self, ids: Iterable, values: dict[str, Any], chunk_size: int = DB_BULK_CHUNK_SIZE) -> int:
+        updated = 0
+        with self.atomic():
+            for chunk in chunked(ids, chunk_size):
+                updated += self.update_where((self.model.id.in_(chunk),), values)
+        return updated
+
+    def delete_many(self, ids: Iterable, chunk_size: int = DB_BULK_CHUNK_SIZE) -> int:
+        deleted = 0
+        with self.atomic():
+            for chunk in chunked(ids, chunk_size):
+                result = self.session.execute(
+                    delete(self.model).where(self.model.id.in_(chunk)).execution_options(synchronize_session=False)
+                )
+                deleted += result.rowcount
+        return deleted
+
+    def update_returning(self, _id, values: dict[str, Any], returning: Iterable[str]) -> Row | None:
+        """
+        Updates one row with a single UPDATE ... RETURNING, None when there is no row with this id.
+        Objects already loaded in the session keep their old values.
+        """
+        row = self.session.execute(
+            update(self.model)
+            .where(self.model.id == _id)
+            .values(**values)
+            .returning(*self._get_model_fields(returning))
+            .execution_options(synchronize_session=False)
+        ).first()
+        self._commit()
+        return row
+
 
 class UserController(BaseController):
     model = User
+    PROJECTIONS = USER_PROJECTIONS
 
     def get_user_by_email(self, email: str, fields: Iterable[str] = None) -> User | None:
         return self._get('email', email, fields)
 
+    def get_row_by_email(self, email: str, fields: Iterable[str]) -> Row | None:
+        return self.get_row("email", email, fields)
+
+    def existing_emails(self, emails: Iterable[str]) -> set[str]:
+        """The given emails that are already taken, in one query."""
+        emails = list(emails)
+        if not emails:
+            return set()
+        return set(self._connection().execute(select(User.email).where(User.email.in_(emails))).scalars())
+
     def email_exists(self, email: str) -> bool:
-        return self.session.query(exists().where(self.model.email == email)).scalar()
+        return self.row_exists("email", email)
+
+    def register(self, values: dict[str, Any], returning: Iterable[str]) -> Row | None:
+        """Creates the user in one round trip, None when the email is already taken."""
+        return self.insert_returning(values, returning, conflict_fields=("email",))
+
+    def update_password(self, _id, hashed_password: str) -> bool:
+        return self.update_returning(_id, {"password": hashed_password}, returning=("id",)) is not None
+
+
+class AsyncBaseController:
+    model = None
+    PROJECTIONS: dict[str, tuple[str, ...]] = {}
+
+    def __init__(self, session=None):
+        assert issubclass(self.model, Base), "%s it must be inherited from %s" % (self.model.__name__, Base.__name__)
+        self.logger = getLogger(self.__class__.__name__)
+        self._owns_session = not session
+        self.session = get_async_session_factory()() if not session else session
+        self._atomic_depth = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self._owns_session:
+            await self.close()
+
+    async def close(self):
+        await self.session.close()
+
+    @classmethod
+    def projection(cls, *uses: str) -> tuple[str, ...]:
+        return combine_projections(cls.PROJECTIONS, uses)
+
+    def _get_model_fields(self, fields: Iterable[str]):
+        return [getattr(self.model, field) for field in fields or []]
+
+    async def _get(self, by_field: str, value: Any, fields: Iterable[str] = None):
+        stmt = select(self.model).where(getattr(self.model, by_field) == value).limit(1)
+        if fields:
+            stmt = stmt.options(*load_options(self._get_model_fields(fields)))
+        return (await self.session.scalars(stmt)).first()
+
+    async def get_by_id(self, _id, fields: Iterable[str] = None):
+        if not fields:
+            return await self.session.get(self.model, _id)
+        return await self._get("id", _id, fields)
+
+    async def iter_all(self, fields: Iterable[str] = None, batch_size: int = DB_STREAM_BATCH_SIZE,
+                       where: Iterable = ()) -> AsyncIterator:
+        if fields:
+            stmt = select(*self._get_model_fields(fields)).where(*where).order_by(self.model.id)
+            result = await (await self._connection()).stream(stmt.execution_options(yield_per=batch_size))
+        else:
+            stmt = select(self.model).where(*where).order_by(self.model.id).execution_options(yield_per=batch_size)
+            result = await self.session.stream_scalars(stmt)
+        try:
+            async for row in result:
+                yield row
+        finally:
+            await result.close()
+
+    async def get_page(self, after_id: int = 0, limit: int = DB_PAGE_SIZE,
+                       fields: Iterable[str] = None) -> list[Row]:
+        stmt = page_select(self.model.__table__, page_fields(self.model.__table__, fields))
+        return (await (await self._connection()).execute(stmt, {"after_id": after_id, "limit": limit})).all()
+
+    async def _commit(self):
+        if self._owns_session and not self._atomic_depth:
+            await self.session.commit()
+        else:
+            await self.session.flush()
+
+    @asynccontextmanager
+    async def atomic(self):
+        self._atomic_depth += 1
+        try:
+            yield self
+        except Exception:
+            if self._owns_session and self._atomic_depth == 1:
+                await self.session.rollback()
+            raise
+        finally:
+            self._atomic_depth -= 1
+        await self._commit()
+
+    async def create(self, entity) -> bool:
+        try:
+            self.session.add(entity)
+            await self._commit()
+            return True
+        except Exception as e:
+            self.logger.exception(e)
+            await self.session.rollback()
+            return False
+
+    async def commit(self) -> bool:
+        try:
+            await self._commit()
+            return True
+        except Exception as e:
+            self.logger.exception(e)
+            await self.session.rollback()
+            return False
+
+    async def exists(self, _id) -> bool:
+        return await self.session.scalar(select(exists().where(self.model.id == _id)))
+
+    async def _connection(self):
+        return await self.session.connection(bind_arguments={"mapper": self.model})
+
+    async def get_row(self, by_field: str, value: Any, fields: Iterable[str]) -> Row | None:
+        stmt = row_select(self.model.__table__, by_field, tuple(fields))
+        return (await (await self._connection()).execute(stmt, {"value": value})).first()
+
+    async def get_row_by_id(self, _id, fields: Iterable[str]) -> Row | None:
+        return await self.get_row("id", _id, fields)
+
+    async def row_exists(self, by_field: str, value: Any) -> bool:
+        stmt = exists_select(self.model.__table__, by_field)
+        return (await (await self._connection()).execute(stmt, {"value": value})).first() is not None
+
+    async def insert_returning(self, values: dict[str, Any], returning: Iterable[str],
+                               conflict_fields: Iterable[str] = None) -> Row | None:
+        dialect_name = self.session.get_bind(mapper=self.model).dialect.name
+        row = (await self.session.execute(
+            insert_returning_stmt(self.model, dialect_name, values, returning, conflict_fields)
+        )).first()
+        await self._commit()
+        return row
+
+    async def insert_many(self, rows: list[dict[str, Any]], conflict_fields: Iterable[str] = None) -> int:
+        if not rows:
+            return 0
+        dialect_name = self.session.get_bind(mapper=self.model).dialect.name
+        inserted = (await self.session.execute(
+            insert_returning_stmt(self.model, dialect_name, rows, ("id",), conflict_fields)
+        )).all()
+        await self._commit()
+        return len(inserted)
+
+    async def bulk_create(self, rows: Iterable[dict[str, Any]], conflict_fields: Iterable[str] = None,
+                          chunk_size: int = DB_BULK_CHUNK_SIZE) -> int:
+        inserted = 0
+        async with self.atomic():
+            for chunk in chunked(rows, chunk_size):
+                if conflict_fields:
+                    inserted += await self.insert_many(chunk, conflict_fields)
+                else:
+                    await self.session.execute(insert(self.model), chunk)
+                    inserted += len(chunk)
+        return inserted
+
+    async def update_where(self, where: Iterable, values: dict[str, Any]) -> int:
+        where = list(where)
+        if not where:
+            raise ValueError("update_where needs at least one condition, it would update the whole table")
+        result = await self.session.execute(
+            update(self.model).where(*where).values(**values).execution_options(synchronize_session=False)
+        )
+        await self._commit()
+        return result.rowcount
+
+    async def update_many(self, ids: Iterable, values: dict[str, Any], chunk_size: int = DB_BULK_CHUNK_SIZE) -> int:
+        updated = 0
+        async with self.atomic():
+            for chunk in chunked(ids, chunk_size):
+                updated += await self.update_where((self.model.id.in_(chunk),), values)
+        return updated
+
+    async def delete_many(self, ids: Iterable, chunk_size: int = DB_BULK_CHUNK_SIZE) -> int:
+        deleted = 0
+        async with self.atomic():
+            for chunk in chunked(ids, chunk_size):
+                result = await self.session.execute(
+                    delete(self.model).where(self.model.id.in_(chunk)).execution_options(synchronize_session=False)
+                )
+                deleted += result.rowcount
+        return deleted
+
+    async def update_returning(self, _id, values: dict[str, Any], returning: Iterable[str]) -> Row | None:
+        row = (await self.session.execute(
+            update(self.model)
+            .where(self.model.id == _id)
+            .values(**values)
+            .returning(*self._get_model_fields(returning))
+            .execution_options(synchronize_session=False)
+        )).first()
+        await self._commit()
+        return row
+
+
+class AsyncUserController(AsyncBaseController):
+    model = User
+    PROJECTIONS = USER_PROJECTIONS
+
+    async def get_user_by_email(self, email: str, fields: Iterable[str] = None) -> User | None:
+        return await self._get('email', email, fields)
+
+    async def get_row_by_email(self, email: str, fields: Iterable[str]) -> Row | None:
+        return await self.get_row("email", email, fields)
+
+    async def email_exists(self, email: str) -> bool:
+        return await self.row_exists("email", email)
+
+    async def register(self, values: dict[str, Any], returning: Iterable[str]) -> Row | None:
+        return await self.insert_returning(values, returning, conflict_fields=("email",))
+
+    async def update_password(self, _id, hashed_password: str) -> bool:
+        return await self.update_returning(_id, {"password": hashed_password}, returning=("id",)) is not None
@@ -1,6 +1,11 @@
-from dao.connections import engine
+from dao.connections import get_async_engine, get_engine
 from dao.models import User
 
 
 def initialize_models():
-    User.metadata.create_all(engine)
+    User.metadata.create_all(get_engine())
+
+
+async def initialize_models_async():
+    async with get_async_engine().begin() as conn:
+        await conn.run_sync(User.metadata.create_all)
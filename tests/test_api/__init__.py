@@ -1,2 +1,14 @@
 from .test_validators import TestEmailValidation, TestPasswordValidator, TestCheckRequiredFields
+from .test_asgi import TestAsgi
+from .test_hash_executor import TestHashExecutor
+from .test_hashers import TestHashers
+from .test_import_users import TestUserImporter
+from .test_jwt_codec import TestHS256Codec
+from .test_mailer import TestMailer
+from .test_media import TestMediaHandlers
+from .test_revocation import TestRevocation
+from .test_schemas import TestSchemas, TestRegisterValidation
+from .test_send_email import TestSMTPBackend
+from .test_token_cache import TestVerifiedTokenCache
+from .test_token_keys import TestTokenKeys, TestJWKSResource
 from .test_resource import *
@@ -0,0 +1,75 @@
+import json
+import unittest
+from unittest import mock
+
+import falcon
+from falcon import testing
+
+import api.aio
+from api.utils.tokens import auth_token_for_user, decode_token
+from config import TOKEN_AUTH_HEADER
+from dao.connections import get_async_engine
+from dao.operations import initialize_models_async
+
+
+class TestAsgi(unittest.TestCase):
+    def setUp(self):
+        falcon.async_to_sync(initialize_models_async)
+
+        self.api = testing.TestClient(api.aio.create())
+        self.api.app.add_route("/register", api.aio.RegisterResource())
+        self.api.app.add_route("/auth", api.aio.AuthResource())
+        self.api.app.add_route("/me-info", api.aio.UserInfoResource())
+        self.api.app.add_route("/admin/users/export", api.aio.ExportResource())
+
+    def tearDown(self):
+        falcon.async_to_sync(get_async_engine().dispose)
+
+    def test_register_auth_and_update(self):
+        credentials = {'email': 'asgi_register_user@gmail.com', 'password': 'somePassword123f}'}
+        response = self.api.simulate_post('/register', json={**credentials, 'full_name': 'New User'})
+        self.assertEqual(falcon.HTTP_OK, response.status, getattr(response, 'text', None))
+
+        response = self.api.simulate_post('/auth', json=credentials)
+        self.assertEqual(falcon.HTTP_OK, response.status, getattr(response, 'text', None))
+        token = getattr(response, 'json')['token']
+        self.assertEqual(credentials['email'], decode_token(token)['user_email'])
+
+        headers = {'Authorization': f'{TOKEN_AUTH_HEADER} {token}'}
+        response = self.api.simulate_patch(
+            '/me-info',
+            json={'password': credentials['password'], 'full_name': 'Updated Name'},
+            headers=headers
+        )
+        self.assertEqual(falcon.HTTP_OK, response.status, getattr(response, 'text', None))
+
+        response = self.api.simulate_get('/me-info', headers=headers)
+        self.assertEqual('Updated Name', getattr(response, 'json')['full_name'])
+
+    def test_export(self):
+        credentials = {'email': 'asgi_export_user@gmail.com', 'password': 'somePassword123f}'}
+        self.api.simulate_post('/register', json={**credentials, 'full_name': 'Export User'})
+
+        director = mock.Mock(id=1, email='asgi_director@gmail.com', role='director', email_verified=True)
+        response = self.api.simulate_get(
+            '/admin/users/export',
+            params={'columns': 'email,role', 'role': 'client'},
+            headers={'Authorization': f'{TOKEN_AUTH_HEADER} {auth_token_for_user(director)}'}
+        )
+        self.assertEqual(falcon.HTTP_OK, response.status, getattr(response, 'text', None))
+        records = [json.loads(line) for line in response.text.splitlines()]
+        self.assertIn({'email': credentials['email'], 'role': 'client'}, records)
+
+    def test_failed_authentication(self):
+        response = self.api.simulate_post(
+            '/auth', json={'email': 'asgi_not_exists_user@gmail.com', 'password': 'test_password'}
+        )
+        self.assertEqual(falcon.HTTP_UNAUTHORIZED, response.status)
+
+    def test_failed_register_missing_required_fields(self):
+        response = self.api.simulate_post('/register', json={})
+        self.assertEqual(falcon.HTTP_BAD_REQUEST, response.status)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import asyncio
+import threading
+import unittest
+
+from api.utils.hash_executor import HashExecutor, HashExecutorOverloaded
+from api.utils.hashers import get_hashed_password, verify_password, verify_password_async
+
+
+class TestHashExecutor(unittest.TestCase):
+    def setUp(self):
+        self.executor = HashExecutor(kind="thread", workers=1, queue_size=1, timeout=5)
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def test_run(self):
+        self.assertEqual(4, self.executor.run(pow, 2, 2))
+
+        stats = self.executor.stats()
+        self.assertEqual(1, stats["completed"])
+        self.assertEqual(0, stats["in_flight"])
+
+    def test_run_async(self):
+        result = asyncio.run(self.executor.run_async(pow, 3, 2))
+        self.assertEqual(9, result)
+
+    def test_overloaded(self):
+        release = threading.Event()
+        running = self.executor.submit(release.wait)
+        waiting = self.executor.submit(release.wait)
+
+        with self.assertRaises(HashExecutorOverloaded):
+            self.executor.submit(release.wait)
+        self.assertEqual(1, self.executor.stats()["rejected"])
+
+        release.set()
+        self.executor.shutdown()
+        self.assertTrue(running.done() and waiting.done())
+        self.assertEqual(4, self.executor.run(pow, 2, 2))
+
+    def test_timeout_is_overloaded(self):
+        executor = HashExecutor(kind="thread", workers=1, queue_size=1, timeout=0.05)
+        self.addCleanup(executor.shutdown)
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        executor.submit(release.wait)
+        with self.assertRaises(HashExecutorOverloaded):
+            executor.run(pow, 2, 2)
+        with self.assertRaises(HashExecutorOverloaded):
+            asyncio.run(executor.run_async(pow, 2, 2))
+
+    def test_hashers(self):
+        hashed = get_hashed_password("test_password")
+        self.assertTrue(verify_password("test_password", hashed))
+        self.assertFalse(asyncio.run(verify_password_async("wrong_password", hashed)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+
+import bcrypt
+
+from api.utils.hashers import (
+    BCryptHasher, ScryptHasher, get_default_hasher, get_hashed_password, identify_hasher, needs_rehash,
+    verify_password
+)
+
+
+class TestHashers(unittest.TestCase):
+    def test_default_hasher_roundtrip(self):
+        hashed = get_hashed_password("test_password")
+        self.assertIsInstance(hashed, str)
+        self.assertTrue(verify_password("test_password", hashed))
+        self.assertFalse(verify_password("wrong_password", hashed))
+        self.assertFalse(needs_rehash(hashed))
+
+    def test_scrypt_roundtrip(self):
+        hasher = ScryptHasher(cost=14)
+        hashed = hasher.encode("test_password")
+        self.assertTrue(hashed.startswith("$scrypt$ln=14,"))
+        self.assertIsInstance(identify_hasher(hashed), ScryptHasher)
+        self.assertTrue(verify_password("test_password", hashed))
+        self.assertFalse(verify_password("wrong_password", hashed))
+
+    def test_legacy_bytes_hash(self):
+        hashed = bcrypt.hashpw(b"test_password", bcrypt.gensalt(rounds=4))
+        self.assertIsInstance(identify_hasher(hashed), BCryptHasher)
+        self.assertTrue(verify_password("test_password", hashed))
+        self.assertTrue(needs_rehash(hashed))
+
+    def test_needs_rehash_on_other_algorithm(self):
+        default_hasher = get_default_hasher()
+        other = ScryptHasher if default_hasher.algorithm != ScryptHasher.algorithm else BCryptHasher
+        self.assertTrue(needs_rehash(other().encode("test_password")))
+
+    def test_needs_update_only_on_lower_cost(self):
+        hasher = ScryptHasher(cost=15)
+        self.assertTrue(hasher.needs_update(ScryptHasher(cost=14).encode("test_password")))
+        self.assertFalse(hasher.needs_update(hasher.encode("test_password")))
+        # a process calibrated to a lower cost keeps the stronger hash instead of downgrading it
+        self.assertFalse(ScryptHasher(cost=14).needs_update(hasher.encode("test_password")))
+
+        bcrypt_hash = BCryptHasher(cost=11).encode("test_password")
+        self.assertTrue(BCryptHasher(cost=12).needs_update(bcrypt_hash))
+        self.assertFalse(BCryptHasher(cost=10).needs_update(bcrypt_hash))
+
+    def test_unknown_hash(self):
+        self.assertIsNone(identify_hasher("$unknown$hash"))
+        self.assertFalse(verify_password("test_password", "$unknown$hash"))
+
+    def test_malformed_hashes(self):
+        scrypt = ScryptHasher(cost=14)
+        for malformed in ("$scrypt$r=8,p=1$c2FsdA==$aGFzaA==", "$scrypt$ln=x$salt$hash", "$scrypt$ln=14"):
+            with self.subTest(malformed=malformed):
+                self.assertIsNone(scrypt.get_cost(malformed))
+                self.assertTrue(scrypt.needs_update(malformed))
+                self.assertFalse(scrypt.verify("test_password", malformed))
+                self.assertFalse(verify_password("test_password", malformed))
+        self.assertFalse(BCryptHasher().verify("test_password", "$2b$12$short"))
+        self.assertFalse(verify_password("test_password", "$2b$12$short"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import io
+import json
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from api.error_msgs import EMAIL_ERROR_MSGS, IMPORT_INVALID_RECORD, IMPORT_UNKNOWN_HASH
+from api.import_users import UserImporter, read_csv, read_ndjson
+from api.utils.hashers import get_hashed_password, verify_password
+from dao.controllers import UserController
+from dao.models import User
+
+
+class TestUserImporter(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine("sqlite://")
+        User.metadata.create_all(engine)
+        self.session = sessionmaker(bind=engine)()
+        self.users = UserController(session=self.session)
+        self.users.register(
+            {"email": "import_existing@gmail.com", "password": "hash", "full_name": "Existing", "role": "client"},
+            returning=("id",)
+        )
+        self.rejects = io.StringIO()
+        self.importer = UserImporter(self.users, rejects=self.rejects, progress=None)
+
+    def tearDown(self):
+        self.users.close()
+
+    def _rejected(self) -> dict[int, dict]:
+        return {reject["line"]: reject["errors"] for reject in map(json.loads, self.rejects.getvalue().splitlines())}
+
+    def test_ndjson(self):
+        password_hash = get_hashed_password("legacy password")
+        lines = [
+            {"email": "import_hashed@gmail.com", "full_name": "Hashed", "password_hash": password_hash,
+             "role": "salesman", "email_verified": True, "joined_at": "2020-01-02T03:04:05"},
+            {"email": "import_plain@gmail.com", "full_name": "Plain", "password": "legacy password"},
+            {"email": "import_hashed@gmail.com", "full_name": "Twice", "password_hash": password_hash},
+            {"email": "import_existing@gmail.com", "full_name": "Existing", "password_hash": password_hash},
+            {"email": "import_unknown_hash@gmail.com", "full_name": "Unknown", "password_hash": "md5$abc"},
+            {"email": "not an email", "full_name": "Invalid", "password": "legacy password"},
+        ]
+        stream = io.StringIO("\n".join(map(json.dumps, lines)) + "\n{malformed\n")
+
+        stats = self.importer.run(read_ndjson(stream), batch_size=4)
+        self.assertEqual((7, 2, 5), (stats["read"], stats["imported"], stats["rejected"]))
+
+        rejected = self._rejected()
+        self.assertEqual([3, 4, 5, 6, 7], sorted(rejected))
+        self.assertEqual({"email": [EMAIL_ERROR_MSGS["already_exists"]]}, rejected[3])
+        self.assertEqual({"email": [EMAIL_ERROR_MSGS["already_exists"]]}, rejected[4])
+        self.assertEqual({"password_hash": [IMPORT_UNKNOWN_HASH]}, rejected[5])
+        self.assertIn("email", rejected[6])
+        self.assertEqual({"record": IMPORT_INVALID_RECORD}, rejected[7])
+
+        hashed = self.session.query(User).filter_by(email="import_hashed@gmail.com").one()
+        self.assertEqual(("salesman", True, False), (hashed.role, hashed.email_verified, hashed.is_active))
+        self.assertEqual(2020, hashed.joined_at.year)
+        plain = self.session.query(User).filter_by(email="import_plain@gmail.com").one()
+        self.assertEqual("client", plain.role)
+        self.assertTrue(verify_password("legacy password", plain.password))
+
+    def test_csv(self):
+        stream = io.StringIO(
+            "email,full_name,password_hash,email_verified\n"
+            f"import_csv@gmail.com,Csv User,{get_hashed_password('legacy password')},true\n"
+            "import_csv_invalid@gmail.com,Csv User,,maybe\n"
+        )
+        records = list(read_csv(stream))
+        self.assertEqual(True, records[0][1]["email_verified"])
+
+        stats = self.importer.run(iter(records))
+        self.assertEqual((2, 1, 1), (stats["read"], stats["imported"], stats["rejected"]))
+        self.assertEqual(["email_verified"], list(self._rejected()[3]))
+        self.assertTrue(self.users.email_exists("import_csv@gmail.com"))
+
+    def test_insert_conflicts_counted_apart(self):
+        # the email is registered after the lookup
+        self.users.existing_emails = lambda emails: set()
+        record = {"email": "import_existing@gmail.com", "full_name": "Existing", "password": "legacy password"}
+
+        stats = self.importer.run(iter([(1, record)]))
+        self.assertEqual((0, 0, 1), (stats["imported"], stats["rejected"], stats["conflicts"]))
+        self.assertEqual("", self.rejects.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+
+import jwt
+
+from api.utils.jwt_codec import HS256Codec
+from api.utils.tokens import auth_token_for_user, decode_token
+
+
+class TestHS256Codec(unittest.TestCase):
+    def setUp(self):
+        self.codec = HS256Codec("codec_secret")
+        self.payload = {
+            "user_id": 1, "user_email": "codec_user@gmail.com", "user_role": "user", "user_email_verified": False,
+            "jti": "a" * 32, "iat": int(time.time()),
+            "exp": datetime.now(timezone.utc) + timedelta(hours=1),
+        }
+
+    def test_byte_compatible_with_pyjwt(self):
+        expected = jwt.encode(self.payload, "codec_secret", algorithm="HS256")
+        self.assertEqual(expected, self.codec.encode(self.payload))
+
+        non_ascii = {**self.payload, "full_name": "Пользователь"}
+        self.assertEqual(jwt.encode(non_ascii, "codec_secret", algorithm="HS256"), self.codec.encode(non_ascii))
+
+    def test_decode(self):
+        decoded = self.codec.decode(jwt.encode(self.payload, "codec_secret", algorithm="HS256"))
+        self.assertEqual(jwt.decode(self.codec.encode(self.payload), "codec_secret", algorithms=["HS256"]), decoded)
+        self.assertEqual("codec_user@gmail.com", decoded["user_email"])
+
+    def test_other_header_falls_back_to_pyjwt(self):
+        token = jwt.encode(self.payload, "codec_secret", algorithm="HS256", headers={"kid": "1"})
+        self.assertEqual(1, self.codec.decode(token)["user_id"])
+
+    def test_invalid(self):
+        token = self.codec.encode(self.payload)
+        header, payload, signature = token.split(".")
+        with self.assertRaises(jwt.InvalidSignatureError):
+            HS256Codec("other_secret").decode(token)
+        with self.assertRaises(jwt.InvalidSignatureError):
+            self.codec.decode(f"{header}.{payload}x.{signature}")
+        with self.assertRaises(jwt.DecodeError):
+            self.codec.decode("invalid")
+        with self.assertRaises(jwt.ExpiredSignatureError):
+            self.codec.decode(self.codec.encode({**self.payload, "exp": self.payload["iat"] - 1}))
+        with self.assertRaises(jwt.ImmatureSignatureError):
+            self.codec.decode(self.codec.encode({**self.payload, "iat": self.payload["iat"] + 600}))
+
+    def test_non_time_datetime_claim_rejected_like_pyjwt(self):
+        payload = {**self.payload, "joined_at": datetime.now(timezone.utc)}
+        with self.assertRaises(TypeError):
+            jwt.encode(payload, "codec_secret", algorithm="HS256")
+        with self.assertRaises(TypeError):
+            self.codec.encode(payload)
+
+        nested = {**self.payload, "extra": {"score": 1.5, "tags": ["a"]}}
+        self.assertEqual(jwt.encode(nested, "codec_secret", algorithm="HS256"), self.codec.encode(nested))
+
+    def test_auth_token_layout(self):
+        class User:
+            id, email, role, email_verified = 1, "codec_user@gmail.com", "user", True
+
+        claims = decode_token(auth_token_for_user(User()))
+        self.assertEqual(
+            ["user_id", "user_email", "user_role", "user_email_verified", "jti", "iat", "exp"], list(claims)
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
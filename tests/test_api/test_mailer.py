@@ -0,0 +1,64 @@
+import unittest
+from unittest import mock
+
+from api.mailer import enqueue_mail_text
+from api.mailer.worker import MailWorker, retry_delay
+from api.utils.send_email import MemoryBackend, build_message
+from api.utils.templates import env, render
+from config import MAIL_DEAD_LETTER_STREAM, MAIL_OUTBOX_STREAM, MAIL_RETRY_BACKOFF, MAIL_RETRY_BACKOFF_MAX
+
+
+class TestMailer(unittest.TestCase):
+    def test_build_message(self):
+        message = build_message("mailer_user@gmail.com", "Subject", "<b>Hi</b>", "html")
+        self.assertIn("To: mailer_user@gmail.com", message)
+        self.assertIn("Subject: Subject", message)
+        self.assertIn("text/html", message)
+
+    def test_render_uses_compiled_templates(self):
+        self.assertIn("verify_email.html", [name for _, name in env.cache.keys()])
+        html = render("verify_email.html", {"subject": "Kaimono", "url": "http://localhost/verify/token"})
+        self.assertIn("http://localhost/verify/token", html)
+
+    def test_memory_backend_send_many(self):
+        backend = MemoryBackend()
+        errors = backend.send_many([("first@gmail.com", "first"), ("second@gmail.com", "second")])
+        self.assertEqual([None, None], errors)
+        self.assertEqual(["first@gmail.com", "second@gmail.com"], [email for email, _ in backend.outbox])
+
+    def test_retry_delay(self):
+        self.assertGreaterEqual(retry_delay(1), MAIL_RETRY_BACKOFF)
+        self.assertGreaterEqual(retry_delay(2), MAIL_RETRY_BACKOFF * 2)
+        self.assertLessEqual(retry_delay(100), MAIL_RETRY_BACKOFF_MAX * 1.1)
+
+    def test_worker_sends_queued_message(self):
+        backend = MemoryBackend()
+        worker = MailWorker(backend=backend, concurrency=1, consumer="test", block_ms=100)
+        worker._ensure_group()
+
+        enqueue_mail_text("mailer_worker_user@gmail.com", "Subject", "Hello")
+        self.assertTrue(all(worker.handle(worker._read())))
+
+        self.assertIn("mailer_worker_user@gmail.com", [email for email, _ in backend.outbox])
+
+    def test_worker_dead_letters_malformed_entry(self):
+        backend = MemoryBackend()
+        worker = MailWorker(backend=backend, concurrency=1, consumer="test")
+        entries = [
+            ("1-0", {b"message": b"no recipient", b"attempts": b"0"}),
+            ("2-0", {b"email": b"mailer_malformed_user@gmail.com", b"message": b"Hello", b"attempts": b"0"}),
+        ]
+        with mock.patch("api.mailer.worker.redis_pipeline") as redis_pipeline:
+            pipeline = redis_pipeline.return_value.__enter__.return_value
+            self.assertEqual([False, True], worker.handle(entries))
+
+        self.assertEqual([("mailer_malformed_user@gmail.com", "Hello")], backend.outbox)
+        self.assertEqual(MAIL_DEAD_LETTER_STREAM, pipeline.xadd.call_args.args[0])
+        self.assertEqual(
+            [mock.call(MAIL_OUTBOX_STREAM, mock.ANY, "1-0"), mock.call(MAIL_OUTBOX_STREAM, mock.ANY, "2-0")],
+            pipeline.xack.call_args_list
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
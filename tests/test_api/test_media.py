@@ -0,0 +1,53 @@
+import io
+import unittest
+
+import falcon
+from falcon import errors, testing
+
+import api
+from api.utils.media import JSON_HANDLERS, get_json_handler
+from dao.operations import initialize_models
+
+
+class TestMediaHandlers(unittest.TestCase):
+    def available_backends(self):
+        return [name for name, (available, _) in JSON_HANDLERS.items() if available()]
+
+    def test_roundtrip(self):
+        media = {"email": "media_user@gmail.com", "full_name": "Пользователь", "email_verified": True, "id": 1}
+        for backend in self.available_backends():
+            with self.subTest(backend=backend):
+                handler = get_json_handler(backend)
+                data = handler.serialize(media, falcon.MEDIA_JSON)
+                self.assertIsInstance(data, bytes)
+                self.assertEqual(media, handler.deserialize(io.BytesIO(data), falcon.MEDIA_JSON, len(data)))
+
+    def test_malformed_and_empty(self):
+        for backend in self.available_backends():
+            with self.subTest(backend=backend):
+                handler = get_json_handler(backend)
+                with self.assertRaises(errors.MediaMalformedError):
+                    handler.deserialize(io.BytesIO(b"{bad"), falcon.MEDIA_JSON, 4)
+                with self.assertRaises(errors.MediaNotFoundError):
+                    handler.deserialize(io.BytesIO(b""), falcon.MEDIA_JSON, 0)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(AssertionError):
+            get_json_handler("yaml")
+
+    def test_app_requests_and_errors(self):
+        initialize_models()
+        client = testing.TestClient(api.create())
+        client.app.add_route("/auth", api.AuthResource())
+
+        response = client.simulate_post("/auth", body="{bad", headers={"Content-Type": falcon.MEDIA_JSON})
+        self.assertEqual(falcon.HTTP_BAD_REQUEST, response.status)
+        self.assertEqual("Invalid JSON", response.json["title"])
+
+        response = client.simulate_post("/auth", json={"email": "media_user@gmail.com", "password": "password"})
+        self.assertEqual(falcon.HTTP_UNAUTHORIZED, response.status)
+        self.assertIn("description", response.json)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,3 +3,7 @@ from .test_register import TestRegister
 from .test_verify_email import TestVerifyEmail
 from .test_forgot_pwd import TestForgotPassword
 from .test_update_pwd import TestUpdatePassword
+from .test_user_info import TestUserInfo
+from .test_introspect import TestIntrospect
+from .test_export import TestExport
+from .test_health import TestHealth
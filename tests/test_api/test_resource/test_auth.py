@@ -1,9 +1,11 @@
 import unittest
+
+import bcrypt
 import falcon
 from falcon import testing
 
 import api
-from api.utils.hashers import get_hashed_password
+from api.utils.hashers import get_hashed_password, needs_rehash
 from api.utils.tokens import encode_token, decode_token
 from config import TOKEN_AUTH_HEADER
 from dao.controllers import UserController
@@ -47,6 +49,23 @@ class TestAuth(unittest.TestCase):
         self.assertIn('user_role', response.cookies)
         self.assertIn('user_email_verified', response.cookies)
 
+    def test_rehash_on_authentication(self):
+        test_user = User(
+            email="auth_rehash_user@gmail.com",
+            password=bcrypt.hashpw(b"test_password", bcrypt.gensalt(rounds=4)).decode(),
+            role="user",
+            full_name="Test User"
+        )
+        created = self.user_controller.create(test_user)
+        self.assertTrue(created)
+
+        response = self.api.simulate_post('/auth',
+                                          json={'email': test_user.email, 'password': 'test_password'})
+        self.assertEqual(response.status, falcon.HTTP_200)
+
+        self.user_controller.session.refresh(test_user)
+        self.assertFalse(needs_rehash(test_user.password))
+
     def test_failed_authentication(self):
         test_user = User(
             email="auth_failed_user@gmail.com",
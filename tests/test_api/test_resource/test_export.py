@@ -0,0 +1,95 @@
+import csv
+import io
+import json
+import unittest
+from unittest import mock
+
+import falcon
+from falcon import testing
+
+import api
+from api.utils.export import CSVEncoder
+from api.utils.tokens import auth_token_for_user
+from config import TOKEN_AUTH_HEADER
+from dao.controllers import UserController
+from dao.operations import initialize_models
+
+EXPORT_USERS = (
+    ("export_verified_user@gmail.com", True),
+    ("export_unverified_user@gmail.com", False),
+)
+
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        initialize_models()
+        with UserController() as Users:
+            for email, email_verified in EXPORT_USERS:
+                Users.register(
+                    {"email": email, "password": "hash", "full_name": "Export User", "role": "salesman",
+                     "email_verified": email_verified},
+                    returning=("id",)
+                )
+
+        self.api = testing.TestClient(api.create())
+        self.api.app.add_route("/admin/users/export", api.ExportResource())
+
+    @staticmethod
+    def _headers(role: str) -> dict:
+        user = mock.Mock(id=1, email="export_admin@gmail.com", role=role, email_verified=True)
+        return {"Authorization": f"{TOKEN_AUTH_HEADER} {auth_token_for_user(user)}"}
+
+    def test_ndjson(self):
+        response = self.api.simulate_get(
+            "/admin/users/export", params={"role": "salesman"}, headers=self._headers("director")
+        )
+        self.assertEqual(falcon.HTTP_OK, response.status)
+        self.assertEqual("application/x-ndjson", response.headers["content-type"])
+
+        records = [json.loads(line) for line in response.text.splitlines()]
+        self.assertEqual([email for email, _ in EXPORT_USERS], [record["email"] for record in records])
+        self.assertNotIn("password", records[0])
+        self.assertEqual(
+            ["id", "email", "full_name", "role", "email_verified", "is_active", "joined_at"], list(records[0])
+        )
+
+    def test_csv_columns_and_filters(self):
+        response = self.api.simulate_get(
+            "/admin/users/export",
+            params={"format": "csv", "columns": "email,email_verified", "role": "salesman", "email_verified": "false"},
+            headers=self._headers("developer")
+        )
+        self.assertEqual(falcon.HTTP_OK, response.status)
+        self.assertIn("users.csv", response.headers["content-disposition"])
+        self.assertEqual(
+            [["email", "email_verified"], ["export_unverified_user@gmail.com", "False"]],
+            list(csv.reader(io.StringIO(response.text)))
+        )
+
+    def test_csv_escapes_formulas(self):
+        encoder = CSVEncoder(("full_name", "id"))
+        self.assertEqual(
+            [["'=HYPERLINK(\"http://evil\")", "-1"], ["'@SUM(A1)", "2"], ["Plain - name", "3"]],
+            list(csv.reader(io.StringIO(encoder.encode(
+                [('=HYPERLINK("http://evil")', -1), ("@SUM(A1)", 2), ("Plain - name", 3)]
+            ).decode())))
+        )
+
+    def test_forbidden_roles(self):
+        response = self.api.simulate_get("/admin/users/export")
+        self.assertEqual(falcon.HTTP_UNAUTHORIZED, response.status)
+
+        response = self.api.simulate_get("/admin/users/export", headers=self._headers("client"))
+        self.assertEqual(falcon.HTTP_FORBIDDEN, response.status)
+
+    def test_invalid_params(self):
+        for params in ({"format": "xml"}, {"columns": "email,password"}, {"joined_after": "yesterday"}):
+            with self.subTest(params=params):
+                response = self.api.simulate_get(
+                    "/admin/users/export", params=params, headers=self._headers("director")
+                )
+                self.assertEqual(falcon.HTTP_BAD_REQUEST, response.status)
+
+
+if __name__ == '__main__':
+    unittest.main()
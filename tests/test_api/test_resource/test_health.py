@@ -0,0 +1,36 @@
+import asyncio
+import unittest
+
+import falcon
+from falcon import testing
+
+import api
+import api.aio
+
+
+class TestHealth(unittest.TestCase):
+    def setUp(self):
+        self.api = testing.TestClient(api.create())
+        self.api.app.add_route("/health", api.HealthResource())
+
+    def test_status(self):
+        self._assert_status(self.api.simulate_get("/health"))
+
+    def test_asgi_status(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self.addCleanup(asyncio.set_event_loop, None)
+        self.addCleanup(loop.close)
+        client = testing.TestClient(api.aio.create())
+        client.app.add_route("/health", api.aio.HealthResource())
+        self._assert_status(client.simulate_get("/health"))
+
+    def _assert_status(self, response):
+        self.assertEqual(falcon.HTTP_OK, response.status)
+        self.assertIn("avg_wait", response.json["db_pool"])
+        self.assertIn("timeouts", response.json["db_pool"])
+        self.assertIn("in_flight", response.json["hash_executor"])
+
+
+if __name__ == '__main__':
+    unittest.main()
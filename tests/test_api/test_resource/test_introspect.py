@@ -0,0 +1,104 @@
+import asyncio
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+import falcon
+from falcon import testing
+
+import api
+import api.aio
+from api.error_msgs import INTROSPECT_INVALID_KEY, INVALID_TOKEN, TOKEN_HAS_EXPIRED, TOKEN_REVOKED
+from api.utils.tokens import auth_token_for_user, encode_token, verify_token_for_user
+from config import INTROSPECT_MAX_TOKENS, TOKEN_EXP_SECONDS
+
+
+class TestIntrospect(unittest.TestCase):
+    def setUp(self):
+        self.api = testing.TestClient(api.create())
+        self.api.app.add_route("/introspect", api.IntrospectResource())
+        self.user = mock.Mock(id=1, email="introspect_user@gmail.com", role="user", email_verified=True)
+
+        patcher = mock.patch("api.resource.introspect.INTROSPECT_KEYS", ("other-service-key", "service-key"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def introspect(self, body, key="service-key"):
+        return self.api.simulate_post("/introspect", json=body, headers={"X-SERVICE-KEY": key} if key else None)
+
+    def test_batch(self):
+        expired = encode_token({"user_id": 1, "exp": datetime.utcnow() - timedelta(seconds=1)})
+        tokens = [
+            auth_token_for_user(self.user),
+            {"token": verify_token_for_user(self.user), "type": "verify"},
+            {"token": verify_token_for_user(self.user)},
+            expired,
+            {"token": "invalid", "type": "unknown"},
+        ]
+        response = self.introspect({"tokens": tokens})
+        self.assertEqual(falcon.HTTP_OK, response.status)
+
+        auth, verify, wrong_kind, expired, unknown = response.json["results"]
+        self.assertTrue(auth["active"])
+        self.assertEqual("introspect_user@gmail.com", auth["claims"]["user_email"])
+        self.assertTrue(0 < auth["ttl"] <= TOKEN_EXP_SECONDS)
+        self.assertEqual(("verify", 1), (verify["type"], verify["claims"]["user_id"]))
+        self.assertEqual({"active": False, "error": INVALID_TOKEN}, wrong_kind)
+        self.assertEqual({"active": False, "error": TOKEN_HAS_EXPIRED}, expired)
+        self.assertEqual({"active": False, "error": INVALID_TOKEN}, unknown)
+
+    def test_token_without_exp_has_no_ttl(self):
+        with mock.patch("api.resource.introspect.revoked_tokens", return_value=[False]):
+            response = self.introspect({"tokens": [encode_token({"user_id": 1})]})
+
+        result = response.json["results"][0]
+        self.assertTrue(result["active"])
+        self.assertNotIn("ttl", result)
+
+    def test_requires_service_key(self):
+        for key in (None, "wrong-key"):
+            response = self.introspect({"tokens": [auth_token_for_user(self.user)]}, key=key)
+            self.assertEqual(falcon.HTTP_UNAUTHORIZED, response.status)
+            self.assertEqual(INTROSPECT_INVALID_KEY, response.json["description"])
+
+    def test_single_revocation_lookup(self):
+        tokens = [auth_token_for_user(self.user) for _ in range(3)]
+        with mock.patch("api.resource.introspect.revoked_tokens", return_value=[False, True, False]) as revoked:
+            response = self.introspect({"tokens": tokens})
+
+        revoked.assert_called_once()
+        self.assertEqual(3, len(revoked.call_args.args[0]))
+        self.assertEqual([True, False, True], [result["active"] for result in response.json["results"]])
+        self.assertEqual(TOKEN_REVOKED, response.json["results"][1]["error"])
+
+    def test_asgi_revocation_lookup_is_async(self):
+        # the test client needs an event loop, asyncio.run in other tests leaves none behind
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self.addCleanup(asyncio.set_event_loop, None)
+        self.addCleanup(loop.close)
+        client = testing.TestClient(api.aio.create())
+        client.app.add_route("/introspect", api.aio.IntrospectResource())
+
+        tokens = [auth_token_for_user(self.user) for _ in range(2)]
+        with mock.patch("api.aio.resource.revoked_tokens_async", return_value=[True, False]) as revoked_async, \
+                mock.patch("api.resource.introspect.revoked_tokens") as revoked:
+            response = client.simulate_post(
+                "/introspect", json={"tokens": tokens}, headers={"X-SERVICE-KEY": "service-key"}
+            )
+
+        revoked.assert_not_called()
+        revoked_async.assert_awaited_once()
+        self.assertEqual([False, True], [result["active"] for result in response.json["results"]])
+
+    def test_invalid_body(self):
+        response = self.introspect({"tokens": "token"})
+        self.assertEqual(falcon.HTTP_BAD_REQUEST, response.status)
+
+    def test_too_many_tokens(self):
+        response = self.introspect({"tokens": ["token"] * (INTROSPECT_MAX_TOKENS + 1)})
+        self.assertEqual(falcon.HTTP_BAD_REQUEST, response.status)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+from falcon import testing, status_codes
+
+import api
+from api.utils.hashers import get_hashed_password
+from api.utils.tokens import auth_token_for_user
+from config import TOKEN_AUTH_HEADER
+from dao.controllers import UserController
+from dao.models import User
+from dao.operations import initialize_models
+
+
+class TestUserInfo(unittest.TestCase):
+    def setUp(self):
+        initialize_models()
+        self.user_controller = UserController()
+
+        self.api = testing.TestClient(api.create())
+        self.api.app.add_route("/me-info", api.UserInfoResource())
+
+    def tearDown(self):
+        self.user_controller.close()
+
+    def _create_user(self, email):
+        test_user = User(
+            email=email,
+            password=get_hashed_password("test_password"),
+            role="user",
+            full_name="Test User"
+        )
+        created = self.user_controller.create(test_user)
+        self.assertTrue(created)
+        return test_user
+
+    def test_success_update(self):
+        test_user = self._create_user("user_info_success_update_user@gmail.com")
+        token = auth_token_for_user(user=test_user)
+
+        response = self.api.simulate_patch(
+            '/me-info',
+            json={'password': 'test_password', 'full_name': 'Updated Name'},
+            headers={'Authorization': f'{TOKEN_AUTH_HEADER} {token}'}
+        )
+        self.assertEqual(status_codes.HTTP_OK, response.status, getattr(response, 'json', None))
+        self.assertEqual('Updated Name', getattr(response, 'json')['full_name'])
+
+        self.user_controller.session.refresh(test_user)
+        self.assertEqual('Updated Name', test_user.full_name)
+
+    def test_failure_update_with_wrong_password(self):
+        test_user = self._create_user("user_info_wrong_password_user@gmail.com")
+        token = auth_token_for_user(user=test_user)
+
+        response = self.api.simulate_patch(
+            '/me-info',
+            json={'password': 'wrong_password', 'full_name': 'Updated Name'},
+            headers={'Authorization': f'{TOKEN_AUTH_HEADER} {token}'}
+        )
+        self.assertEqual(status_codes.HTTP_UNAUTHORIZED, response.status)
+
+        self.user_controller.session.refresh(test_user)
+        self.assertEqual('Test User', test_user.full_name)
+
+
+if __name__ == '__main__':
+    unittest.main()
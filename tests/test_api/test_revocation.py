@@ -0,0 +1,196 @@
+import asyncio
+import threading
+import time
+import unittest
+from contextlib import asynccontextmanager
+from unittest import mock
+
+import falcon
+import redis
+from falcon import testing
+
+import api
+import api.aio
+from api.aio.middleware import _retry_tasks, run_after_commit_async
+from api.error_msgs import TOKEN_REVOKED
+from api.middleware.db_session import RequestSession
+from api.queries import update_user_pwd
+from api.utils.revocation import BloomFilter, RevocationList
+from api.utils.tokens import auth_token_for_user, decode_token
+from config import TOKEN_AUTH_HEADER, TOKEN_EXP_SECONDS
+from dao.controllers import UserController
+
+
+class TestRevocation(unittest.TestCase):
+    def setUp(self):
+        # local state only, the listener would replace it with what is in Redis
+        self.revocations = RevocationList(capacity=1000)
+        patcher = mock.patch.object(self.revocations, "start")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.revocations._loaded.set()
+
+        self.user = mock.Mock(id=7, email="revoked_user@gmail.com", role="user", email_verified=True)
+
+    def test_bloom_filter(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        for index in range(1000):
+            bloom.add(f"jti-{index}")
+
+        self.assertTrue(all(f"jti-{index}" in bloom for index in range(1000)))
+        false_positives = sum(f"other-{index}" in bloom for index in range(10000))
+        self.assertLess(false_positives, 300)
+
+    def test_token_claims(self):
+        claims = decode_token(auth_token_for_user(self.user))
+        self.assertEqual(32, len(claims["jti"]))
+        self.assertEqual(TOKEN_EXP_SECONDS, claims["exp"] - claims["iat"])
+
+    def test_user_watermark(self):
+        claims = decode_token(auth_token_for_user(self.user))
+        self.assertFalse(self.revocations.is_revoked(claims))
+
+        self.revocations._apply({"user_id": "7", "before": claims["iat"]})
+        self.assertTrue(self.revocations.is_revoked(claims))
+        self.assertFalse(self.revocations.is_revoked({**claims, "user_id": 8}))
+        # tokens issued before jti and iat existed fall back to exp
+        legacy_claims = {"user_id": 7, "exp": claims["exp"]}
+        self.assertTrue(self.revocations.is_revoked(legacy_claims))
+
+    def test_watermark_without_exp(self):
+        claims = decode_token(auth_token_for_user(self.user))
+        self.revocations._apply({"user_id": "7", "before": claims["iat"] - 1})
+        without_exp = {key: value for key, value in claims.items() if key != "exp"}
+        self.assertFalse(self.revocations.is_revoked(without_exp))
+        # no iat and no exp, the issue time is unknown
+        self.assertTrue(self.revocations.is_revoked({"user_id": 7}))
+        self.assertFalse(self.revocations.is_revoked({"user_id": 8}))
+
+        self.revocations._loaded.clear()
+        with mock.patch("api.utils.revocation.redis_pipeline") as redis_pipeline:
+            redis_pipeline.return_value.__enter__.return_value.execute.return_value = [
+                0, str(claims["iat"] - 1).encode(), b"1"
+            ]
+            self.assertEqual([False, True], self.revocations.revoked_many([without_exp, {"user_id": 7}]))
+
+    def test_bloom_hit_is_confirmed_in_redis(self):
+        claims = decode_token(auth_token_for_user(self.user))
+        self.revocations._apply({"jti": claims["jti"]})
+
+        with mock.patch("api.utils.revocation.redis_pipeline") as redis_pipeline:
+            pipeline = redis_pipeline.return_value.__enter__.return_value
+            pipeline.execute.return_value = [0, None]
+            self.assertFalse(self.revocations.is_revoked(claims))
+        pipeline.exists.assert_called_once_with("revoked:jti:" + claims["jti"])
+
+    def test_checks_redis_until_loaded(self):
+        self.revocations._loaded.clear()
+        claims = decode_token(auth_token_for_user(self.user))
+
+        with mock.patch("api.utils.revocation.redis_pipeline") as redis_pipeline:
+            pipeline = redis_pipeline.return_value.__enter__.return_value
+            pipeline.execute.return_value = [0, str(claims["iat"]).encode(), 0, None]
+            self.assertEqual([True, False], self.revocations.revoked_many([claims, {**claims, "user_id": 8}]))
+        pipeline.get.assert_has_calls([mock.call("revoked:user:7"), mock.call("revoked:user:8")])
+
+        with mock.patch("api.utils.revocation.redis_pipeline") as redis_pipeline:
+            redis_pipeline.return_value.__enter__.return_value.execute.side_effect = redis.ConnectionError
+            self.assertFalse(self.revocations.is_revoked(claims))
+
+    def test_revoked_many_without_bloom_hits_stays_local(self):
+        claims = [decode_token(auth_token_for_user(self.user)) for _ in range(3)]
+        self.revocations._apply({"user_id": "7", "before": int(time.time()) - TOKEN_EXP_SECONDS})
+        with mock.patch("api.utils.revocation.redis_pipeline") as redis_pipeline:
+            self.assertEqual([False, False, False], self.revocations.revoked_many(claims))
+        redis_pipeline.assert_not_called()
+
+    def test_middleware_rejects_revoked_token(self):
+        client = testing.TestClient(api.create())
+        client.app.add_route("/me-info", api.UserInfoResource())
+        token = auth_token_for_user(self.user)
+        self.revocations._apply({"user_id": "7", "before": decode_token(token)["iat"] + 1})
+
+        with mock.patch("api.middleware.authentication.is_token_revoked", self.revocations.is_revoked):
+            response = client.simulate_get("/me-info", headers={"Authorization": f"{TOKEN_AUTH_HEADER} {token}"})
+        self.assertEqual(falcon.HTTP_UNAUTHORIZED, response.status)
+        self.assertEqual(TOKEN_REVOKED, response.json["description"])
+
+    def test_password_change_revokes_after_commit(self):
+        with mock.patch("api.queries.revoke_user_tokens") as revoke_user_tokens, \
+                mock.patch.object(UserController, "update_password", return_value=True):
+            for commit in (False, True):
+                db = RequestSession()
+                self.assertTrue(update_user_pwd(7, "updatedPassword(2asd!", session=db.session))
+                revoke_user_tokens.assert_not_called()
+                db.close(commit=commit)
+        revoke_user_tokens.assert_called_once_with(7)
+
+    def test_failed_revocation_after_commit_is_retried(self):
+        revoked = threading.Event()
+
+        def revoke(user_id):
+            if revoke_user_tokens.call_count == 1:
+                raise redis.ConnectionError()
+            revoked.set()
+
+        revoke_user_tokens = mock.Mock(side_effect=revoke)
+        with mock.patch("api.queries.revoke_user_tokens", revoke_user_tokens), \
+                mock.patch("api.middleware.db_session.AFTER_COMMIT_RETRY_DELAY", 0), \
+                mock.patch.object(UserController, "update_password", return_value=True):
+            db = RequestSession()
+            self.assertTrue(update_user_pwd(7, "updatedPassword(2asd!", session=db.session))
+            # the password is committed, the request does not fail with Redis
+            db.close(commit=True)
+            self.assertTrue(revoked.wait(5))
+        self.assertEqual([mock.call(7)] * 2, revoke_user_tokens.call_args_list)
+
+    def test_failed_async_callback_is_retried(self):
+        callback = mock.AsyncMock(side_effect=[redis.ConnectionError(), None])
+
+        async def run():
+            await run_after_commit_async(callback)
+            await asyncio.gather(*_retry_tasks)
+
+        with mock.patch("api.aio.middleware.AFTER_COMMIT_RETRY_DELAY", 0):
+            asyncio.run(run())
+        self.assertEqual(2, callback.await_count)
+
+    def test_revoked_many_async(self):
+        claims, other = (decode_token(auth_token_for_user(self.user)) for _ in range(2))
+        self.revocations._apply({"jti": claims["jti"]})
+
+        pipeline = mock.Mock(execute=mock.AsyncMock(return_value=[1, None]))
+        cache = mock.MagicMock()
+        cache.pipeline.return_value.__aenter__.return_value = pipeline
+
+        @asynccontextmanager
+        async def async_redis_scope(db: int = 0):
+            yield cache
+
+        with mock.patch("api.utils.revocation.async_redis_scope", async_redis_scope), \
+                mock.patch("api.utils.revocation.redis_pipeline") as redis_pipeline:
+            self.assertEqual([True, False], asyncio.run(self.revocations.revoked_many_async([claims, other])))
+        redis_pipeline.assert_not_called()
+        pipeline.exists.assert_called_once_with("revoked:jti:" + claims["jti"])
+
+    def test_asgi_middleware_checks_revocation_async(self):
+        # the test client needs an event loop, asyncio.run in other tests leaves none behind
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self.addCleanup(asyncio.set_event_loop, None)
+        self.addCleanup(loop.close)
+        client = testing.TestClient(api.aio.create())
+        client.app.add_route("/me-info", api.aio.UserInfoResource())
+        token = auth_token_for_user(self.user)
+        self.revocations._apply({"user_id": "7", "before": decode_token(token)["iat"]})
+
+        with mock.patch("api.middleware.authentication.is_token_revoked_async", self.revocations.is_revoked_async), \
+                mock.patch("api.middleware.authentication.is_token_revoked") as is_token_revoked:
+            response = client.simulate_get("/me-info", headers={"Authorization": f"{TOKEN_AUTH_HEADER} {token}"})
+        self.assertEqual(falcon.HTTP_UNAUTHORIZED, response.status)
+        self.assertEqual(TOKEN_REVOKED, response.json["description"])
+        is_token_revoked.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+from unittest import mock
+
+import falcon
+from falcon import testing
+
+import api
+from api.error_msgs import EMAIL_ERROR_MSGS, PWD_ERROR_MSGS, REQUIRED_FIELD_MISSING, WRONG_FIELD_TYPE
+from api.utils.schemas import REGISTER_SCHEMA, USER_UPDATE_SCHEMA
+from dao.operations import initialize_models
+
+
+class TestSchemas(unittest.TestCase):
+    def test_valid(self):
+        data = {"email": "schema_user@gmail.com", "password": "somePassword123f}", "full_name": "Schema User"}
+        self.assertEqual({}, REGISTER_SCHEMA.validate(data))
+
+    def test_all_errors_in_one_pass(self):
+        errors = REGISTER_SCHEMA.validate({"email": "schema_user@example", "password": "short", "full_name": 1})
+        self.assertEqual(
+            [EMAIL_ERROR_MSGS["wrong_chars"], EMAIL_ERROR_MSGS["unsupported_domain"]], errors["email"]
+        )
+        self.assertIn(PWD_ERROR_MSGS["has_no_digit"], errors["password"])
+        self.assertEqual([WRONG_FIELD_TYPE % "string"], errors["full_name"])
+
+    def test_missing_and_optional(self):
+        self.assertEqual(
+            {"email": REQUIRED_FIELD_MISSING, "password": REQUIRED_FIELD_MISSING, "full_name": REQUIRED_FIELD_MISSING},
+            REGISTER_SCHEMA.validate({"email": ""})
+        )
+        self.assertEqual({}, USER_UPDATE_SCHEMA.validate({"password": "any password"}))
+        self.assertEqual({"password": REQUIRED_FIELD_MISSING}, USER_UPDATE_SCHEMA.validate(["password"]))
+
+
+class TestRegisterValidation(unittest.TestCase):
+    def setUp(self):
+        initialize_models()
+        self.api = testing.TestClient(api.create())
+        self.api.app.add_route("/register", api.RegisterResource())
+
+    def test_malformed_body_skips_database(self):
+        payload = {"email": "schema_user@gmail.com", "password": "weak", "full_name": "Schema User"}
+        with mock.patch("api.resource.registration.create_client") as create_client:
+            response = self.api.simulate_post("/register", json=payload)
+
+        create_client.assert_not_called()
+        self.assertEqual(falcon.HTTP_BAD_REQUEST, response.status)
+        self.assertEqual(["password"], list(response.json))
+        self.assertIn(PWD_ERROR_MSGS["invalid_length"] % 10, response.json["password"])
+
+    def test_existing_email(self):
+        payload = {"email": "schema_user@gmail.com", "password": "somePassword123f}", "full_name": "Schema User"}
+        with mock.patch("api.resource.registration.create_client", return_value=None):
+            response = self.api.simulate_post("/register", json=payload)
+
+        self.assertEqual(falcon.HTTP_BAD_REQUEST, response.status)
+        self.assertEqual({"email": [EMAIL_ERROR_MSGS["already_exists"]]}, response.json)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import smtplib
+import unittest
+from unittest import mock
+
+from api.utils.send_email import SMTPBackend
+from config import SMTP_IDLE_TIMEOUT, SMTP_MAX_MESSAGES_PER_CONNECTION
+
+
+class TestSMTPBackend(unittest.TestCase):
+    def setUp(self):
+        # every smtplib.SMTP(...) call opens a new fake server
+        patcher = mock.patch("api.utils.send_email.smtplib.SMTP", side_effect=lambda *args, **kwargs: mock.Mock())
+        self.smtp = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.backend = SMTPBackend(pool_size=1)
+
+    def test_reuses_connection(self):
+        self.assertEqual([None, None], self.backend.send_many([("first@gmail.com", "1"), ("second@gmail.com", "2")]))
+        self.backend.send("third@gmail.com", "3")
+
+        self.assertEqual(1, self.smtp.call_count)
+        self.assertEqual(3, self.backend._idle.get_nowait().server.sendmail.call_count)
+
+    def test_reconnects_once_after_disconnect(self):
+        self.backend.send("first@gmail.com", "1")
+        connection = self.backend._idle.get_nowait()
+        connection.server.sendmail.side_effect = smtplib.SMTPServerDisconnected
+        self.backend._idle.put(connection)
+
+        self.assertEqual([None], self.backend.send_many([("second@gmail.com", "2")]))
+        self.assertEqual(2, self.smtp.call_count)
+        connection.server.quit.assert_called_once()
+        self.backend._idle.get_nowait().server.sendmail.assert_called_once_with(mock.ANY, "second@gmail.com", "2")
+
+    def test_gives_up_after_second_disconnect(self):
+        self.smtp.side_effect = lambda *args, **kwargs: mock.Mock(
+            **{"sendmail.side_effect": smtplib.SMTPServerDisconnected}
+        )
+        errors = self.backend.send_many([("first@gmail.com", "1")])
+
+        self.assertIsInstance(errors[0], smtplib.SMTPServerDisconnected)
+        self.assertEqual(2, self.smtp.call_count)
+        self.assertTrue(self.backend._idle.empty())
+
+    def test_recycles_idle_connection(self):
+        with mock.patch("api.utils.send_email.time.monotonic", return_value=1000):
+            self.backend.send("first@gmail.com", "1")
+        with mock.patch("api.utils.send_email.time.monotonic", return_value=1000 + SMTP_IDLE_TIMEOUT):
+            self.backend.send("second@gmail.com", "2")
+
+        self.assertEqual(2, self.smtp.call_count)
+
+    def test_recycles_after_max_messages(self):
+        messages = [(f"user_{i}@gmail.com", str(i)) for i in range(SMTP_MAX_MESSAGES_PER_CONNECTION + 1)]
+        self.assertTrue(all(error is None for error in self.backend.send_many(messages)))
+
+        self.assertEqual(2, self.smtp.call_count)
+        connection = self.backend._idle.get_nowait()
+        self.assertEqual(1, connection.sent)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import time
+import unittest
+from datetime import datetime, timedelta
+
+from api.middleware import AuthMiddleware, VerifyEmailAuthMiddleware
+from api.utils.token_cache import VerifiedTokenCache
+from api.utils.tokens import decode_token, encode_token
+
+
+class TestVerifiedTokenCache(unittest.TestCase):
+    def setUp(self):
+        self.decoded = []
+        self.cache = VerifiedTokenCache(self.decoder, max_size=2)
+
+    def decoder(self, token):
+        self.decoded.append(token)
+        return decode_token(token)
+
+    @staticmethod
+    def make_token(user_id, exp_seconds=60):
+        return encode_token({"user_id": user_id, "exp": datetime.utcnow() + timedelta(seconds=exp_seconds)})
+
+    def test_hit(self):
+        token = self.make_token(1)
+        self.assertEqual(1, self.cache.decode(token)["user_id"])
+        self.assertEqual(1, self.cache.decode(token)["user_id"])
+
+        self.assertEqual([token], self.decoded)
+        stats = self.cache.stats()
+        self.assertEqual((1, 1, 1), (stats["hits"], stats["misses"], stats["size"]))
+
+    def test_returned_claims_are_copies(self):
+        token = self.make_token(1)
+        self.cache.decode(token)["user_id"] = 2
+        self.assertEqual(1, self.cache.decode(token)["user_id"])
+
+    def test_lru_eviction(self):
+        first, second, third = self.make_token(1), self.make_token(2), self.make_token(3)
+        self.cache.decode(first)
+        self.cache.decode(second)
+        self.cache.decode(first)
+        self.cache.decode(third)
+
+        self.cache.decode(first)
+        self.cache.decode(second)
+        self.assertEqual([first, second, third, second], self.decoded)
+        self.assertEqual(2, self.cache.stats()["evictions"])
+
+    def test_expired_entry_is_dropped(self):
+        token = self.make_token(1, exp_seconds=1)
+        self.cache.decode(token)
+        time.sleep(1.1)
+
+        with self.assertRaises(ValueError):
+            self.cache.decode(token)
+        stats = self.cache.stats()
+        self.assertEqual((1, 0), (stats["expired"], stats["size"]))
+
+    def test_invalid_token_is_not_cached(self):
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                self.cache.decode("invalid.token.value")
+        self.assertEqual(2, len(self.decoded))
+        self.assertEqual(0, self.cache.stats()["size"])
+
+    def test_disabled(self):
+        cache = VerifiedTokenCache(self.decoder, max_size=0)
+        token = self.make_token(1)
+        cache.decode(token)
+        cache.decode(token)
+        self.assertEqual(2, len(self.decoded))
+
+    def test_middlewares_do_not_share_cache(self):
+        auth_middleware, verify_middleware = AuthMiddleware(), VerifyEmailAuthMiddleware()
+        token = self.make_token(1)
+        auth_middleware.token_cache.decode(token)
+
+        self.assertIsNot(auth_middleware.token_cache, verify_middleware.token_cache)
+        with self.assertRaises(ValueError):
+            verify_middleware.token_cache.decode(token)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+import falcon
+from falcon import testing
+from jwt.algorithms import has_crypto
+
+import api
+from api.utils import tokens
+from api.utils.token_keys import TokenKeyring
+from auth_verifier import InvalidToken, TokenExpired, TokenVerifier
+
+if has_crypto:
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+
+
+def private_pem(private_key) -> bytes:
+    return private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+
+
+def public_pem(private_key) -> bytes:
+    return private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+
+
+@unittest.skipUnless(has_crypto, "cryptography is not installed")
+class TestTokenKeys(unittest.TestCase):
+    def setUp(self):
+        self.keyring = TokenKeyring(algorithm="EdDSA")
+        self.keyring.add_key("2024-01", private_pem(ed25519.Ed25519PrivateKey.generate()))
+        self.keyring.add_key("2024-02", private_pem(ed25519.Ed25519PrivateKey.generate()))
+        self.keyring.add_key("2024-03", public_pem(ed25519.Ed25519PrivateKey.generate()))
+
+        patcher = mock.patch.multiple(
+            tokens, is_asymmetric=lambda: True, get_keyring=lambda: self.keyring, TOKEN_HASH_ALGORITHM="EdDSA"
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def payload(exp_seconds=60):
+        return {"user_id": 1, "exp": datetime.utcnow() + timedelta(seconds=exp_seconds)}
+
+    def test_sign_with_last_private_key(self):
+        token = tokens.encode_token(self.payload())
+        self.assertEqual("2024-02", tokens.jwt.get_unverified_header(token)["kid"])
+        self.assertEqual(1, tokens.decode_token(token)["user_id"])
+
+    def test_rotation(self):
+        self.keyring.signing_kid = "2024-01"
+        old_token = tokens.encode_token(self.payload())
+        self.keyring.signing_kid = ""
+        self.assertEqual(1, tokens.decode_token(old_token)["user_id"])
+
+        retired = TokenKeyring(algorithm="EdDSA")
+        retired.add_key("2024-04", private_pem(ed25519.Ed25519PrivateKey.generate()))
+        with self.assertRaises(ValueError):
+            tokens.decode_token(tokens.jwt.encode(self.payload(), retired.signing_key[1], "EdDSA",
+                                                  headers={"kid": "2024-04"}))
+
+    def test_verify_token_stays_symmetric(self):
+        token = tokens.verify_token_for_user(mock.Mock(id=1, email="a@gmail.com", role="user", email_verified=False))
+        self.assertEqual("HS256", tokens.jwt.get_unverified_header(token)["alg"])
+        self.assertEqual(1, tokens.decode_verify_token(token)["user_id"])
+        with self.assertRaises(ValueError):
+            tokens.decode_token(token)
+
+    def test_load_dir_and_key_type(self):
+        with tempfile.TemporaryDirectory() as keys_dir:
+            with open(os.path.join(keys_dir, "rsa.pem"), "wb") as key_file:
+                key_file.write(private_pem(rsa.generate_private_key(public_exponent=65537, key_size=2048)))
+            self.assertEqual("rsa", TokenKeyring(algorithm="RS256").load_dir(keys_dir).signing_key[0])
+            with self.assertRaises(AssertionError):
+                TokenKeyring(algorithm="EdDSA").load_dir(keys_dir)
+
+    def test_offline_verifier(self):
+        verifier = TokenVerifier(jwks=self.keyring.jwks())
+        self.assertEqual(3, len(self.keyring.jwks()["keys"]))
+        self.assertEqual(1, verifier.verify(tokens.encode_token(self.payload()))["user_id"])
+
+        with self.assertRaises(TokenExpired):
+            verifier.verify(tokens.encode_token(self.payload(exp_seconds=-1)))
+        with self.assertRaises(InvalidToken):
+            verifier.verify(tokens.encode_token(self.payload(), secret="shared_secret"))
+        with self.assertRaises(InvalidToken):
+            verifier.verify("not a token")
+
+    def test_verifier_refetches_unknown_kid(self):
+        jwks = {"keys": [jwk for jwk in self.keyring.jwks()["keys"] if jwk["kid"] != "2024-02"]}
+        verifier = TokenVerifier(jwks_url="http://users/.well-known/jwks.json", min_refresh_interval=0)
+        with mock.patch.object(verifier, "fetch_jwks", side_effect=[jwks, self.keyring.jwks()]) as fetch_jwks:
+            self.assertEqual(1, verifier.verify(tokens.encode_token(self.payload()))["user_id"])
+        self.assertEqual(2, fetch_jwks.call_count)
+
+
+class TestJWKSResource(unittest.TestCase):
+    def setUp(self):
+        self.api = testing.TestClient(api.create())
+        self.api.app.add_route("/.well-known/jwks.json", api.JWKSResource())
+
+    def test_cacheable(self):
+        response = self.api.simulate_get("/.well-known/jwks.json")
+        self.assertEqual(falcon.HTTP_OK, response.status)
+        self.assertIn("keys", response.json)
+        self.assertIn("max-age=", response.headers["Cache-Control"])
+
+        response = self.api.simulate_get(
+            "/.well-known/jwks.json", headers={"If-None-Match": response.headers["ETag"]}
+        )
+        self.assertEqual(falcon.HTTP_NOT_MODIFIED, response.status)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1 +1,2 @@
 from .test_controllers import TestUserController
+from .test_connections import TestConnections, TestRedisPools
@@ -0,0 +1,96 @@
+import unittest
+from contextlib import contextmanager
+from unittest import mock
+
+from sqlalchemy import create_engine, text
+
+from dao.connections import (
+    InstrumentedQueuePool, db_pool_stats, db_pool_status, get_engine, get_redis_pool, get_session_factory, redis_pipeline,
+    reset_redis_pools
+)
+
+
+class TestConnections(unittest.TestCase):
+    def test_engine_and_session_factory_are_cached(self):
+        self.assertIs(get_engine(), get_engine())
+        self.assertIs(get_session_factory(), get_session_factory())
+
+    def test_pool_checkout_stats(self):
+        engine = create_engine("sqlite://", poolclass=InstrumentedQueuePool, pool_size=1, max_overflow=0)
+        checkouts = db_pool_stats.as_dict()["checkouts"]
+
+        with engine.connect() as conn:
+            self.assertEqual(1, conn.execute(text("SELECT 1")).scalar())
+
+        stats = db_pool_stats.as_dict()
+        self.assertEqual(checkouts + 1, stats["checkouts"])
+        self.assertGreaterEqual(stats["max_wait"], 0.0)
+        engine.dispose()
+
+    def test_pool_status(self):
+        engine = create_engine("sqlite://", poolclass=InstrumentedQueuePool, pool_size=2, max_overflow=1)
+        self.addCleanup(engine.dispose)
+        self.assertEqual((2, 0, 0, 0.0), self._usage(db_pool_status(engine)))
+
+        with engine.connect(), engine.connect():
+            self.assertEqual((2, 2, 0, 1.0), self._usage(db_pool_status(engine)))
+            with engine.connect():
+                status = db_pool_status(engine)
+                self.assertEqual((2, 3, 1, 1.5), self._usage(status))
+        self.assertIn("max_wait", status)
+
+    @staticmethod
+    def _usage(status: dict) -> tuple:
+        return status["size"], status["checked_out"], status["overflow"], status["saturation"]
+
+
+class TestRedisPools(unittest.TestCase):
+    def setUp(self):
+        reset_redis_pools()
+        # pools built by other tests come back on first use
+        self.addCleanup(reset_redis_pools)
+        patcher = mock.patch(
+            "dao.connections.redis.BlockingConnectionPool.from_url", side_effect=lambda *args, **kwargs: mock.Mock()
+        )
+        self.from_url = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_one_pool_per_db(self):
+        self.assertIs(get_redis_pool(1), get_redis_pool(1))
+        self.assertIsNot(get_redis_pool(1), get_redis_pool(2))
+        self.assertEqual([1, 2], [call.kwargs["db"] for call in self.from_url.call_args_list])
+
+    def test_pools_rebuilt_after_reset(self):
+        pool = get_redis_pool(1)
+        reset_redis_pools()
+
+        pool.reset.assert_called_once()
+        self.assertIsNot(pool, get_redis_pool(1))
+        self.assertEqual(2, self.from_url.call_count)
+
+    def test_pipeline_executes_once_on_exit(self):
+        cache = mock.MagicMock()
+        pipeline = cache.pipeline.return_value
+
+        @contextmanager
+        def redis_scope(db: int = 0):
+            yield cache
+
+        with mock.patch("dao.connections.redis_scope", redis_scope):
+            with redis_pipeline(3, transaction=True) as queued:
+                queued.__len__.return_value = 2
+                pipeline.execute.assert_not_called()
+            pipeline.execute.assert_called_once_with()
+            pipeline.reset.assert_called_once_with()
+            cache.pipeline.assert_called_once_with(transaction=True)
+
+            pipeline.reset_mock()
+            pipeline.__len__.return_value = 0
+            with redis_pipeline(3):
+                pass
+            pipeline.execute.assert_not_called()
+            pipeline.reset.assert_called_once_with()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,13 @@
 import unittest
 from datetime import datetime
+from unittest import mock
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import IntegrityError, InvalidRequestError
 from sqlalchemy.orm import sessionmaker
 
-from dao.controllers import UserController
+from dao.controllers import UserController, chunked, insert_returning_stmt, row_select
+from config import DB_RAISE_ON_LAZY_LOAD
 from dao.models import User
 
 TEST_DB_URI = 'sqlite:///:memory:'
@@ -12,7 +15,7 @@ TEST_DB_URI = 'sqlite:///:memory:'
 
 class TestUserController(unittest.TestCase):
     def setUp(self):
-        engine_test = create_engine(TEST_DB_URI)
+        engine_test = self.engine_test = create_engine(TEST_DB_URI)
         User.metadata.create_all(engine_test)
 
         session_test = sessionmaker()
@@ -129,6 +132,227 @@ class TestUserController(unittest.TestCase):
         self.assertTrue(result)
         self.assertFalse(self.user_controller.email_exists("some_not_exists@gmail.com"))
 
+    def test_register(self):
+        user_data = {
+            'email': 'controller_register_user@example.com',
+            'password': 'test_password',
+            'role': 'client',
+            'full_name': "User Name"
+        }
+        row = self.user_controller.register(user_data, returning=("id", "email", "role", "email_verified"))
+
+        self.assertIsNotNone(row.id)
+        self.assertEqual(('controller_register_user@example.com', 'client', False), tuple(row[1:]))
+        created_user = self.session_test.query(User).filter_by(email='controller_register_user@example.com').one()
+        self.assertEqual(row.id, created_user.id)
+        self.assertIsNotNone(created_user.joined_at)
+
+    def test_register_existing_email(self):
+        user_data = {
+            'email': 'controller_register_twice@example.com',
+            'password': 'test_password',
+            'role': 'client',
+            'full_name': "User Name"
+        }
+        self.assertIsNotNone(self.user_controller.register(user_data, returning=("id",)))
+        self.assertIsNone(self.user_controller.register(user_data, returning=("id",)))
+        self.assertEqual(
+            1, self.session_test.query(User).filter_by(email='controller_register_twice@example.com').count()
+        )
+
+    def test_insert_returning_unsupported_dialect(self):
+        with self.assertRaises(NotImplementedError):
+            insert_returning_stmt(User, "mysql", {'email': 'controller_mysql@example.com'}, returning=("id",))
+
+    def test_update_returning(self):
+        row = self.user_controller.register({
+            'email': 'controller_update_returning@example.com',
+            'password': 'test_password',
+            'role': 'client',
+            'full_name': "User Name"
+        }, returning=("id",))
+
+        updated = self.user_controller.update_returning(
+            row.id, {'full_name': "New Name"}, returning=("email", "full_name")
+        )
+        self.assertEqual(('controller_update_returning@example.com', "New Name"), tuple(updated))
+        self.assertIsNone(self.user_controller.update_returning(-1, {'full_name': "New Name"}, returning=("id",)))
+
+    def test_update_password(self):
+        row = self.user_controller.register({
+            'email': 'controller_update_password@example.com',
+            'password': 'test_password',
+            'role': 'client',
+            'full_name': "User Name"
+        }, returning=("id",))
+
+        self.assertTrue(self.user_controller.update_password(row.id, 'new_password'))
+        self.assertFalse(self.user_controller.update_password(-1, 'new_password'))
+        self.assertEqual('new_password', self.session_test.get(User, row.id).password)
+
+    def test_get_row(self):
+        row = self.user_controller.register({
+            'email': 'controller_get_row@example.com',
+            'password': 'test_password',
+            'role': 'client',
+            'full_name': "User Name"
+        }, returning=("id",))
+
+        by_id = self.user_controller.get_row_by_id(row.id, fields=("email", "full_name"))
+        self.assertEqual(('controller_get_row@example.com', "User Name"), tuple(by_id))
+        self.assertEqual("User Name", by_id.full_name)
+        self.assertNotIsInstance(by_id, User)
+
+        by_email = self.user_controller.get_row_by_email('controller_get_row@example.com', fields=["id", "role"])
+        self.assertEqual((row.id, 'client'), tuple(by_email))
+        self.assertIsNone(self.user_controller.get_row_by_email('some_not_exists@gmail.com', fields=("id",)))
+
+    def test_row_statements_are_cached(self):
+        self.assertIs(
+            row_select(User.__table__, "id", ("email", "full_name")),
+            row_select(User.__table__, "id", ("email", "full_name"))
+        )
+        self.assertIsNot(
+            row_select(User.__table__, "id", ("email", "full_name")),
+            row_select(User.__table__, "id", ("email",))
+        )
+
+    def test_projection(self):
+        self.assertEqual(
+            ('id', 'email', 'role', 'email_verified', 'password'), UserController.projection("token", "credentials")
+        )
+        self.assertEqual(('email', 'full_name'), UserController.projection("profile", "profile"))
+
+    def test_login_projection_single_select(self):
+        self.user_controller.register({
+            'email': 'controller_login_projection@example.com',
+            'password': 'test_password',
+            'role': 'client',
+            'full_name': "User Name"
+        }, returning=("id",))
+        statements = []
+        event.listen(self.engine_test, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+        user = self.user_controller.get_user_by_email(
+            'controller_login_projection@example.com', fields=UserController.projection("token", "credentials")
+        )
+        self.assertEqual('test_password', user.password)
+        self.assertEqual('client', user.role)
+        self.assertEqual(1, len(statements))
+
+    @unittest.skipUnless(DB_RAISE_ON_LAZY_LOAD, "lazy loads only raise in test/dev mode")
+    def test_unplanned_lazy_load_raises(self):
+        self.user_controller.register({
+            'email': 'controller_lazy_load@example.com',
+            'password': 'test_password',
+            'role': 'client',
+            'full_name': "User Name"
+        }, returning=("id",))
+
+        user = self.user_controller.get_user_by_email('controller_lazy_load@example.com', fields=("email",))
+        with self.assertRaises(InvalidRequestError):
+            user.password
+
+    def _register_users(self, count: int, prefix: str) -> list:
+        return [
+            self.user_controller.register({
+                'email': f'{prefix}_{i}@example.com',
+                'password': 'test_password',
+                'role': 'client',
+                'full_name': "User Name"
+            }, returning=("id",)).id
+            for i in range(count)
+        ]
+
+    def test_iter_all(self):
+        ids = self._register_users(5, 'controller_iter_all')
+
+        rows = [row for row in self.user_controller.iter_all(fields=("id", "email"), batch_size=2) if row.id in ids]
+        self.assertEqual(ids, [row.id for row in rows])
+        self.assertEqual('controller_iter_all_0@example.com', rows[0].email)
+
+        users = [user for user in self.user_controller.iter_all(batch_size=2) if user.id in ids]
+        self.assertTrue(all(isinstance(user, User) for user in users))
+        self.assertEqual(ids, [user.id for user in users])
+
+    def test_iter_all_leaves_connection_options(self):
+        connection = self.user_controller._connection()
+        options = dict(connection.get_execution_options())
+
+        list(self.user_controller.iter_all(fields=("id",), batch_size=2))
+        self.assertEqual(options, dict(self.user_controller._connection().get_execution_options()))
+        self.assertIs(connection, self.user_controller._connection())
+
+    def test_get_page(self):
+        ids = self._register_users(5, 'controller_get_page')
+
+        first_page = self.user_controller.get_page(after_id=ids[0] - 1, limit=3, fields=("email",))
+        self.assertEqual(ids[:3], [row.id for row in first_page])
+        self.assertEqual(('id', 'email'), tuple(first_page[0]._fields))
+
+        next_page = self.user_controller.get_page(after_id=first_page[-1].id, limit=3)
+        self.assertEqual(ids[3:], [row.id for row in next_page])
+        self.assertEqual('controller_get_page_3@example.com', next_page[0].email)
+        self.assertEqual([], self.user_controller.get_page(after_id=ids[-1]))
+
+    @staticmethod
+    def _bulk_rows(count: int, prefix: str) -> list[dict]:
+        return [
+            {'email': f'{prefix}_{i}@example.com', 'password': 'test_password', 'role': 'client', 'full_name': "Bulk"}
+            for i in range(count)
+        ]
+
+    def test_chunked_is_lazy(self):
+        consumed = []
+        rows = (consumed.append(i) or i for i in range(5))
+        chunks = chunked(rows, 2)
+        self.assertEqual([0, 1], next(chunks))
+        self.assertEqual([0, 1], consumed)
+        self.assertEqual([[2, 3], [4]], list(chunks))
+
+    def test_bulk_create_from_generator(self):
+        rows = (row for row in self._bulk_rows(3, 'controller_bulk_generator'))
+        self.assertEqual(3, self.user_controller.bulk_create(rows, chunk_size=2))
+
+    def test_bulk_create(self):
+        rows = self._bulk_rows(5, 'controller_bulk_create')
+        self.assertEqual(5, self.user_controller.bulk_create(rows, chunk_size=2))
+        self.assertEqual(0, self.user_controller.bulk_create(rows[:3], conflict_fields=("email",), chunk_size=2))
+        self.assertEqual(
+            1, self.user_controller.bulk_create(self._bulk_rows(6, 'controller_bulk_create')[4:], ("email",))
+        )
+        created = self.session_test.query(User).filter(User.email.like('controller_bulk_create_%')).all()
+        self.assertEqual(6, len(created))
+        self.assertFalse(created[0].email_verified)
+
+    def test_update_and_delete_many(self):
+        rows = self._bulk_rows(5, 'controller_bulk_update')
+        ids = [self.user_controller.register(row, returning=("id",)).id for row in rows]
+
+        self.assertEqual(4, self.user_controller.update_many(ids[:4] + [-1], {'is_active': True}, chunk_size=2))
+        self.assertEqual(
+            1, self.user_controller.update_where((User.id.in_(ids), User.is_active.is_(False)), {'role': 'director'})
+        )
+        self.assertEqual(
+            [(True, 'client')] * 4 + [(False, 'director')],
+            [tuple(row) for row in self.session_test.query(User.is_active, User.role).filter(User.id.in_(ids))]
+        )
+
+        with self.assertRaises(ValueError):
+            self.user_controller.update_where((), {'role': 'director'})
+
+        self.assertEqual(3, self.user_controller.delete_many(ids[:3], chunk_size=2))
+        self.assertEqual(0, self.user_controller.delete_many(ids[:3]))
+        self.assertEqual(2, self.session_test.query(User).filter(User.id.in_(ids)).count())
+
+    def test_bulk_create_is_atomic(self):
+        rows = self._bulk_rows(3, 'controller_bulk_atomic')
+        with mock.patch("dao.controllers.get_session_factory", return_value=sessionmaker(bind=self.engine_test)):
+            with UserController() as Users, self.assertRaises(IntegrityError):
+                Users.bulk_create(rows + rows[:1], chunk_size=3)
+
+        self.assertEqual(0, self.session_test.query(User).filter(User.email.like('controller_bulk_atomic_%')).count())
+
 
 if __name__ == '__main__':
     unittest.main()